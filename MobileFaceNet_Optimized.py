@@ -1,67 +1,356 @@
+import argparse
+import os
+from dataclasses import dataclass
+
 import cv2
 import numpy as np
-import mediapipe as mp
-import tensorflow as tf
-from scipy.spatial.distance import cosine
 
-# Load MobileFaceNet (TF Lite recommended for mobile; here we'll just load pb or h5 if you converted)
-interpreter = tf.lite.Interpreter(model_path=r"C:\Users\navad\FAST_Attendance\output_model.tflite")
-interpreter.allocate_tensors()
-input_details = interpreter.get_input_details()
-output_details = interpreter.get_output_details()
+# Override with MOBILEFACENET_MODEL to point at another TFLite export.
+MODEL_PATH = os.environ.get(
+    "MOBILEFACENET_MODEL",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "output_model.tflite"),
+)
+SIMILARITY_THRESHOLD = 0.75
+
+# Load MobileFaceNet (TF Lite recommended for mobile). The interpreter is created on
+# first use so importing this module (e.g. from the attendance server) stays cheap.
+interpreter = None
+input_details = None
+output_details = None
+
+# Interpreter backends in order of preference. tflite_runtime / ai_edge_litert ship
+# only the TFLite interpreter; full TensorFlow costs seconds of import time and
+# hundreds of MB of RSS per process, so it is the last resort. Force one with
+# MOBILEFACENET_RUNTIME=tflite_runtime|ai_edge_litert|tensorflow.
+RUNTIMES = ("tflite_runtime", "ai_edge_litert", "tensorflow")
+_runtime = None
+
+
+def _import_runtime(name):
+    if name == "tflite_runtime":
+        from tflite_runtime.interpreter import Interpreter, OpResolverType
+    elif name == "ai_edge_litert":
+        from ai_edge_litert.interpreter import Interpreter, OpResolverType
+    elif name == "tensorflow":
+        import tensorflow as tf
+        Interpreter, OpResolverType = tf.lite.Interpreter, tf.lite.experimental.OpResolverType
+    else:
+        raise ValueError(f"Unknown TFLite runtime {name!r}; choose from {', '.join(RUNTIMES)}")
+    return name, Interpreter, OpResolverType
+
+
+def get_runtime():
+    """(name, Interpreter class, OpResolverType enum) of the TFLite backend in use, imported on first call."""
+    global _runtime
+    if _runtime is None:
+        forced = os.environ.get("MOBILEFACENET_RUNTIME")
+        if forced:
+            _runtime = _import_runtime(forced)
+        else:
+            for name in RUNTIMES:
+                try:
+                    _runtime = _import_runtime(name)
+                    break
+                except ImportError:
+                    continue
+            else:
+                raise ImportError("No TFLite runtime found; pip install tflite-runtime (or ai-edge-litert).")
+    return _runtime
+
+
+def _face_detection_module():
+    """mediapipe is only needed for detection, so it is imported on first use."""
+    import mediapipe as mp
+    return mp.solutions.face_detection
+
+
+def model_variant_path(variant, model_path=MODEL_PATH):
+    """Path of a converted variant next to the base model, e.g. output_model_int8.tflite."""
+    if variant == "float32":
+        return model_path
+    root, ext = os.path.splitext(model_path)
+    return f"{root}_{variant}{ext}"
+
+
+@dataclass(frozen=True)
+class ExecutionProfile:
+    """How to run the embedding model: which converted variant, how many threads, XNNPACK or not."""
+    name: str
+    variant: str = "float32"  # float32 | float16 | dynamic | int8 (see convert_model.py)
+    num_threads: int | None = 1
+    xnnpack: bool = True
+
+    @property
+    def model_path(self):
+        return model_variant_path(self.variant)
+
+
+PROFILES = {
+    "float32": ExecutionProfile("float32"),
+    "float32-mt": ExecutionProfile("float32-mt", num_threads=os.cpu_count()),
+    "float32-no-xnnpack": ExecutionProfile("float32-no-xnnpack", xnnpack=False),
+    "float16": ExecutionProfile("float16", variant="float16"),
+    "dynamic": ExecutionProfile("dynamic", variant="dynamic"),
+    "int8": ExecutionProfile("int8", variant="int8"),
+    "int8-mt": ExecutionProfile("int8-mt", variant="int8", num_threads=os.cpu_count()),
+}
+DEFAULT_PROFILE = os.environ.get("MOBILEFACENET_PROFILE", "float32")
+
+
+def load_model(model_path=MODEL_PATH, num_threads=None, xnnpack=True):
+    """Create the TFLite interpreter for `model_path` and allocate its tensors."""
+    global interpreter, input_details, output_details
+    _, Interpreter, OpResolverType = get_runtime()
+    kwargs = {}
+    if num_threads:
+        kwargs["num_threads"] = num_threads
+    if not xnnpack:
+        # XNNPACK is applied as a default delegate; this resolver leaves it out.
+        kwargs["experimental_op_resolver_type"] = OpResolverType.BUILTIN_WITHOUT_DEFAULT_DELEGATES
+    interpreter = Interpreter(model_path=model_path, **kwargs)
+    interpreter.allocate_tensors()
+    input_details = interpreter.get_input_details()
+    output_details = interpreter.get_output_details()
+    return interpreter
+
+
+def load_profile(profile=DEFAULT_PROFILE):
+    """Load the model as described by an ExecutionProfile or a PROFILES name."""
+    if isinstance(profile, str):
+        if profile not in PROFILES:
+            raise ValueError(f"Unknown execution profile {profile!r}; choose from {', '.join(PROFILES)}")
+        profile = PROFILES[profile]
+    return load_model(profile.model_path, num_threads=profile.num_threads, xnnpack=profile.xnnpack)
+
+
+FACE_SIZE = 112
+
+# uint8 -> [-1, 1] as a lookup table, so normalisation is one cv2.LUT pass straight
+# into the destination instead of astype / divide / subtract temporaries.
+_NORMALIZE_LUT = (np.arange(256, dtype=np.float32) / 127.5 - 1.0).reshape(1, 256)
+
+
+class FacePreprocessor:
+    """
+    Face detection + crop + resize + normalise with reusable buffers.
+
+    Detection and the crop both run on one RGB copy of the frame, held in a
+    buffer that is only reallocated when the frame size changes, so the model
+    sees the same channel order the detector did. The crop is a view, the
+    resize writes into a fixed 112x112 uint8 buffer and normalisation writes
+    float32 values directly into the caller's destination (for example a view
+    of the interpreter's input tensor).
+    """
+
+    def __init__(self, size=FACE_SIZE, min_detection_confidence=0.5):
+        self.size = size
+        self.detector = _face_detection_module().FaceDetection(
+            model_selection=0, min_detection_confidence=min_detection_confidence
+        )
+        self._rgb = None
+        self._resized = np.empty((size, size, 3), dtype=np.uint8)
+        self.input = np.empty((1, size, size, 3), dtype=np.float32)
+
+    def to_rgb(self, image):
+        """Convert a BGR frame into the reusable RGB buffer."""
+        if self._rgb is None or self._rgb.shape != image.shape:
+            self._rgb = np.empty(image.shape, dtype=np.uint8)
+        cv2.cvtColor(image, cv2.COLOR_BGR2RGB, dst=self._rgb)
+        return self._rgb
+
+    def detect_scored(self, rgb):
+        """(box, score) pairs for the faces in an RGB frame, best first; boxes are pixel (x1, y1, x2, y2)."""
+        results = self.detector.process(rgb)
+        if not results.detections:
+            return []
+        h, w, _ = rgb.shape
+        faces = []
+        for detection in results.detections:
+            bbox = detection.location_data.relative_bounding_box
+            x1, y1 = max(0, int(bbox.xmin * w)), max(0, int(bbox.ymin * h))
+            x2, y2 = min(w, x1 + int(bbox.width * w)), min(h, y1 + int(bbox.height * h))
+            faces.append(((x1, y1, x2, y2), float(detection.score[0]) if detection.score else 0.0))
+        return faces
+
+    def detect(self, rgb):
+        """Pixel boxes (x1, y1, x2, y2) of the faces in an RGB frame, best first."""
+        return [box for box, _ in self.detect_scored(rgb)]
+
+    def crop_into(self, rgb, box, out):
+        """Resize the `box` crop of `rgb` and write it normalised into `out` (112x112x3 float32)."""
+        x1, y1, x2, y2 = box
+        face = rgb[y1:y2, x1:x2]
+        if face.size == 0:
+            return False
+        cv2.resize(face, (self.size, self.size), dst=self._resized)
+        cv2.LUT(self._resized, _NORMALIZE_LUT, dst=out)
+        return True
+
+    def crop_batch(self, rgb, boxes, out=None):
+        """Write every box of one frame into rows of `out` (N, 112, 112, 3); returns the filled rows."""
+        if out is None:
+            out = np.empty((len(boxes), self.size, self.size, 3), dtype=np.float32)
+        n = 0
+        for box in boxes:
+            if self.crop_into(rgb, box, out[n]):
+                n += 1
+        return out[:n]
+
+    def preprocess_batch(self, images, out=None):
+        """
+        First face of each BGR frame into consecutive rows of `out`.
+        Returns (faces, kept) where kept lists the indices of frames that had a face.
+        """
+        if out is None:
+            out = np.empty((len(images), self.size, self.size, 3), dtype=np.float32)
+        kept = []
+        for i, image in enumerate(images):
+            rgb = self.to_rgb(image)
+            boxes = self.detect(rgb)
+            if boxes and self.crop_into(rgb, boxes[0], out[len(kept)]):
+                kept.append(i)
+        return out[:len(kept)], kept
+
+    def __call__(self, image, out=None):
+        """
+        Preprocess the first detected face of a BGR frame into `out`
+        (default: the reusable self.input buffer). Returns the (1, 112, 112, 3)
+        array written to, or None if no usable face was found.
+        """
+        if out is None:
+            out = self.input
+        rgb = self.to_rgb(image)
+        boxes = self.detect(rgb)
+        if not boxes or not self.crop_into(rgb, boxes[0], out.reshape(self.size, self.size, 3)):
+            return None
+        return out
+
+    def close(self):
+        self.detector.close()
+
+
+_preprocessor = None
+
+
+def _get_preprocessor():
+    global _preprocessor
+    if _preprocessor is None:
+        _preprocessor = FacePreprocessor()
+    return _preprocessor
 
-mp_face_detection = mp.solutions.face_detection
-mp_drawing = mp.solutions.drawing_utils
 
 def preprocess_face(image):
     """Detect and crop face, resize to 112x112, normalize."""
     if image is None:
         print("❌ Image not found or failed to load!")
         return None
-    
-    with mp_face_detection.FaceDetection(model_selection=0, min_detection_confidence=0.5) as face_detection:
-        results = face_detection.process(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
-        
-        if not results.detections:
-            print("❌ No face detected!")
-            return None
-        
-        bbox = results.detections[0].location_data.relative_bounding_box
-        h, w, _ = image.shape
-        x1, y1 = max(0, int(bbox.xmin * w)), max(0, int(bbox.ymin * h))
-        x2, y2 = min(w, x1 + int(bbox.width * w)), min(h, y1 + int(bbox.height * h))
 
-        face = image[y1:y2, x1:x2]
-        if face.size == 0:
-            print("⚠️ Cropped face is empty!")
-            return None
+    face = _get_preprocessor()(image)
+    if face is None:
+        print("❌ No face detected!")
+        return None
+    # Callers keep the result, so hand back a copy rather than the shared buffer.
+    return face.copy()
+
 
-        face = cv2.resize(face, (112, 112))
-        face = face.astype("float32") / 127.5 - 1.0
-        return np.expand_dims(face, axis=0)
+def _ensure_batch_size(n):
+    """Resize the dynamic batch dimension of the model input to `n` if needed."""
+    if interpreter is None:
+        load_profile()
+    if interpreter.get_input_details()[0]['shape'][0] != n:
+        interpreter.resize_tensor_input(input_details[0]['index'], [n, FACE_SIZE, FACE_SIZE, 3])
+        interpreter.allocate_tensors()
 
 
 def get_embedding(face_img):
     """Run TFLite inference to get embedding."""
+    _ensure_batch_size(1)
     interpreter.set_tensor(input_details[0]['index'], face_img)
     interpreter.invoke()
     embedding = interpreter.get_tensor(output_details[0]['index'])
     return embedding.flatten()
 
-# ---- Registration ----
-reg_img = cv2.imread("known_faces\\WhatsApp Image 2025-09-07 at 16.53.23_0779b327.jpg")
-face_reg = preprocess_face(reg_img)
-registered_embedding = get_embedding(face_reg)
 
-# ---- Authentication ----
-auth_img = cv2.imread("known_faces\\Professional Photo.jpg")
-face_auth = preprocess_face(auth_img)
-auth_embedding = get_embedding(face_auth)
+def get_embeddings(faces):
+    """Run one batched TFLite invoke over an (N, 112, 112, 3) stack; returns (N, D) embeddings."""
+    faces = np.ascontiguousarray(faces, dtype=np.float32)
+    _ensure_batch_size(faces.shape[0])
+    interpreter.set_tensor(input_details[0]['index'], faces)
+    interpreter.invoke()
+    return interpreter.get_tensor(output_details[0]['index']).reshape(faces.shape[0], -1)
+
+
+def embed_image(image):
+    """
+    Embedding of the first face in a BGR frame, or None. The preprocessed face
+    is written straight into the interpreter's input tensor, so no intermediate
+    input array is created.
+    """
+    _ensure_batch_size(1)
+    # The tensor view must be released before invoke(), hence the short-lived reference.
+    view = interpreter.tensor(input_details[0]['index'])()
+    face = _get_preprocessor()(image, out=view)
+    del view
+    if face is None:
+        return None
+    del face
+    interpreter.invoke()
+    return interpreter.get_tensor(output_details[0]['index']).flatten()
+
+
+def embed_images(images):
+    """
+    Embedding of the first face in each BGR frame, None for frames without
+    one (or that failed to decode), from a single batched invoke.
+    """
+    decoded = [i for i, image in enumerate(images) if image is not None]
+    faces, kept = _get_preprocessor().preprocess_batch([images[i] for i in decoded])
+    embeddings = [None] * len(images)
+    if kept:
+        for i, embedding in zip(kept, get_embeddings(faces)):
+            embeddings[decoded[i]] = embedding
+    return embeddings
+
+
+def cosine_similarity(a, b):
+    """Cosine similarity between two embeddings (1.0 = identical direction)."""
+    a = np.asarray(a, dtype=np.float32).ravel()
+    b = np.asarray(b, dtype=np.float32).ravel()
+    return float(np.dot(a, b) / max(np.linalg.norm(a) * np.linalg.norm(b), 1e-12))
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Compare a registration photo against an authentication photo.")
+    ap.add_argument("--reg", default="known_faces\\WhatsApp Image 2025-09-07 at 16.53.23_0779b327.jpg",
+                    help="Registration image path.")
+    ap.add_argument("--auth", default="known_faces\\Professional Photo.jpg", help="Authentication image path.")
+    ap.add_argument("--model", default=None, help="TFLite model path (overrides --profile).")
+    ap.add_argument("--profile", default=DEFAULT_PROFILE, choices=sorted(PROFILES), help="Execution profile.")
+    args = ap.parse_args()
+
+    if args.model:
+        load_model(args.model)
+    else:
+        load_profile(args.profile)
+
+    # ---- Registration ----
+    reg_img = cv2.imread(args.reg)
+    face_reg = preprocess_face(reg_img)
+    registered_embedding = get_embedding(face_reg)
+
+    # ---- Authentication ----
+    auth_img = cv2.imread(args.auth)
+    face_auth = preprocess_face(auth_img)
+    auth_embedding = get_embedding(face_auth)
+
+    similarity = cosine_similarity(registered_embedding, auth_embedding)
+    print("Similarity Score:", similarity)
+
+    if similarity > SIMILARITY_THRESHOLD:
+        print("✅ Authentication Success")
+    else:
+        print("❌ Authentication Failed")
 
-similarity = 1 - cosine(registered_embedding, auth_embedding)
-print("Similarity Score:", similarity)
 
-if similarity > 0.75:
-    print("✅ Authentication Success")
-else:
-    print("❌ Authentication Failed")
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+import argparse
+from dataclasses import dataclass
+from pathlib import Path
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+CURRENT_THRESHOLD = 0.75  # MobileFaceNet_Optimized.SIMILARITY_THRESHOLD
+
+# Binary score file: a .npy structured array with one record per attempt.
+# Memory-mapped and read in chunks, so files larger than RAM are fine.
+SCORE_RECORD = np.dtype([("score", "<f4"), ("genuine", "u1")])
+
+_GENUINE_WORDS = {"genuine", "1", "true", "yes", "y", "same", "match"}
+_IMPOSTER_WORDS = {"imposter", "impostor", "0", "false", "no", "n", "different", "nonmatch"}
+
+
+@dataclass(frozen=True)
+class Curve:
+    """
+    Operating points, one per distinct score, ordered by falling threshold.
+    A score is accepted if it is > threshold, as in the server and face_index.
+    """
+    thresholds: np.ndarray
+    far: np.ndarray
+    frr: np.ndarray
+    genuine_total: int
+    imposter_total: int
+
+    @property
+    def tar(self) -> np.ndarray:
+        return 1.0 - self.frr
+
+
+def _labels_from_chunk(chunk: pd.DataFrame) -> np.ndarray:
+    """Genuine flag per row from a `label`/`genuine` column, or from claimed_reg == actual_reg."""
+    for col in ("label", "genuine"):
+        if col in chunk.columns:
+            words = chunk[col].astype(str).str.strip().str.lower()
+            # Lookup on the distinct values only; label columns have a handful of them.
+            uniques, codes = np.unique(words.to_numpy(), return_inverse=True)
+            table = np.array([u in _GENUINE_WORDS for u in uniques], dtype=bool)
+            unknown = [u for u in uniques if u not in _GENUINE_WORDS and u not in _IMPOSTER_WORDS]
+            if unknown:
+                raise ValueError(f"Unrecognised {col} values: {', '.join(unknown[:5])}")
+            return table[codes]
+    if {"claimed_reg", "actual_reg"} <= set(chunk.columns):
+        claimed = chunk["claimed_reg"].astype(str).str.strip().to_numpy()
+        actual = chunk["actual_reg"].astype(str).str.strip().to_numpy()
+        return claimed == actual
+    raise ValueError("CSV needs a label/genuine column, or claimed_reg and actual_reg.")
+
+
+def iter_score_chunks(path: Path, chunksize: int):
+    """Yield (scores float32, genuine bool) arrays from a CSV or a SCORE_RECORD .npy file."""
+    if not path.exists():
+        raise FileNotFoundError(f"Input file not found: {path}")
+
+    if path.suffix == ".npy":
+        records = np.load(path, mmap_mode="r")
+        if records.dtype != SCORE_RECORD:
+            raise ValueError(f"{path} is not a score file (expected dtype {SCORE_RECORD}).")
+        for start in range(0, len(records), chunksize):
+            block = records[start:start + chunksize]
+            yield np.asarray(block["score"], dtype=np.float32), np.asarray(block["genuine"], dtype=bool)
+        return
+
+    for chunk in pd.read_csv(path, chunksize=chunksize, dtype=str, keep_default_na=False):
+        if "score" not in chunk.columns:
+            raise ValueError("CSV needs a score column.")
+        scores = pd.to_numeric(chunk["score"], errors="coerce").to_numpy(dtype=np.float32)
+        genuine = _labels_from_chunk(chunk)
+        keep = ~np.isnan(scores)
+        yield scores[keep], genuine[keep]
+
+
+def load_scores(paths: list[Path], chunksize: int = 1_000_000) -> tuple[np.ndarray, np.ndarray]:
+    scores, genuine = [], []
+    for path in paths:
+        for s, g in iter_score_chunks(path, chunksize):
+            scores.append(s)
+            genuine.append(g)
+    if not scores:
+        return np.empty(0, dtype=np.float32), np.empty(0, dtype=bool)
+    return np.concatenate(scores), np.concatenate(genuine)
+
+
+def write_binary(path: Path, scores: np.ndarray, genuine: np.ndarray) -> None:
+    records = np.empty(len(scores), dtype=SCORE_RECORD)
+    records["score"] = scores
+    records["genuine"] = genuine
+    np.save(path, records)
+
+
+def compute_curve(scores: np.ndarray, genuine: np.ndarray) -> Curve:
+    """
+    One sort plus two cumulative sums give TAR/FAR at every distinct score.
+    Walking down the sorted scores, the genuine and imposter counts strictly
+    above threshold s are the running totals at the last occurrence of the
+    next higher distinct score (zero for the highest score).
+    """
+    genuine_total = int(genuine.sum())
+    imposter_total = int(len(genuine) - genuine_total)
+    if genuine_total == 0 or imposter_total == 0:
+        raise ValueError("Need both genuine and imposter scores to calibrate.")
+
+    order = np.argsort(-scores, kind="stable")
+    s = scores[order]
+    g = genuine[order]
+    accepted_genuine = np.cumsum(g, dtype=np.int64)
+    accepted_imposter = np.arange(1, len(s) + 1, dtype=np.int64) - accepted_genuine
+
+    last = np.flatnonzero(np.r_[s[1:] != s[:-1], True])
+    above_genuine = np.r_[0, accepted_genuine[last[:-1]]]
+    above_imposter = np.r_[0, accepted_imposter[last[:-1]]]
+    return Curve(
+        thresholds=s[last],
+        far=above_imposter / imposter_total,
+        frr=1.0 - above_genuine / genuine_total,
+        genuine_total=genuine_total,
+        imposter_total=imposter_total,
+    )
+
+
+def equal_error_rate(curve: Curve) -> tuple[float, float]:
+    """(EER, threshold) at the FAR/FRR crossing, linearly interpolated between neighbouring points."""
+    diff = curve.far - curve.frr  # rises as the threshold falls
+    k = int(np.searchsorted(diff, 0.0))
+    if k == 0:
+        return float((curve.far[0] + curve.frr[0]) / 2), float(curve.thresholds[0])
+    if k >= len(diff):
+        return float((curve.far[-1] + curve.frr[-1]) / 2), float(curve.thresholds[-1])
+    d0, d1 = diff[k - 1], diff[k]
+    w = 0.0 if d1 == d0 else -d0 / (d1 - d0)
+    eer = (1 - w) * curve.far[k - 1] + w * curve.far[k]
+    threshold = (1 - w) * curve.thresholds[k - 1] + w * curve.thresholds[k]
+    return float(eer), float(threshold)
+
+
+def threshold_for_far(curve: Curve, target_far: float) -> tuple[float, float, float]:
+    """Lowest threshold whose FAR stays <= target: (threshold, far, tar)."""
+    k = int(np.searchsorted(curve.far, target_far, side="right")) - 1
+    if k < 0:
+        return float("inf"), 0.0, 0.0
+    return float(curve.thresholds[k]), float(curve.far[k]), float(curve.tar[k])
+
+
+def rates_at(curve: Curve, threshold: float) -> tuple[float, float]:
+    """(FAR, FRR) when accepting score > threshold."""
+    # Accepted scores are those of the distinct scores above the threshold,
+    # i.e. the operating point of the highest distinct score <= threshold.
+    k = int(np.searchsorted(-curve.thresholds, -threshold, side="left"))
+    if k >= len(curve.thresholds):
+        return 1.0, 0.0
+    return float(curve.far[k]), float(curve.frr[k])
+
+
+def sample_curve(curve: Curve, points: int) -> pd.DataFrame:
+    """Thin the curve to about `points` rows, evenly spaced in log(FAR), with DET (probit) coordinates."""
+    far_floor = 1.0 / curve.imposter_total
+    grid = np.geomspace(far_floor, 1.0, points)
+    idx = np.unique(np.clip(np.searchsorted(curve.far, grid, side="right") - 1, 0, len(curve.far) - 1))
+    probit = np.vectorize(lambda p: NormalDist().inv_cdf(min(max(p, 1e-12), 1 - 1e-12)))
+    return pd.DataFrame({
+        "threshold": curve.thresholds[idx],
+        "far": curve.far[idx],
+        "frr": curve.frr[idx],
+        "tar": curve.tar[idx],
+        "det_far_probit": probit(curve.far[idx]),
+        "det_frr_probit": probit(curve.frr[idx]),
+    })
+
+
+def pct(x: float) -> str:
+    return f"{x * 100:.4f}%"
+
+
+def main():
+    ap = argparse.ArgumentParser(
+        description="Calibrate the face verification threshold from genuine/imposter similarity scores."
+    )
+    ap.add_argument(
+        "inputs",
+        nargs="+",
+        help="Score CSVs (score + label/genuine, or score + claimed_reg/actual_reg) or .npy score files.",
+    )
+    ap.add_argument("--target-far", type=float, nargs="+", default=[1e-2, 1e-3, 1e-4])
+    ap.add_argument("--chunksize", type=int, default=1_000_000, help="Rows per CSV/binary chunk.")
+    ap.add_argument("--curve-out", default=None, help="Write the sampled ROC/DET curve to this CSV.")
+    ap.add_argument("--curve-points", type=int, default=1000)
+    ap.add_argument("--write-binary", default=None, help="Also save all scores as a .npy score file.")
+    args = ap.parse_args()
+
+    scores, genuine = load_scores([Path(p) for p in args.inputs], args.chunksize)
+    if args.write_binary:
+        write_binary(Path(args.write_binary), scores, genuine)
+
+    curve = compute_curve(scores, genuine)
+    eer, eer_threshold = equal_error_rate(curve)
+
+    print("\n=== Threshold calibration (accept if score > threshold) ===")
+    print(f"Genuine scores             : {curve.genuine_total}")
+    print(f"Imposter scores            : {curve.imposter_total}")
+    print(f"Distinct thresholds        : {len(curve.thresholds)}")
+    print(f"EER                        : {pct(eer)} at threshold {eer_threshold:.4f}")
+
+    far, frr = rates_at(curve, CURRENT_THRESHOLD)
+    print(f"\nAt current threshold {CURRENT_THRESHOLD}: FAR {pct(far)}  FRR {pct(frr)}  TAR {pct(1 - frr)}")
+
+    print("\nThreshold for target FAR:")
+    for target in args.target_far:
+        threshold, far, tar = threshold_for_far(curve, target)
+        if np.isinf(threshold):
+            print(f"  FAR <= {target:g}: not reachable with these scores")
+        else:
+            print(f"  FAR <= {target:g}: threshold {threshold:.4f}  (FAR {pct(far)}, TAR {pct(tar)})")
+
+    if args.curve_out:
+        sample_curve(curve, args.curve_points).to_csv(args.curve_out, index=False)
+        print(f"\nCurve written to {args.curve_out}")
+
+
+if __name__ == "__main__":
+    main()
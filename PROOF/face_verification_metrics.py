@@ -1,7 +1,16 @@
 import argparse
 import csv
+import math
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass
 from pathlib import Path
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+_ACCEPT_WORDS = {"accept", "accepted", "true", "1", "yes", "y", "ok", "pass"}
+_REJECT_WORDS = {"reject", "rejected", "false", "0", "no", "n", "fail"}
 
 
 @dataclass(frozen=True)
@@ -12,6 +21,21 @@ class Counts:
     fp: int  # imposter accepted
     tn: int  # imposter rejected
 
+    def __add__(self, other: "Counts") -> "Counts":
+        return Counts(
+            total=self.total + other.total,
+            tp=self.tp + other.tp,
+            fn=self.fn + other.fn,
+            fp=self.fp + other.fp,
+            tn=self.tn + other.tn,
+        )
+
+    @classmethod
+    def from_outcomes(cls, counts) -> "Counts":
+        """From a length-4 [tp, fn, fp, tn] array (see _OUTCOMES)."""
+        tp, fn, fp, tn = (int(x) for x in counts)
+        return cls(total=tp + fn + fp + tn, tp=tp, fn=fn, fp=fp, tn=tn)
+
 
 def _norm(s: str | None) -> str:
     return (s or "").strip()
@@ -32,9 +56,9 @@ def _parse_decision(row: dict[str, str]) -> bool:
 
     def to_bool(v: str) -> bool | None:
         v = v.lower()
-        if v in {"accept", "accepted", "true", "1", "yes", "y", "ok", "pass"}:
+        if v in _ACCEPT_WORDS:
             return True
-        if v in {"reject", "rejected", "false", "0", "no", "n", "fail"}:
+        if v in _REJECT_WORDS:
             return False
         return None
 
@@ -97,24 +121,344 @@ def compute_counts(csv_path: Path) -> Counts:
     return Counts(total=total, tp=tp, fn=fn, fp=fp, tn=tn)
 
 
-def pct(n: int, d: int) -> str:
-    if d <= 0:
-        return "n/a"
-    return f"{(n / d) * 100:.2f}%"
+# Outcome codes used by the columnar path: index into [tp, fn, fp, tn].
+_OUTCOMES = ("tp", "fn", "fp", "tn")
 
 
-def main():
-    ap = argparse.ArgumentParser(
-        description="Compute face verification metrics (TP/FN/FP/TN) from a labeled attempts CSV."
+def _stripped_codes(values: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Factorize strings by their stripped value: (per-row codes, vocabulary).
+    Only the distinct values are stripped in Python; rows are mapped back
+    through a hash-based factorize and an array gather.
+    """
+    codes, uniques = pd.factorize(values)
+    stripped = np.array([_norm(u) for u in uniques], dtype=object)
+    merged, vocab = pd.factorize(stripped)
+    return merged[codes], np.asarray(vocab, dtype=object)
+
+
+def _decision_table(values: np.ndarray) -> np.ndarray:
+    """
+    Map raw decision strings to 1 (accept), 0 (reject) or -1 (unrecognised)
+    with a lookup table built over the distinct values only.
+    """
+    codes, vocab = _stripped_codes(values)
+    table = np.full(len(vocab), -1, dtype=np.int8)
+    for i, v in enumerate(vocab):
+        v = v.lower()
+        if v in _ACCEPT_WORDS:
+            table[i] = 1
+        elif v in _REJECT_WORDS:
+            table[i] = 0
+    return table[codes]
+
+
+def _chunk_outcomes(chunk: pd.DataFrame) -> tuple[np.ndarray, np.ndarray]:
+    """(claimed_reg, outcome code) for the complete rows of one chunk; same rules as _parse_decision."""
+    chunk = chunk.fillna("")
+    n = len(chunk)
+    # One shared vocabulary for claimed and actual, so genuine is an integer comparison.
+    codes, vocab = _stripped_codes(np.concatenate([chunk["claimed_reg"].to_numpy(), chunk["actual_reg"].to_numpy()]))
+    claimed, actual = codes[:n], codes[n:]
+    empty = vocab == ""
+    complete = ~empty[claimed] & ~empty[actual]
+
+    accepted = np.full(n, -1, dtype=np.int8)
+    for col in ("decision", "accepted"):
+        if col in chunk.columns:
+            undecided = accepted < 0
+            accepted[undecided] = _decision_table(chunk[col].to_numpy())[undecided]
+    undecided = accepted < 0
+    if undecided.any():
+        matched = np.zeros(n, dtype=bool)
+        for col in ("matched_reg", "predicted_reg"):
+            if col in chunk.columns:
+                col_codes, col_vocab = _stripped_codes(chunk[col].to_numpy())
+                matched |= (col_vocab != "")[col_codes]
+        accepted[undecided] = matched[undecided]
+
+    genuine = claimed == actual
+    outcome = (~genuine).astype(np.int8) * 2 + (accepted == 0)
+    return vocab[claimed[complete]], outcome[complete]
+
+
+def _check_columns(csv_path: Path) -> list[str]:
+    if not csv_path.exists():
+        raise FileNotFoundError(f"Input file not found: {csv_path}")
+    header = list(pd.read_csv(csv_path, nrows=0, encoding="utf-8", encoding_errors="replace").columns)
+    if not header:
+        raise ValueError("CSV has no header row.")
+    missing = sorted({"claimed_reg", "actual_reg"} - set(header))
+    if missing:
+        raise ValueError(f"Missing required columns: {', '.join(missing)}")
+    wanted = ["claimed_reg", "actual_reg", "decision", "accepted", "matched_reg", "predicted_reg"]
+    return [c for c in wanted if c in header]
+
+
+def compute_counts_columnar(
+    csv_path: Path, chunksize: int = 500_000, by_claimed: bool = False
+) -> tuple[Counts, dict[str, Counts]]:
+    """
+    Same counts as compute_counts, computed on column arrays read `chunksize`
+    rows at a time. With by_claimed, also returns a Counts per claimed
+    registration number (otherwise an empty dict).
+    """
+    usecols = _check_columns(csv_path)
+    totals = np.zeros(4, dtype=np.int64)
+    per_claimed: dict[str, np.ndarray] = {}
+
+    reader = pd.read_csv(
+        csv_path,
+        usecols=usecols,
+        dtype=str,
+        keep_default_na=False,
+        chunksize=chunksize,
+        encoding="utf-8",
+        encoding_errors="replace",
     )
-    ap.add_argument(
-        "csv",
-        help="Path to attempts CSV (must include claimed_reg, actual_reg, and decision/accepted or matched_reg).",
+    for chunk in reader:
+        claimed, outcome = _chunk_outcomes(chunk)
+        totals += np.bincount(outcome, minlength=4)
+        if by_claimed and len(claimed):
+            codes, regs = pd.factorize(claimed)
+            grid = np.bincount(codes * 4 + outcome, minlength=4 * len(regs)).reshape(len(regs), 4)
+            for reg, row in zip(regs, grid):
+                if reg in per_claimed:
+                    per_claimed[reg] += row
+                else:
+                    per_claimed[reg] = row.astype(np.int64)
+
+    return (
+        Counts.from_outcomes(totals),
+        {reg: Counts.from_outcomes(row) for reg, row in per_claimed.items()},
     )
-    args = ap.parse_args()
 
-    counts = compute_counts(Path(args.csv))
 
+def _columnar_task(args: tuple[str, int, bool]) -> tuple[Counts, dict[str, Counts]]:
+    path, chunksize, by_claimed = args
+    return compute_counts_columnar(Path(path), chunksize, by_claimed)
+
+
+def compute_counts_many(
+    csv_paths: list[Path], workers: int = 1, chunksize: int = 500_000, by_claimed: bool = False
+) -> tuple[dict[str, Counts], Counts, dict[str, Counts]]:
+    """Evaluate several attempt files (in parallel when workers > 1); returns (per_file, total, per_claimed)."""
+    tasks = [(str(p), chunksize, by_claimed) for p in csv_paths]
+    if workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+            results = list(pool.map(_columnar_task, tasks))
+    else:
+        results = [_columnar_task(t) for t in tasks]
+
+    per_file = {}
+    total = Counts(total=0, tp=0, fn=0, fp=0, tn=0)
+    per_claimed: dict[str, Counts] = {}
+    for (path, _, _), (counts, claimed) in zip(tasks, results):
+        per_file[path] = counts
+        total = total + counts
+        for reg, c in claimed.items():
+            per_claimed[reg] = per_claimed[reg] + c if reg in per_claimed else c
+    return per_file, total, per_claimed
+
+
+# ---- Confidence intervals ----
+#
+# Rates are binomial proportions: TAR = TP / genuine, FRR = FN / genuine,
+# FAR = FP / imposter. Wilson and Clopper-Pearson are closed form; the
+# bootstrap resamples attempts with replacement.
+
+_RATES = {
+    "TAR": (0, (0, 1)),  # numerator outcome index, denominator outcome indices
+    "FRR": (1, (0, 1)),
+    "FAR": (2, (2, 3)),
+}
+
+
+def wilson_interval(k: int, n: int, confidence: float = 0.95) -> tuple[float, float]:
+    if n <= 0:
+        return float("nan"), float("nan")
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    p = k / n
+    denom = 1 + z * z / n
+    centre = (p + z * z / (2 * n)) / denom
+    half = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / denom
+    return max(0.0, centre - half), min(1.0, centre + half)
+
+
+def _betacf(a: float, b: float, x: float) -> float:
+    """Continued fraction for the regularized incomplete beta function (modified Lentz)."""
+    tiny = 1e-300
+    qab, qap, qam = a + b, a + 1.0, a - 1.0
+    c, d = 1.0, 1.0 - qab * x / qap
+    d = 1.0 / (d if abs(d) > tiny else tiny)
+    h = d
+    for m in range(1, 100_000):
+        m2 = 2 * m
+        aa = m * (b - m) * x / ((qam + m2) * (a + m2))
+        d = 1.0 + aa * d
+        d = 1.0 / (d if abs(d) > tiny else tiny)
+        c = 1.0 + aa / c
+        c = c if abs(c) > tiny else tiny
+        h *= d * c
+        aa = -(a + m) * (qab + m) * x / ((a + m2) * (qap + m2))
+        d = 1.0 + aa * d
+        d = 1.0 / (d if abs(d) > tiny else tiny)
+        c = 1.0 + aa / c
+        c = c if abs(c) > tiny else tiny
+        delta = d * c
+        h *= delta
+        if abs(delta - 1.0) < 1e-15:
+            break
+    return h
+
+
+def _betainc(a: float, b: float, x: float) -> float:
+    """Regularized incomplete beta I_x(a, b)."""
+    if x <= 0.0:
+        return 0.0
+    if x >= 1.0:
+        return 1.0
+    log_front = math.lgamma(a + b) - math.lgamma(a) - math.lgamma(b) + a * math.log(x) + b * math.log1p(-x)
+    if x < (a + 1.0) / (a + b + 2.0):
+        return math.exp(log_front) * _betacf(a, b, x) / a
+    return 1.0 - math.exp(log_front) * _betacf(b, a, 1.0 - x) / b
+
+
+def _beta_ppf(q: float, a: float, b: float) -> float:
+    lo, hi = 0.0, 1.0
+    for _ in range(100):
+        mid = (lo + hi) / 2
+        if _betainc(a, b, mid) < q:
+            lo = mid
+        else:
+            hi = mid
+    return (lo + hi) / 2
+
+
+def clopper_pearson_interval(k: int, n: int, confidence: float = 0.95) -> tuple[float, float]:
+    """Exact binomial interval from beta quantiles (pure Python, no scipy needed)."""
+    if n <= 0:
+        return float("nan"), float("nan")
+    alpha = 1 - confidence
+    lo = 0.0 if k == 0 else _beta_ppf(alpha / 2, k, n - k + 1)
+    hi = 1.0 if k == n else _beta_ppf(1 - alpha / 2, k + 1, n - k)
+    return lo, hi
+
+
+def _boot_index_task(args: tuple[int, int, int, tuple[int, ...]]) -> np.ndarray:
+    """
+    Worker: `resamples` bootstrap resamples as index arrays; returns (resamples, 4) counts.
+
+    The outcome codes are laid out as contiguous tp/fn/fp/tn runs, so the
+    outcome of a resampled index is the run it falls into and counting
+    indices below each run boundary replaces gathering and bincounting codes.
+    Each index is floor(w * n / 2**bits) of a raw random word w, so
+    "index < edge" is "w < ceil(edge * 2**bits / n)": the words are compared
+    against precomputed cutoffs and never turned into indices. That halves
+    the cost of bounded integer draws; a resample is still O(n), about 8 ms
+    at 3M attempts.
+    """
+    seed, resamples, n, edges = args
+    bit_generator = np.random.PCG64(seed)
+    bits, dtype = (32, np.uint32) if n < 2**32 else (64, np.uint64)
+    words_per_raw = 64 // bits
+    cutoffs = [-(-(e << bits) // n) for e in edges]  # ceil
+    out = np.empty((resamples, 4), dtype=np.int64)
+    for r in range(resamples):
+        words = bit_generator.random_raw(-(-n // words_per_raw)).view(dtype)[:n]
+        below = [n if c >> bits else np.count_nonzero(words < dtype(c)) for c in cutoffs]
+        out[r] = np.diff([0, *below, n])
+    return out
+
+
+def bootstrap_counts(
+    counts: Counts, resamples: int = 10_000, method: str = "multinomial", workers: int = 1, seed: int = 7
+) -> np.ndarray:
+    """
+    (resamples, 4) bootstrap [tp, fn, fp, tn] counts.
+
+    "index" resamples row-index arrays over the attempts, spread over a
+    process pool; it costs O(n) per resample (about 80 s per 10k resamples
+    of 3M attempts on one core). "multinomial" draws the four counts of each resample
+    directly: resampling n attempts with replacement is a multinomial(n,
+    observed proportions) draw, so it has the same distribution as "index"
+    at O(1) cost per resample instead of O(n).
+    """
+    observed = np.array([counts.tp, counts.fn, counts.fp, counts.tn], dtype=np.int64)
+    n = int(observed.sum())
+    if n == 0:
+        return np.zeros((resamples, 4), dtype=np.int64)
+
+    if method == "multinomial":
+        rng = np.random.default_rng(seed)
+        return rng.multinomial(n, observed / n, size=resamples)
+    if method != "index":
+        raise ValueError(f"Unknown bootstrap method: {method}")
+
+    # Attempts are exchangeable under the bootstrap, so sorting them into
+    # tp/fn/fp/tn runs loses nothing.
+    edges = tuple(int(e) for e in np.cumsum(observed)[:3])
+    workers = max(1, workers)
+    shares = [resamples // workers + (1 if i < resamples % workers else 0) for i in range(workers)]
+    seeds = np.random.SeedSequence(seed).generate_state(workers)
+    tasks = [(int(s), k, n, edges) for s, k in zip(seeds, shares) if k]
+    if workers == 1:
+        parts = [_boot_index_task(t) for t in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parts = list(pool.map(_boot_index_task, tasks))
+    return np.concatenate(parts)
+
+
+def bootstrap_intervals(samples: np.ndarray, confidence: float = 0.95) -> dict[str, tuple[float, float]]:
+    """Percentile intervals of TAR/FRR/FAR over bootstrap count samples."""
+    alpha = (1 - confidence) / 2
+    result = {}
+    with np.errstate(invalid="ignore", divide="ignore"):
+        for name, (num, den) in _RATES.items():
+            rates = samples[:, num] / samples[:, list(den)].sum(axis=1)
+            if np.isnan(rates).all():
+                result[name] = (float("nan"), float("nan"))
+            else:
+                lo, hi = np.nanquantile(rates, [alpha, 1 - alpha])
+                result[name] = (float(lo), float(hi))
+    return result
+
+
+def rate_intervals(
+    counts: Counts,
+    confidence: float = 0.95,
+    resamples: int = 10_000,
+    method: str = "multinomial",
+    workers: int = 1,
+    seed: int = 7,
+) -> dict[str, dict[str, tuple[float, float]]]:
+    """Point estimate plus Wilson, Clopper-Pearson and bootstrap intervals for TAR, FRR and FAR."""
+    observed = [counts.tp, counts.fn, counts.fp, counts.tn]
+    boot = None
+    if resamples > 0:
+        boot = bootstrap_intervals(bootstrap_counts(counts, resamples, method, workers, seed), confidence)
+    out = {}
+    for name, (num, den) in _RATES.items():
+        k = observed[num]
+        n = sum(observed[i] for i in den)
+        out[name] = {
+            "point": (k / n, k / n) if n else (float("nan"), float("nan")),
+            "wilson": wilson_interval(k, n, confidence),
+            "clopper_pearson": clopper_pearson_interval(k, n, confidence),
+        }
+        if boot is not None:
+            out[name]["bootstrap"] = boot[name]
+    return out
+
+
+def pct(n: int, d: int) -> str:
+    if d <= 0:
+        return "n/a"
+    return f"{(n / d) * 100:.2f}%"
+
+
+def _print_counts(counts: Counts) -> None:
     print("\n=== Face verification metrics (confusion matrix) ===")
     print(f"Total attempts             : {counts.total}")
     print(f"True verifications (TP)    : {counts.tp}  ({pct(counts.tp, counts.total)})")
@@ -137,6 +481,89 @@ def main():
     print(f"  FAR (FP rate)            : {pct(counts.fp, imposter_total)}")
 
 
+def _write_per_claimed(path: Path, per_claimed: dict[str, Counts]) -> None:
+    with path.open("w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(["claimed_reg", "total", "tp", "fn", "fp", "tn", "tar", "frr", "far"])
+        for reg in sorted(per_claimed):
+            c = per_claimed[reg]
+            w.writerow([reg, c.total, c.tp, c.fn, c.fp, c.tn,
+                        pct(c.tp, c.tp + c.fn), pct(c.fn, c.tp + c.fn), pct(c.fp, c.fp + c.tn)])
+
+
+def main():
+    ap = argparse.ArgumentParser(
+        description="Compute face verification metrics (TP/FN/FP/TN) from labeled attempts CSVs."
+    )
+    ap.add_argument(
+        "csv",
+        nargs="+",
+        help="Path(s) to attempts CSV (must include claimed_reg, actual_reg, and decision/accepted or matched_reg).",
+    )
+    ap.add_argument(
+        "--engine",
+        choices=["columnar", "rows"],
+        default="columnar",
+        help="columnar: chunked array evaluation (default); rows: original row-by-row reader.",
+    )
+    ap.add_argument("--workers", type=int, default=1,
+                    help="Files evaluated in parallel (columnar engine), and processes for --bootstrap-method index.")
+    ap.add_argument("--chunksize", type=int, default=500_000, help="Rows per chunk (columnar engine).")
+    ap.add_argument("--by-claimed", type=int, default=0, metavar="N",
+                    help="Show the N claimed registration numbers with the most errors (columnar engine).")
+    ap.add_argument("--by-claimed-out", default=None, help="Write the full per-claimed breakdown to this CSV.")
+    ap.add_argument("--ci", action="store_true", help="Report confidence intervals for TAR, FRR and FAR.")
+    ap.add_argument("--confidence", type=float, default=0.95)
+    ap.add_argument("--bootstrap", type=int, default=10_000, help="Bootstrap resamples for --ci (0 to skip).")
+    ap.add_argument(
+        "--bootstrap-method",
+        choices=["multinomial", "index"],
+        default="multinomial",
+        help="multinomial: draw resampled counts directly, seconds for any size (default); index: resample row "
+        "indices over --workers processes, O(attempts) per resample (~8 ms each at 3M attempts).",
+    )
+    ap.add_argument("--seed", type=int, default=7)
+    args = ap.parse_args()
+
+    paths = [Path(p) for p in args.csv]
+    if args.engine == "rows":
+        per_file = {str(p): compute_counts(p) for p in paths}
+        counts = sum(per_file.values(), Counts(total=0, tp=0, fn=0, fp=0, tn=0))
+        per_claimed = {}
+    else:
+        by_claimed = bool(args.by_claimed or args.by_claimed_out)
+        per_file, counts, per_claimed = compute_counts_many(paths, args.workers, args.chunksize, by_claimed)
+
+    if len(per_file) > 1:
+        print("\nPer file:")
+        for path, c in per_file.items():
+            print(f"  {path}: total={c.total} tp={c.tp} fn={c.fn} fp={c.fp} tn={c.tn}")
+
+    _print_counts(counts)
+
+    if args.ci:
+        intervals = rate_intervals(
+            counts, args.confidence, args.bootstrap, args.bootstrap_method, args.workers, args.seed
+        )
+        print(f"\n{args.confidence * 100:g}% confidence intervals:")
+        print(f"  {'rate':<5} {'point':>9} {'Wilson':>21} {'Clopper-Pearson':>21} {'bootstrap':>21}")
+        for name, iv in intervals.items():
+            cells = [f"{iv[m][0] * 100:.2f}-{iv[m][1] * 100:.2f}%" if m in iv else "n/a"
+                     for m in ("wilson", "clopper_pearson", "bootstrap")]
+            print(f"  {name:<5} {iv['point'][0] * 100:>8.2f}% {cells[0]:>21} {cells[1]:>21} {cells[2]:>21}")
+
+    if args.by_claimed and per_claimed:
+        worst = sorted(per_claimed.items(), key=lambda kv: (kv[1].fn + kv[1].fp, kv[1].total), reverse=True)
+        print(f"\nClaimed registration numbers with the most errors (top {args.by_claimed}):")
+        for reg, c in worst[: args.by_claimed]:
+            print(
+                f"  {reg}: total={c.total} FRR={pct(c.fn, c.tp + c.fn)} FAR={pct(c.fp, c.fp + c.tn)}"
+                f" (fn={c.fn}, fp={c.fp})"
+            )
+    if args.by_claimed_out:
+        _write_per_claimed(Path(args.by_claimed_out), per_claimed)
+        print(f"\nPer-claimed breakdown written to {args.by_claimed_out}")
+
+
 if __name__ == "__main__":
     main()
-
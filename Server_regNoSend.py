@@ -1,19 +1,122 @@
-from flask import Flask, request, jsonify
-import pandas as pd
+from flask import Flask, Response, request, jsonify, g, stream_with_context
+from werkzeug.middleware.proxy_fix import ProxyFix
+import numpy as np
+import argparse
+import hmac
 import os
 import datetime
 import logging
 import time
 import threading
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as PoolTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+import MobileFaceNet_Optimized
+import attendance_bitmap
+import attendance_export
+from admission import AdmissionController, EndpointClass
+from batch_scheduler import MicroBatcher
+from embedding_cache import EmbeddingCache, model_fingerprint
+from idempotency import IdempotencyCache
+from roster_snapshot import load_roster, unpack_bitmap
+from response_encoding import EncodedBody, ResponseCache, dumps, get_serializer, negotiate_encoding
+from sessions import SessionRegistry, normalize_reg
+from timing_analytics import TimingStore
 
 app = Flask(__name__)
 
 CSV_FILE = "user_data.csv"
+# Binary copy of CSV_FILE (sorted fixed-width IDs, interned names) that is
+# memory-mapped on load; rebuilt when CSV_FILE changes.
+ROSTER_SNAPSHOT_FILE = "user_data.snapshot"
 VERIFIED_IDS_FILE = "verified_ids.csv"
 IP_TRACKING_FILE = "ip_tracking.csv"
 LOGS_FILE = "logs.csv"
 SCALABILITY_METRICS_FILE = "scalability_metrics.csv"
+FACE_EMBEDDINGS_DIR = "face_embeddings"
+# Per-session attendance lives in SESSIONS_DIR/<session id>/. Requests without
+# ?session= use the active session; the "default" session keeps the files above.
+SESSIONS_DIR = "sessions"
+
+# Face verification runs in worker processes so inference never holds the GIL
+# of the Flask request threads; defaults to one worker per core.
+VERIFY_WORKERS = int(os.environ.get("NETMARK_VERIFY_WORKERS", os.cpu_count() or 1))
+VERIFY_TIMEOUT_SECONDS = 30
+FACE_SIMILARITY_THRESHOLD = 0.75  # matches MobileFaceNet_Optimized.SIMILARITY_THRESHOLD
+# Replacing an existing face enrollment needs "Authorization: Bearer <token>" with
+# this token; without one configured, enrollments can only be created, never replaced.
+ADMIN_TOKEN = os.environ.get("NETMARK_ADMIN_TOKEN") or None
+
+# Micro-batching of embedding inference: a batch runs when it holds BATCH_MAX_SIZE
+# faces or its oldest face has waited BATCH_MAX_WAIT_MS.
+BATCH_MAX_SIZE = int(os.environ.get("NETMARK_BATCH_MAX_SIZE", 16))
+BATCH_MAX_WAIT_MS = float(os.environ.get("NETMARK_BATCH_MAX_WAIT_MS", 5))
+
+# Embedding cache keyed by image hash + model + preprocessing, so retried or
+# re-submitted photos skip detection and inference. Set NETMARK_EMBEDDING_CACHE_DIR
+# to keep entries on disk across restarts.
+MODEL_PROFILE = MobileFaceNet_Optimized.DEFAULT_PROFILE  # MOBILEFACENET_PROFILE
+FACE_PREPROCESS_PARAMS = "mediapipe-short-range;conf=0.5;rgb;112x112;[-1,1]"  # bump when preprocess_face changes
+EMBEDDING_CACHE_SIZE = int(os.environ.get("NETMARK_EMBEDDING_CACHE_SIZE", 4096))
+EMBEDDING_CACHE_DIR = os.environ.get("NETMARK_EMBEDDING_CACHE_DIR") or None
+
+# Columnar copy of logs.csv for /verification_timing_stats, refreshed from the
+# last read offset. Set NETMARK_TIMING_STORE_DIR to persist it across restarts.
+TIMING_STORE_DIR = os.environ.get("NETMARK_TIMING_STORE_DIR") or None
+
+# Admission control: bounded in-flight requests per endpoint class with a short
+# wait queue; beyond that requests get 503 + Retry-After at once instead of
+# timing out in the backlog. The class caps (56 + 16) add up to more than the
+# global cap, so under load the 8 slots either class may use go to queued
+# marking requests first, while dashboard polling always keeps 8 of its own.
+# Endpoints not listed here (stress test control, admission metrics) are never shed.
+ADMISSION_MAX_IN_FLIGHT = int(os.environ.get("NETMARK_MAX_IN_FLIGHT", 64))
+ADMISSION_CLASSES = [
+    EndpointClass("mark", priority=0, max_in_flight=56, max_queue=256, queue_timeout_s=5.0, retry_after_s=1),
+    EndpointClass("dashboard", priority=1, max_in_flight=16, max_queue=32, queue_timeout_s=1.0, retry_after_s=5),
+]
+ENDPOINT_CLASSES = {
+    'get_user': 'mark',
+    'upload_unique_id': 'mark',
+    'mark_attendance': 'mark',
+    'mark_attendance_bulk': 'mark',
+    'enroll_face': 'mark',
+    'verify_face': 'mark',
+    'log_face_verification': 'mark',
+    'get_attendance_stats': 'dashboard',
+    'get_students': 'dashboard',
+    'search_students': 'dashboard',
+    'upload_csv': 'dashboard',
+    'verification_timing_stats': 'dashboard',
+    'get_inference_metrics': 'dashboard',
+    'get_scalability_metrics': 'dashboard',
+    'generate_scalability_report': 'dashboard',
+    'create_session': 'dashboard',
+    'list_sessions': 'dashboard',
+    'activate_session': 'dashboard',
+    'attendance_present': 'dashboard',
+    'attendance_absent': 'dashboard',
+    'attendance_present_in_all': 'dashboard',
+    'chronic_absentees': 'dashboard',
+    'export_attendance': 'dashboard',
+}
+
+# Retries of POST /upload_unique_id that carry the same Idempotency-Key header get
+# the first response again from this map instead of a "Duplicate attendance" 403.
+IDEMPOTENCY_TTL_SECONDS = float(os.environ.get("NETMARK_IDEMPOTENCY_TTL_S", 600))
+IDEMPOTENCY_CACHE_SIZE = int(os.environ.get("NETMARK_IDEMPOTENCY_CACHE_SIZE", 10000))
+IDEMPOTENCY_KEY_MAX_LENGTH = 128
+
+# Largest batch accepted by POST /mark_attendance/bulk.
+BULK_MARK_MAX_ITEMS = int(os.environ.get("NETMARK_BULK_MARK_MAX_ITEMS", 5000))
+
+# Roster responses (/students, /attendance_stats, /search_students) are serialized
+# with orjson when installed and cached pre-encoded until the roster or the
+# session's attendance changes. Bodies of at least COMPRESS_MIN_BYTES are sent
+# gzip/brotli compressed when the client accepts it.
+RESPONSE_CACHE_SIZE = int(os.environ.get("NETMARK_RESPONSE_CACHE_SIZE", 256))
+COMPRESS_MIN_BYTES = int(os.environ.get("NETMARK_COMPRESS_MIN_BYTES", 1024))
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -29,6 +132,22 @@ _scalability_metrics = {
 }
 _metrics_lock = threading.Lock()
 
+_sessions = SessionRegistry(SESSIONS_DIR, VERIFIED_IDS_FILE, IP_TRACKING_FILE)
+
+_admission = AdmissionController(ADMISSION_CLASSES, ADMISSION_MAX_IN_FLIGHT)
+_idempotency = IdempotencyCache(IDEMPOTENCY_CACHE_SIZE, IDEMPOTENCY_TTL_SECONDS)
+_response_cache = ResponseCache(RESPONSE_CACHE_SIZE)
+
+_roster = None
+_roster_lock = threading.Lock()
+
+_verify_pool = None
+_embedding_batcher = None
+_embedding_cache = None
+_verify_pool_lock = threading.Lock()
+
+_timing_store = TimingStore(LOGS_FILE, TIMING_STORE_DIR)
+
 def _ensure_logs_file():
     """Ensure logs.csv exists with the correct header."""
     header = "Registration Number,Timestamp,Face Verification Time (Seconds)\n"
@@ -75,6 +194,28 @@ def log_face_verification():
         logging.exception("Error logging face verification")
         return jsonify({"error": f"Error logging face verification: {e}"}), 500
 
+@app.route('/verification_timing_stats', methods=['GET'])
+def verification_timing_stats():
+    """p50/p95/p99 face verification time per hour, student or session, from the rows logged so far."""
+    try:
+        by = request.args.get('by', 'hour')
+        if by not in ('hour', 'student', 'session'):
+            return jsonify({"error": "by must be hour, student or session"}), 400
+        try:
+            window_hours = request.args.get('window_hours')
+            window_hours = float(window_hours) if window_hours else None
+            limit = int(request.args.get('limit', 50))
+        except ValueError:
+            return jsonify({"error": "window_hours and limit must be numbers"}), 400
+        if limit < 0:
+            return jsonify({"error": "limit must be >= 0"}), 400
+
+        _timing_store.refresh()
+        return _json_response(_timing_store.stats(by, window_hours, limit=limit))
+    except Exception as e:
+        logging.exception("Error getting verification timing stats")
+        return jsonify({"error": f"Error getting verification timing stats: {e}"}), 500
+
 # Middleware to track response times for scalability analysis
 @app.before_request
 def before_request():
@@ -93,6 +234,92 @@ def after_request(response):
                 _scalability_metrics['failed_requests'] += 1
     return response
 
+# Registered after the metrics hook so shed requests still show up in the metrics
+@app.before_request
+def admit_request():
+    endpoint_class = ENDPOINT_CLASSES.get(request.endpoint)
+    if endpoint_class is None:
+        return None
+    if not _admission.acquire(endpoint_class):
+        retry_after = _admission.retry_after(endpoint_class)
+        response = jsonify({"error": "Server busy, please retry", "retry_after": retry_after})
+        response.headers['Retry-After'] = str(retry_after)
+        return response, 503
+    g.admission_class = endpoint_class
+    return None
+
+@app.teardown_request
+def release_admission(exc):
+    endpoint_class = g.pop('admission_class', None)
+    if endpoint_class is not None:
+        _admission.release(endpoint_class)
+
+@app.route('/admission_metrics', methods=['GET'])
+def get_admission_metrics():
+    """
+    In-flight and queued requests per endpoint class, admissions, sheds and
+    queue waits; idempotent replays; roster response cache hits.
+    """
+    metrics = _admission.stats()
+    metrics["idempotency"] = _idempotency.stats()
+    metrics["response_cache"] = {"serializer": get_serializer()[0], **_response_cache.stats()}
+    return jsonify(metrics), 200
+
+def _request_session():
+    """The session named by ?session=, else the active one; None if it does not exist."""
+    return _sessions.get(request.args.get('session') or _sessions.active_id)
+
+
+def _unknown_session():
+    return jsonify({"error": f"Unknown session: {request.args.get('session') or _sessions.active_id}"}), 404
+
+
+@app.route('/sessions', methods=['POST'])
+def create_session():
+    """Create (or return the existing) session for a course, section and date; optionally make it active."""
+    try:
+        data = request.get_json(force=True, silent=True) or {}
+        try:
+            session, created = _sessions.create(
+                str(data.get('course', '')), str(data.get('section', '')), str(data.get('date') or '') or None
+            )
+        except ValueError as e:
+            return jsonify({"error": f"Invalid session: {e}"}), 400
+        if data.get('activate'):
+            _sessions.activate(session.id)
+        return jsonify({
+            "session": session.to_dict(),
+            "active": _sessions.active_id == session.id
+        }), 201 if created else 200
+    except Exception as e:
+        logging.exception("Error creating session")
+        return jsonify({"error": f"Error creating session: {e}"}), 500
+
+
+@app.route('/sessions', methods=['GET'])
+def list_sessions():
+    try:
+        return jsonify({
+            "active": _sessions.active_id,
+            "sessions": [s.to_dict() for s in _sessions.list()]
+        }), 200
+    except Exception as e:
+        return jsonify({"error": f"Error listing sessions: {e}"}), 500
+
+
+@app.route('/sessions/<session_id>/activate', methods=['POST'])
+def activate_session(session_id):
+    """Make a session the one used by requests that do not pass ?session=."""
+    try:
+        session = _sessions.get(session_id)
+        if session is None:
+            return jsonify({"error": f"Unknown session: {session_id}"}), 404
+        _sessions.activate(session.id)
+        return jsonify({"active": session.id}), 200
+    except Exception as e:
+        return jsonify({"error": f"Error activating session: {e}"}), 500
+
+
 @app.route('/upload_csv', methods=['POST'])
 def upload_csv():
     """Admin uploads the CSV file."""
@@ -110,6 +337,19 @@ def upload_csv():
         return jsonify({"error": f"Error uploading CSV: {e}"}), 500
 
 
+def _get_roster():
+    """
+    The roster in CSV_FILE, loaded from its snapshot and reloaded when the
+    CSV changes. Raises ValueError if the CSV lacks the required columns.
+    """
+    global _roster
+    stat = os.stat(CSV_FILE)
+    with _roster_lock:
+        if _roster is None or _roster.source != (stat.st_mtime_ns, stat.st_size):
+            _roster = load_roster(CSV_FILE, ROSTER_SNAPSHOT_FILE)
+        return _roster
+
+
 @app.route('/get_user/<unique_id>', methods=['GET'])  
 def get_user(unique_id):
     """Fetch user details by registration number."""
@@ -117,28 +357,27 @@ def get_user(unique_id):
         return jsonify({"error": "CSV not uploaded yet"}), 400
 
     try:
-        df = pd.read_csv(CSV_FILE)
-
-        # Ensure the column exists and compare as strings
-        if 'Registration Number' not in df.columns:
+        try:
+            roster = _get_roster()
+        except ValueError:
             return jsonify({"error": "Invalid CSV format"}), 400
-        
-        user_row = df[df['Registration Number'].astype(str).str.strip() == unique_id.strip()]
 
-        if user_row.empty:
+        row = roster.index(unique_id)
+        if row < 0:
             return jsonify({"error": "User not found"}), 404
 
-        user_name = user_row.iloc[0]['Name']
+        user_name = roster.name(row)
         
-        # Check if user has already marked attendance
-        if os.path.exists(VERIFIED_IDS_FILE):
-            verified_df = pd.read_csv(VERIFIED_IDS_FILE)
-            if str(unique_id) in verified_df['Registration Number'].astype(str).values:
-                return jsonify({
-                    "Registration Number": unique_id,
-                    "Name": user_name,
-                    "warning": "Attendance already marked"
-                }), 200
+        # Check if user has already marked attendance in this session
+        session = _request_session()
+        if session is None:
+            return _unknown_session()
+        if _sessions.attendance(session).is_present(unique_id):
+            return jsonify({
+                "Registration Number": unique_id,
+                "Name": user_name,
+                "warning": "Attendance already marked"
+            }), 200
 
         return jsonify({"Registration Number": unique_id, "Name": user_name}), 200  
 
@@ -146,96 +385,385 @@ def get_user(unique_id):
         return jsonify({"error": f"Error reading CSV: {e}"}), 500
 
 
+def _record_attendance(attendance, unique_id, client_ip):
+    """
+    Check the device and registration number for duplicates within the
+    session, then record attendance.
+
+    Returns (payload, status). Callers must hold attendance.lock so that the
+    duplicate checks and the writes happen as one step.
+    """
+    # Check IP tracking
+    if attendance.device_used(client_ip):
+        return {
+            "error": "Multiple attendance attempts detected",
+            "message": "Attendance has already been marked from this device. Multiple attempts are not allowed."
+        }, 403
+
+    # Check if ID already verified
+    if attendance.is_present(unique_id):
+        return {
+            "error": "Duplicate attendance",
+            "message": "Your attendance has already been marked. Multiple attempts are not allowed."
+        }, 403
+
+    # Record new attendance: appends one row to the verified IDs and IP tracking files
+    attendance.record(unique_id, client_ip)
+
+    return {
+        "message": "Attendance marked successfully",
+        "status": "success"
+    }, 200
+
+
+def _idempotent_replay(key, fingerprint):
+    """The cached response for a retried Idempotency-Key, a 422 if the key belongs to another request, or None."""
+    try:
+        cached = _idempotency.lookup(key, fingerprint)
+    except KeyError:
+        return jsonify({"error": "Idempotency-Key was already used for a different registration number or session"}), 422
+    if cached is None:
+        return None
+    payload, status = cached
+    response = jsonify(payload)
+    response.headers['Idempotent-Replayed'] = 'true'
+    return response, status
+
+
 @app.route('/upload_unique_id/<unique_id>', methods=['POST'])
 def upload_unique_id(unique_id):
     try:
-        client_ip = request.remote_addr
-
-        # Check IP tracking
-        if os.path.exists(IP_TRACKING_FILE):
-            ip_df = pd.read_csv(IP_TRACKING_FILE)
-            if client_ip in ip_df['IP'].values:
-                return jsonify({
-                    "error": "Multiple attendance attempts detected",
-                    "message": "Attendance has already been marked from this device. Multiple attempts are not allowed."
-                }), 403
-
-        # Check if ID already verified
-        if os.path.exists(VERIFIED_IDS_FILE):
-            verified_df = pd.read_csv(VERIFIED_IDS_FILE)
-            if str(unique_id) in verified_df['Registration Number'].astype(str).values:
-                return jsonify({
-                    "error": "Duplicate attendance",
-                    "message": "Your attendance has already been marked. Multiple attempts are not allowed."
-                }), 403
-
-        # Record new attendance
-        current_time = datetime.datetime.now()
-        
-        # Save verified ID
-        new_verification = pd.DataFrame({
-            'Registration Number': [unique_id],
-            'Timestamp': [current_time],
-            'IP': [client_ip]
-        })
+        key = request.headers.get('Idempotency-Key', '').strip()
+        if len(key) > IDEMPOTENCY_KEY_MAX_LENGTH:
+            return jsonify({"error": f"Idempotency-Key longer than {IDEMPOTENCY_KEY_MAX_LENGTH} characters"}), 400
+        session = _request_session()
+        if session is None:
+            return _unknown_session()
+        attendance = _sessions.attendance(session)
+        fingerprint = f"{session.id}:{unique_id}"
+
+        if key:
+            replay = _idempotent_replay(key, fingerprint)
+            if replay is not None:
+                return replay
+
+        with attendance.lock:
+            if key:
+                # A concurrent retry of the same request may have finished while we waited
+                replay = _idempotent_replay(key, fingerprint)
+                if replay is not None:
+                    return replay
+            payload, status = _record_attendance(attendance, unique_id, request.remote_addr)
+            if key:
+                _idempotency.store(key, fingerprint, payload, status)
+        return jsonify(payload), status
 
-        if os.path.exists(VERIFIED_IDS_FILE):
-            verified_df = pd.read_csv(VERIFIED_IDS_FILE)
-            verified_df = pd.concat([verified_df, new_verification], ignore_index=True)
-        else:
-            verified_df = new_verification
-        verified_df.to_csv(VERIFIED_IDS_FILE, index=False)
+    except Exception as e:
+        return jsonify({"error": f"Error recording attendance: {e}"}), 500
 
-        # Track IP
-        new_ip = pd.DataFrame({
-            'IP': [client_ip],
-            'Timestamp': [current_time]
-        })
-        
-        if os.path.exists(IP_TRACKING_FILE):
-            ip_df = pd.read_csv(IP_TRACKING_FILE)
-            ip_df = pd.concat([ip_df, new_ip], ignore_index=True)
-        else:
-            ip_df = new_ip
-        ip_df.to_csv(IP_TRACKING_FILE, index=False)
 
-        return jsonify({
-            "message": "Attendance marked successfully",
-            "status": "success"
-        }), 200
+def _verify_worker_init():
+    """Load the embedding model once per worker process (profile from MOBILEFACENET_PROFILE)."""
+    MobileFaceNet_Optimized.load_profile(MODEL_PROFILE)
+
+
+def _embed_jpegs(jpegs):
+    """
+    Worker task: decode and preprocess a batch of JPEGs, then embed every face
+    found in one model invoke. Returns one embedding per JPEG, None where no
+    face was found, so face crops never travel between processes.
+    """
+    import cv2
+
+    return MobileFaceNet_Optimized.embed_images(
+        [cv2.imdecode(np.frombuffer(j, dtype=np.uint8), cv2.IMREAD_COLOR) for j in jpegs]
+    )
+
+
+def _get_verify_pool():
+    global _verify_pool
+    with _verify_pool_lock:
+        if _verify_pool is None:
+            _verify_pool = ProcessPoolExecutor(max_workers=VERIFY_WORKERS, initializer=_verify_worker_init)
+        return _verify_pool
+
+
+def _reset_verify_pool(pool):
+    """
+    Replace `pool` after a timeout or a crashed worker, so later requests get
+    fresh workers. In-flight tasks on the old pool still finish (or fail) on it.
+    """
+    global _verify_pool
+    with _verify_pool_lock:
+        if _verify_pool is pool:
+            _verify_pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _run_in_pool(fn, *args):
+    """fn(*args) in a verify worker; the pool is rebuilt if the task times out or a worker dies."""
+    pool = _get_verify_pool()
+    try:
+        return pool.submit(fn, *args).result(timeout=VERIFY_TIMEOUT_SECONDS)
+    except (PoolTimeoutError, BrokenProcessPool):
+        _reset_verify_pool(pool)
+        raise
+
+
+def _get_embedding_batcher():
+    global _embedding_batcher
+    with _verify_pool_lock:
+        if _embedding_batcher is None:
+            _embedding_batcher = MicroBatcher(
+                lambda jpegs: _run_in_pool(_embed_jpegs, list(jpegs)),
+                max_batch_size=BATCH_MAX_SIZE,
+                max_wait_ms=BATCH_MAX_WAIT_MS,
+                workers=VERIFY_WORKERS,
+            )
+        return _embedding_batcher
+
 
+def _model_profile():
+    """The ExecutionProfile the verify workers load, so the cache fingerprints the model file actually run."""
+    if MODEL_PROFILE not in MobileFaceNet_Optimized.PROFILES:
+        raise ValueError(f"Unknown MOBILEFACENET_PROFILE {MODEL_PROFILE!r}")
+    return MobileFaceNet_Optimized.PROFILES[MODEL_PROFILE]
+
+
+def _get_embedding_cache():
+    global _embedding_cache
+    with _verify_pool_lock:
+        if _embedding_cache is None:
+            _embedding_cache = EmbeddingCache(
+                f"{model_fingerprint(_model_profile().model_path)}:{MODEL_PROFILE}:{FACE_PREPROCESS_PARAMS}",
+                capacity=EMBEDDING_CACHE_SIZE,
+                disk_dir=EMBEDDING_CACHE_DIR,
+            )
+        return _embedding_cache
+
+
+def _embed_jpeg(jpeg_bytes):
+    """
+    Face embedding for a JPEG, or None if no face is found. Cached by image
+    content; on a miss inference is micro-batched across requests.
+    """
+    cache = _get_embedding_cache()
+    key = cache.key(jpeg_bytes)
+    hit, embedding = cache.lookup(key)
+    if hit:
+        return embedding
+
+    # A 1-element object array, so the batcher stacks JPEGs without copying them
+    item = np.empty(1, dtype=object)
+    item[0] = jpeg_bytes
+    embedding = _get_embedding_batcher().submit(item).result(timeout=VERIFY_TIMEOUT_SECONDS)
+    cache.store(key, embedding)
+    return embedding
+
+
+def _pool_failure(e):
+    """Response for a face task that timed out or lost its worker process (the pool is rebuilt)."""
+    if isinstance(e, BrokenProcessPool):
+        logging.error(f"Face worker process died: {e}")
+        response = jsonify({"error": "Face verification worker restarted, please retry"})
+        response.headers['Retry-After'] = "1"
+        return response, 503
+    logging.error("Face verification timed out")
+    return jsonify({"error": "Face verification timed out, please retry"}), 504
+
+
+def _embedding_path(unique_id):
+    """Path of the stored embedding for a registration number, or None if the id is unsafe as a filename."""
+    unique_id = str(unique_id).strip()
+    if not unique_id or not unique_id.isalnum():
+        return None
+    return os.path.join(FACE_EMBEDDINGS_DIR, f"{unique_id}.npy")
+
+
+def _request_jpeg():
+    """JPEG bytes from an 'image' multipart field, or the raw request body."""
+    if 'image' in request.files:
+        return request.files['image'].read()
+    return request.get_data()
+
+
+def _is_admin():
+    """True if the request carries the configured ADMIN_TOKEN as a bearer token."""
+    if ADMIN_TOKEN is None:
+        return False
+    scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+    return scheme.lower() == 'bearer' and hmac.compare_digest(token.strip().encode(), ADMIN_TOKEN.encode())
+
+
+def _not_on_roster(unique_id):
+    """404 response if the roster is missing or does not list `unique_id`, else None."""
+    if not os.path.exists(CSV_FILE):
+        return jsonify({"error": "Student list not found"}), 404
+    if _get_roster().index(unique_id) < 0:
+        return jsonify({"error": "Registration number not found"}), 404
+    return None
+
+
+def _request_registration_number(unique_id=None):
+    if unique_id is None:
+        unique_id = request.form.get('registrationNumber') or request.args.get('registrationNumber')
+    return str(unique_id or '').strip()
+
+
+@app.route('/enroll_face/<unique_id>', methods=['POST'])
+def enroll_face(unique_id):
+    """
+    Store the reference face embedding for a registration number on the
+    roster. An existing enrollment is only replaced for an admin (see ADMIN_TOKEN).
+    """
+    try:
+        path = _embedding_path(unique_id)
+        if path is None:
+            return jsonify({"error": "Invalid registration number"}), 400
+        missing = _not_on_roster(unique_id)
+        if missing:
+            return missing
+        if os.path.exists(path) and not _is_admin():
+            return jsonify({"error": "Face already enrolled; re-enrollment needs admin authorization"}), 403
+
+        jpeg = _request_jpeg()
+        if not jpeg:
+            return jsonify({"error": "JPEG image is required"}), 400
+
+        embedding = _embed_jpeg(jpeg)
+        if embedding is None:
+            return jsonify({"error": "No face detected"}), 422
+
+        os.makedirs(FACE_EMBEDDINGS_DIR, exist_ok=True)
+        np.save(path, embedding)
+
+        return jsonify({"message": f"Face enrolled for {unique_id}", "status": "success"}), 200
+    except (PoolTimeoutError, BrokenProcessPool) as e:
+        return _pool_failure(e)
     except Exception as e:
-        return jsonify({"error": f"Error recording attendance: {e}"}), 500
+        logging.exception("Error enrolling face")
+        return jsonify({"error": f"Error enrolling face: {e}"}), 500
+
+
+@app.route('/verify_face', methods=['POST'])
+@app.route('/verify_face/<unique_id>', methods=['POST'])
+def verify_face(unique_id=None):
+    """Verify a JPEG against the enrolled embedding and mark attendance on a match."""
+    try:
+        unique_id = _request_registration_number(unique_id)
+        path = _embedding_path(unique_id)
+        if path is None:
+            return jsonify({"error": "registrationNumber is required"}), 400
+        missing = _not_on_roster(unique_id)
+        if missing:
+            return missing
+        if not os.path.exists(path):
+            return jsonify({"error": "No enrolled face for this registration number"}), 404
+
+        jpeg = _request_jpeg()
+        if not jpeg:
+            return jsonify({"error": "JPEG image is required"}), 400
+
+        embedding = _embed_jpeg(jpeg)
+        if embedding is None:
+            return jsonify({"error": "No face detected"}), 422
+
+        session = _request_session()
+        if session is None:
+            return _unknown_session()
+
+        similarity = MobileFaceNet_Optimized.cosine_similarity(np.load(path), embedding)
+
+        if similarity <= FACE_SIMILARITY_THRESHOLD:
+            return jsonify({
+                "error": "Face verification failed",
+                "similarity": similarity
+            }), 401
+
+        attendance = _sessions.attendance(session)
+        with attendance.lock:
+            payload, status = _record_attendance(attendance, unique_id, request.remote_addr)
+        payload["similarity"] = similarity
+        return jsonify(payload), status
+
+    except (PoolTimeoutError, BrokenProcessPool) as e:
+        return _pool_failure(e)
+    except Exception as e:
+        logging.exception("Error verifying face")
+        return jsonify({"error": f"Error verifying face: {e}"}), 500
+
+
+def _encoded_response(body, status):
+    """Response for a pre-encoded JSON body, compressed as negotiated with Accept-Encoding."""
+    data, encoding = body.encoded(negotiate_encoding(request.headers.get('Accept-Encoding')), COMPRESS_MIN_BYTES)
+    response = Response(data, status=status, mimetype='application/json')
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.headers['Vary'] = 'Accept-Encoding'
+    return response
+
+
+def _json_response(payload, status=200):
+    return _encoded_response(EncodedBody(dumps(payload)), status)
+
+
+def _roster_state(session):
+    """Cache token for roster responses: changes when user_data.csv or the session's attendance does."""
+    return _get_roster().source, _sessions.attendance(session).version
+
+
+def _present_flags(roster, session):
+    """Presence per roster row for a session, from its attendance bitmap."""
+    bitmap = _sessions.attendance(session).bitmap(roster)
+    return unpack_bitmap(bitmap, len(roster))
+
+
+def _student_rows(roster, rows, present):
+    reg_numbers, names = roster.reg_numbers(), roster.names()
+    students_list = []
+    for i in rows:
+        reg_no = reg_numbers[i]
+        name = names[i]
+        students_list.append({
+            "name": name,
+            "registrationNumber": reg_no,
+            "isPresent": bool(present[i]),
+            "initial": name[0].upper() if name else "?"
+        })
+    return students_list
 
 
 @app.route('/attendance_stats', methods=['GET'])
 def get_attendance_stats():
     """Get attendance statistics."""
     try:
-        if not os.path.exists(CSV_FILE) or not os.path.exists(VERIFIED_IDS_FILE):
+        if not os.path.exists(CSV_FILE):
             return jsonify({
                 "error": "Required files not found"
             }), 404
-
-        # Read total students
-        total_df = pd.read_csv(CSV_FILE)
-        total_students = len(total_df)
-
-        # Read present students
-        present_df = pd.read_csv(VERIFIED_IDS_FILE, dtype={"Registration Number": str})  # Ensure reading as string
-        present_student = set(
-            str(reg_no).strip().split(".")[0]  # Convert to string and remove ".0"
-            for reg_no in present_df['Registration Number'].dropna()  # Drop NaN values
-        )
-
-        present_students = len(present_student)
-
-        return jsonify({
-            "PresentStudents": list(present_student),  # Convert set to list
-            "total": total_students,
-            "present": present_students,
-            "absent": total_students - present_students
-        }), 200
+        session = _request_session()
+        if session is None:
+            return _unknown_session()
+
+        def build():
+            roster = _get_roster()
+            total_students = len(roster)
+
+            # Present students of this session: the set bits of its attendance bitmap
+            reg_numbers = roster.reg_numbers()
+            present_rows = np.flatnonzero(_present_flags(roster, session))
+            present_students = len(present_rows)
+
+            return {
+                "session": session.id,
+                "PresentStudents": [reg_numbers[i] for i in present_rows],
+                "total": total_students,
+                "present": present_students,
+                "absent": total_students - present_students
+            }, 200
+
+        body, status = _response_cache.get(('attendance_stats', session.id), _roster_state(session), build)
+        return _encoded_response(body, status)
 
     except Exception as e:
         return jsonify({"error": f"Error getting stats: {e}"}), 500
@@ -248,34 +776,23 @@ def get_students():
         if not os.path.exists(CSV_FILE):
             return jsonify({"error": "Student list not found"}), 404
 
-        # Read all students
-        students_df = pd.read_csv(CSV_FILE)
+        # Attendance of this session
+        session = _request_session()
+        if session is None:
+            return _unknown_session()
 
-        # Read attendance data
-        present_students = set()
-        if os.path.exists(VERIFIED_IDS_FILE):
-            present_df = pd.read_csv(VERIFIED_IDS_FILE, dtype={"Registration Number": str})  # Read as string
-            present_students = set(
-                str(reg_no).strip().split(".")[0]  # Remove ".0" if present
-                for reg_no in present_df['Registration Number'].dropna()  # Drop NaN values
-            )
+        def build():
+            roster = _get_roster()
+            present = _present_flags(roster, session)
+            reg_numbers = roster.reg_numbers()
 
-        # Prepare student list with attendance status
-        students_list = []
-        for _, row in students_df.iterrows():
-            reg_no = str(row['Registration Number']).strip().split(".")[0]  # Remove ".0"
-            name = row['Name'].strip()
-            students_list.append({
-                "name": name,
-                "registrationNumber": reg_no,
-                "isPresent": reg_no in present_students,
-                "initial": name[0].upper() if name else "?"
-            })
+            return {
+                "students": _student_rows(roster, range(len(roster)), present),
+                "present_students": [reg_numbers[i] for i in np.flatnonzero(present)]
+            }, 200
 
-        return jsonify({
-            "students": students_list,
-            "present_students": list(present_students)  # Return as a list for JSON compatibility
-        }), 200
+        body, status = _response_cache.get(('students', session.id), _roster_state(session), build)
+        return _encoded_response(body, status)
 
     except Exception as e:
         return jsonify({"error": f"Error getting students: {e}"}), 500
@@ -287,43 +804,194 @@ def search_students(query):
         if not os.path.exists(CSV_FILE):
             return jsonify({"error": "Student list not found"}), 404
 
-        # Read all students
-        students_df = pd.read_csv(CSV_FILE)
-        
-        # Read attendance data
-        present_students = set()
-        if os.path.exists(VERIFIED_IDS_FILE):
-            present_df = pd.read_csv(VERIFIED_IDS_FILE, dtype={"Registration Number": str})  # Read as string
-            present_students = set(
-                str(reg_no).strip().split(".")[0]  # Remove ".0" if present
-                for reg_no in present_df['Registration Number'].dropna()  # Drop NaN values
-            )
-
-        # Filter students based on search query
+        # Attendance of this session
+        session = _request_session()
+        if session is None:
+            return _unknown_session()
         query = query.lower()
-        filtered_students = students_df[
-            students_df['Name'].str.lower().str.contains(query) |
-            students_df['Registration Number'].astype(str).str.lower().str.contains(query)
-        ]
-
-        # Prepare filtered student list
-        students_list = []
-        for _, row in filtered_students.iterrows():
-            reg_no = str(row['Registration Number']).strip().split(".")[0]  # Remove ".0"
-            name = row['Name'].strip()
-            students_list.append({
-                "name": name,
-                "registrationNumber": reg_no,
-                "isPresent": reg_no in present_students,
-                "initial": name[0].upper() if name else "?"
-            })
 
-        return jsonify({
-            "students": students_list
-        }), 200
+        def build():
+            roster = _get_roster()
+            present = _present_flags(roster, session)
+
+            # Students whose name or registration number contains the query
+            return {
+                "students": _student_rows(roster, roster.search(query), present)
+            }, 200
+
+        body, status = _response_cache.get(
+            ('search_students', session.id, query), _roster_state(session), build
+        )
+        return _encoded_response(body, status)
     except Exception as e:
         return jsonify({"error": f"Error searching students: {e}"}), 500
 
+def _selected_sessions():
+    """
+    Sessions for a multi-session query: ?sessions=id1,id2,... or every dated
+    session matching ?course=, ?section= and ?from= / ?to= (ISO dates,
+    inclusive), oldest first. Returns (sessions, error response).
+    """
+    ids = [i.strip() for i in request.args.get('sessions', '').split(',') if i.strip()]
+    if ids:
+        sessions = [_sessions.get(i) for i in ids]
+        unknown = [i for i, s in zip(ids, sessions) if s is None]
+        if unknown:
+            return None, (jsonify({"error": f"Unknown session: {', '.join(unknown)}"}), 404)
+    else:
+        sessions = _sessions.select(
+            request.args.get('course'),
+            request.args.get('section'),
+            request.args.get('from', ''),
+            request.args.get('to', '9999-12-31'),
+        )
+    if not sessions:
+        return None, (jsonify({"error": "No sessions match"}), 400)
+    return sessions, None
+
+
+def _attendance_stack(roster, sessions):
+    """(sessions, bytes) matrix of the sessions' attendance bitmaps."""
+    return np.stack([_sessions.attendance(s).bitmap(roster) for s in sessions])
+
+
+def _students_payload(roster, rows):
+    reg_numbers = roster.reg_numbers()
+    return {"count": len(rows), "registrationNumbers": [reg_numbers[i] for i in rows]}
+
+
+@app.route('/attendance/present', methods=['GET'])
+def attendance_present():
+    """Students present in a session (?session=, default the active one)."""
+    try:
+        if not os.path.exists(CSV_FILE):
+            return jsonify({"error": "Student list not found"}), 404
+        session = _request_session()
+        if session is None:
+            return _unknown_session()
+        roster = _get_roster()
+        bitmap = _sessions.attendance(session).bitmap(roster)
+        rows = attendance_bitmap.rows(bitmap, len(roster))
+        return _json_response({"session": session.id, **_students_payload(roster, rows)})
+    except Exception as e:
+        return jsonify({"error": f"Error getting present students: {e}"}), 500
+
+
+@app.route('/attendance/absent', methods=['GET'])
+def attendance_absent():
+    """Students on the roster not present in a session."""
+    try:
+        if not os.path.exists(CSV_FILE):
+            return jsonify({"error": "Student list not found"}), 404
+        session = _request_session()
+        if session is None:
+            return _unknown_session()
+        roster = _get_roster()
+        bitmap = attendance_bitmap.absent(_sessions.attendance(session).bitmap(roster), len(roster))
+        rows = attendance_bitmap.rows(bitmap, len(roster))
+        return _json_response({"session": session.id, **_students_payload(roster, rows)})
+    except Exception as e:
+        return jsonify({"error": f"Error getting absent students: {e}"}), 500
+
+
+@app.route('/attendance/present_in_all', methods=['GET'])
+def attendance_present_in_all():
+    """Students present in every selected session (see _selected_sessions)."""
+    try:
+        if not os.path.exists(CSV_FILE):
+            return jsonify({"error": "Student list not found"}), 404
+        sessions, error = _selected_sessions()
+        if error:
+            return error
+        roster = _get_roster()
+        bitmap = attendance_bitmap.present_in_all(_attendance_stack(roster, sessions))
+        rows = attendance_bitmap.rows(bitmap, len(roster))
+        return _json_response({"sessions": [s.id for s in sessions], **_students_payload(roster, rows)})
+    except Exception as e:
+        return jsonify({"error": f"Error getting attendance: {e}"}), 500
+
+
+@app.route('/attendance/chronic_absentees', methods=['GET'])
+def chronic_absentees():
+    """Students attending less than ?threshold= (default 0.75) of the selected sessions."""
+    try:
+        if not os.path.exists(CSV_FILE):
+            return jsonify({"error": "Student list not found"}), 404
+        try:
+            threshold = float(request.args.get('threshold', 0.75))
+        except ValueError:
+            return jsonify({"error": "threshold must be a number"}), 400
+        if not 0 <= threshold <= 1:
+            return jsonify({"error": "threshold must be between 0 and 1"}), 400
+        sessions, error = _selected_sessions()
+        if error:
+            return error
+        roster = _get_roster()
+        rows, attended = attendance_bitmap.below_rate(_attendance_stack(roster, sessions), len(roster), threshold)
+        reg_numbers, names = roster.reg_numbers(), roster.names()
+        return _json_response({
+            "sessions": [s.id for s in sessions],
+            "threshold": threshold,
+            "count": len(rows),
+            "students": [
+                {
+                    "registrationNumber": reg_numbers[i],
+                    "name": names[i],
+                    "attended": int(n),
+                    "rate": round(int(n) / len(sessions), 4)
+                }
+                for i, n in zip(rows.tolist(), attended.tolist())
+            ]
+        })
+    except Exception as e:
+        return jsonify({"error": f"Error getting chronic absentees: {e}"}), 500
+
+
+EXPORT_FORMATS = {
+    'csv': ("text/csv; charset=utf-8", attendance_export.csv_chunks),
+    'parquet': ("application/vnd.apache.parquet", attendance_export.parquet_chunks),
+}
+
+
+@app.route('/export', methods=['GET'])
+def export_attendance():
+    """
+    Attendance joined with the roster, one row per student per session,
+    streamed as ?format=csv (default) or parquet. Sessions as for
+    _selected_sessions when ?sessions=, ?course=, ?section=, ?from= or ?to=
+    is given, else ?session= (default the active one). The bitmaps are
+    copied up front, so marking carries on while the rows are streamed.
+    """
+    try:
+        if not os.path.exists(CSV_FILE):
+            return jsonify({"error": "Student list not found"}), 404
+        fmt = request.args.get('format', 'csv').lower()
+        if fmt not in EXPORT_FORMATS:
+            return jsonify({"error": f"format must be one of: {', '.join(EXPORT_FORMATS)}"}), 400
+        if fmt == 'parquet' and not attendance_export.parquet_available():
+            return jsonify({"error": "Parquet export needs pyarrow"}), 400
+        if any(request.args.get(k) for k in ('sessions', 'course', 'section', 'from', 'to')):
+            sessions, error = _selected_sessions()
+            if error:
+                return error
+        else:
+            session = _request_session()
+            if session is None:
+                return _unknown_session()
+            sessions = [session]
+        roster = _get_roster()
+        parts = [(s, _sessions.attendance(s).bitmap(roster)) for s in sessions]
+        mimetype, chunks = EXPORT_FORMATS[fmt]
+        filename = f"attendance-{sessions[0].id if len(sessions) == 1 else 'export'}.{fmt}"
+        response = Response(
+            stream_with_context(chunks(attendance_export.iter_export_rows(roster, parts))),
+            mimetype=mimetype
+        )
+        response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+    except Exception as e:
+        return jsonify({"error": f"Error exporting attendance: {e}"}), 500
+
 @app.route('/mark_attendance', methods=['POST'])
 def mark_attendance():
     """Mark attendance for a given registration number."""
@@ -340,31 +1008,24 @@ def mark_attendance():
             logging.error("CSV file not found")
             return jsonify({"error": "CSV file not found"}), 404
 
-        df = pd.read_csv(CSV_FILE)
-        if 'Registration Number' not in df.columns:
+        try:
+            roster = _get_roster()
+        except ValueError:
             logging.error("Invalid CSV format")
             return jsonify({"error": "Invalid CSV format"}), 400
 
-        if unique_id not in df['Registration Number'].astype(str).values:
+        if roster.index(unique_id) < 0:
             logging.warning(f"Registration number {unique_id} not found in CSV")
             return jsonify({"error": "Registration number not found"}), 404
 
-        # Record new attendance
-        current_time = datetime.datetime.now()
-        
-        # Save verified ID
-        new_verification = pd.DataFrame({
-            'Registration Number': [unique_id],
-            'Timestamp': [current_time],
-            'IP': [request.remote_addr]  # Optional: track the IP if needed
-        })
+        session = _request_session()
+        if session is None:
+            return _unknown_session()
 
-        if os.path.exists(VERIFIED_IDS_FILE):
-            verified_df = pd.read_csv(VERIFIED_IDS_FILE)
-            verified_df = pd.concat([verified_df, new_verification], ignore_index=True)
-        else:
-            verified_df = new_verification
-        verified_df.to_csv(VERIFIED_IDS_FILE, index=False)
+        # Record new attendance (the teacher's device is not tracked as a student device)
+        attendance = _sessions.attendance(session)
+        with attendance.lock:
+            attendance.record(unique_id, request.remote_addr, track_ip=False)
 
         logging.info(f"Attendance marked successfully for {unique_id}")
         return jsonify({
@@ -376,6 +1037,114 @@ def mark_attendance():
         logging.error(f"Error recording attendance: {e}")
         return jsonify({"error": f"Error recording attendance: {e}"}), 500
 
+def _parse_mark_timestamp(value):
+    """Naive local datetime for an ISO-8601 timestamp (converted if it has an offset); None if invalid."""
+    try:
+        ts = datetime.datetime.fromisoformat(str(value).strip())
+    except ValueError:
+        return None
+    if ts.tzinfo is not None:
+        ts = ts.astimezone().replace(tzinfo=None)
+    return ts
+
+
+@app.route('/mark_attendance/bulk', methods=['POST'])
+def mark_attendance_bulk():
+    """
+    Mark attendance for many registration numbers at once (faculty overrides,
+    offline sync). Body: {"items": [{"registrationNumber": ..., "timestamp":
+    ISO-8601, optional}, ...]} or {"registrationNumbers": [...]}.
+
+    All items are checked against the roster in one pass and the accepted
+    ones written in one append under the session lock. The response has one
+    result per item, in order: marked, duplicate, not_found or invalid.
+    Re-sending a batch is safe; students already marked come back as duplicate.
+    """
+    try:
+        data = request.get_json(force=True, silent=True) or {}
+        items = data.get('items')
+        if items is None:
+            items = data.get('registrationNumbers')
+        if not isinstance(items, list) or not items:
+            return jsonify({"error": "items or registrationNumbers is required"}), 400
+        if len(items) > BULK_MARK_MAX_ITEMS:
+            return jsonify({"error": f"At most {BULK_MARK_MAX_ITEMS} items per request"}), 413
+
+        if not os.path.exists(CSV_FILE):
+            return jsonify({"error": "CSV file not found"}), 404
+        try:
+            roster = _get_roster()
+        except ValueError:
+            return jsonify({"error": "Invalid CSV format"}), 400
+        session = _request_session()
+        if session is None:
+            return _unknown_session()
+
+        now = datetime.datetime.now()
+        regs, timestamps = [], []
+        for item in items:
+            if isinstance(item, dict):
+                regs.append(str(item.get('registrationNumber') or '').strip())
+                timestamp = item.get('timestamp')
+                timestamps.append(_parse_mark_timestamp(timestamp) if timestamp else now)
+            else:
+                regs.append(str(item if item is not None else '').strip())
+                timestamps.append(now)
+        rows = roster.indices(regs)
+
+        results = []
+        counts = defaultdict(int)
+        attendance = _sessions.attendance(session)
+        with attendance.lock:
+            marks = []
+            in_batch = set()
+            for reg, timestamp, row in zip(regs, timestamps, rows.tolist()):
+                result = {"registrationNumber": reg}
+                if not reg:
+                    result.update(status="invalid", error="registrationNumber is required")
+                elif timestamp is None:
+                    result.update(status="invalid", error="timestamp must be ISO-8601")
+                elif row < 0:
+                    result["status"] = "not_found"
+                elif attendance.is_present(reg) or normalize_reg(reg) in in_batch:
+                    result["status"] = "duplicate"
+                else:
+                    marks.append((reg, timestamp))
+                    in_batch.add(normalize_reg(reg))
+                    result["status"] = "marked"
+                counts[result["status"]] += 1
+                results.append(result)
+            attendance.record_many(marks, request.remote_addr)
+
+        logging.info(f"Bulk attendance for session {session.id}: {dict(counts)}")
+        return _json_response({
+            "session": session.id,
+            "marked": counts["marked"],
+            "duplicate": counts["duplicate"],
+            "not_found": counts["not_found"],
+            "invalid": counts["invalid"],
+            "results": results
+        })
+
+    except Exception as e:
+        logging.error(f"Error recording bulk attendance: {e}")
+        return jsonify({"error": f"Error recording attendance: {e}"}), 500
+
+@app.route('/inference_metrics', methods=['GET'])
+def get_inference_metrics():
+    """Micro-batching scheduler metrics (queue depth, batch fill, wait and invoke times) and embedding cache hits."""
+    try:
+        if _embedding_batcher is None:
+            metrics = {"status": "idle", "max_batch_size": BATCH_MAX_SIZE, "max_wait_ms": BATCH_MAX_WAIT_MS}
+        else:
+            metrics = _embedding_batcher.stats()
+        if _embedding_cache is not None:
+            metrics["embedding_cache"] = _embedding_cache.stats()
+        return jsonify(metrics), 200
+    except Exception as e:
+        logging.exception("Error getting inference metrics")
+        return jsonify({"error": f"Error getting inference metrics: {e}"}), 500
+
 @app.route('/stress_test/start', methods=['POST'])
 def start_stress_test():
     """Start tracking metrics for stress testing."""
@@ -571,4 +1340,15 @@ def _save_scalability_report(report):
         logging.error(f"Error saving scalability report: {e}")
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000, debug=True)
+    parser = argparse.ArgumentParser(description="NetMark attendance server.")
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=5000)
+    parser.add_argument('--no-debug', action='store_true', help="Run without the debugger and reloader.")
+    parser.add_argument(
+        '--behind-proxy', action='store_true',
+        help="Take the client IP from X-Forwarded-For (set by shard_router.py) for device tracking."
+    )
+    args = parser.parse_args()
+    if args.behind_proxy:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=1)
+    app.run(host=args.host, port=args.port, debug=not args.no_debug)
@@ -0,0 +1,149 @@
+import bisect
+import itertools
+import threading
+import time
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class EndpointClass:
+    """Admission limits for one group of endpoints. Lower `priority` is admitted first."""
+    name: str
+    priority: int
+    max_in_flight: int
+    max_queue: int
+    queue_timeout_s: float
+    retry_after_s: int
+
+
+class _Waiter:
+    """A queued request; `granted` is set (and `cond` notified) when a slot is handed to it."""
+    __slots__ = ("key", "name", "cond", "granted")
+
+    def __init__(self, key: tuple[int, int], name: str, cond: threading.Condition):
+        self.key = key
+        self.name = name
+        self.cond = cond
+        self.granted = False
+
+    def __lt__(self, other: "_Waiter") -> bool:
+        return self.key < other.key
+
+
+class AdmissionController:
+    """
+    Bounded concurrency with a short priority wait queue in front of the
+    request handlers.
+
+    A request of class c runs when c has fewer than c.max_in_flight requests
+    running and fewer than `max_in_flight` run in total; otherwise it waits.
+    Waiters are admitted in (priority, arrival) order, and a waiter is only
+    passed over when its own class is at its limit. Priority therefore only
+    matters when the global cap binds: give the classes caps that sum to more
+    than `max_in_flight` (e.g. marking may use every slot, dashboard a few),
+    otherwise each class stops at its own cap first and the classes are
+    merely isolated from each other. When c already has c.max_queue waiters,
+    or a waiter is not admitted within c.queue_timeout_s, `acquire` returns
+    False at once so the caller can answer 503 + Retry-After instead of
+    letting the request time out in the backlog.
+    """
+
+    def __init__(self, classes: list[EndpointClass], max_in_flight: int):
+        self.classes = {c.name: c for c in classes}
+        self.max_in_flight = max_in_flight
+        self._lock = threading.Lock()
+        self._in_flight = {c.name: 0 for c in classes}
+        self._queued = {c.name: 0 for c in classes}
+        self._waiters: list[_Waiter] = []  # sorted by (priority, seq)
+        self._seq = itertools.count()
+        self._stats = {
+            c.name: {"admitted": 0, "rejected_queue_full": 0, "rejected_timeout": 0, "wait_s_total": 0.0,
+                     "wait_s_max": 0.0}
+            for c in classes
+        }
+
+    def _has_slot(self, name: str) -> bool:
+        return (
+            sum(self._in_flight.values()) < self.max_in_flight
+            and self._in_flight[name] < self.classes[name].max_in_flight
+        )
+
+    def _dispatch(self) -> None:
+        """
+        Hand free slots to waiters in (priority, arrival) order, skipping
+        those whose class is at its limit, and wake only the ones granted;
+        caller holds the lock.
+        """
+        i = 0
+        while i < len(self._waiters) and sum(self._in_flight.values()) < self.max_in_flight:
+            waiter = self._waiters[i]
+            if not self._has_slot(waiter.name):
+                i += 1
+                continue
+            del self._waiters[i]
+            self._queued[waiter.name] -= 1
+            self._in_flight[waiter.name] += 1
+            waiter.granted = True
+            waiter.cond.notify()
+
+    def _admit(self, name: str, waited: float) -> None:
+        s = self._stats[name]
+        s["admitted"] += 1
+        s["wait_s_total"] += waited
+        s["wait_s_max"] = max(s["wait_s_max"], waited)
+
+    def acquire(self, name: str) -> bool:
+        """Wait for a slot for class `name`; False if the request should be shed."""
+        cls = self.classes[name]
+        with self._lock:
+            if not self._waiters and self._has_slot(name):
+                self._in_flight[name] += 1
+                self._admit(name, 0.0)
+                return True
+            if self._queued[name] >= cls.max_queue:
+                self._stats[name]["rejected_queue_full"] += 1
+                return False
+
+            waiter = _Waiter((cls.priority, next(self._seq)), name, threading.Condition(self._lock))
+            bisect.insort(self._waiters, waiter)
+            self._queued[name] += 1
+            self._dispatch()
+            started = time.perf_counter()
+            deadline = started + cls.queue_timeout_s
+            while not waiter.granted:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    self._waiters.remove(waiter)
+                    self._queued[name] -= 1
+                    self._stats[name]["rejected_timeout"] += 1
+                    return False
+                waiter.cond.wait(remaining)
+            self._admit(name, time.perf_counter() - started)
+            return True
+
+    def release(self, name: str) -> None:
+        with self._lock:
+            self._in_flight[name] -= 1
+            self._dispatch()
+
+    def retry_after(self, name: str) -> int:
+        return self.classes[name].retry_after_s
+
+    def stats(self) -> dict:
+        with self._lock:
+            out = {"max_in_flight": self.max_in_flight, "in_flight": sum(self._in_flight.values()), "classes": {}}
+            for name, cls in self.classes.items():
+                s = self._stats[name]
+                out["classes"][name] = {
+                    "priority": cls.priority,
+                    "in_flight": self._in_flight[name],
+                    "queued": self._queued[name],
+                    "max_in_flight": cls.max_in_flight,
+                    "max_queue": cls.max_queue,
+                    "admitted": s["admitted"],
+                    "rejected_queue_full": s["rejected_queue_full"],
+                    "rejected_timeout": s["rejected_timeout"],
+                    "mean_wait_ms": s["wait_s_total"] / s["admitted"] * 1000 if s["admitted"] else 0.0,
+                    "max_wait_ms": s["wait_s_max"] * 1000,
+                }
+            return out
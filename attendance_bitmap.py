@@ -0,0 +1,54 @@
+import numpy as np
+
+from roster_snapshot import unpack_bitmap
+
+# Set algebra on attendance bitmaps: packed uint8 arrays, bit i (LSB first)
+# of byte i // 8 = roster row i present, as in roster snapshots. One session
+# of a 10k-student roster is 1.25 KB, and a whole semester of sessions
+# stacks into a (sessions, bytes) matrix that each query reduces in one pass.
+
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def _valid_mask(count: int) -> np.ndarray:
+    """Bitmap with the bits of rows 0..count-1 set; the padding bits of the last byte stay clear."""
+    mask = np.full((count + 7) // 8, 0xFF, dtype=np.uint8)
+    if count % 8:
+        mask[-1] = (1 << (count % 8)) - 1
+    return mask
+
+
+def popcount(bitmap: np.ndarray) -> int:
+    return int(_POPCOUNT[bitmap].sum(dtype=np.int64))
+
+
+def rows(bitmap: np.ndarray, count: int) -> np.ndarray:
+    """Roster rows whose bit is set, ascending."""
+    return np.flatnonzero(unpack_bitmap(bitmap, count))
+
+
+def absent(bitmap: np.ndarray, count: int) -> np.ndarray:
+    return ~bitmap & _valid_mask(count)
+
+
+def present_in_all(bitmaps: np.ndarray) -> np.ndarray:
+    """Students present in every session of a (sessions, bytes) stack."""
+    return np.bitwise_and.reduce(bitmaps, axis=0)
+
+
+def present_in_any(bitmaps: np.ndarray) -> np.ndarray:
+    return np.bitwise_or.reduce(bitmaps, axis=0)
+
+
+def attendance_counts(bitmaps: np.ndarray, count: int) -> np.ndarray:
+    """Sessions attended per roster row over a (sessions, bytes) stack."""
+    bits = np.unpackbits(bitmaps, axis=1, count=count, bitorder="little")
+    # A narrow accumulator halves the memory traffic of the reduction
+    return bits.sum(axis=0, dtype=np.uint16 if len(bitmaps) < 65536 else np.int64)
+
+
+def below_rate(bitmaps: np.ndarray, count: int, threshold: float) -> tuple[np.ndarray, np.ndarray]:
+    """(rows, sessions attended) of students attending less than `threshold` of the sessions."""
+    attended = attendance_counts(bitmaps, count)
+    below = np.flatnonzero(attended < threshold * len(bitmaps))
+    return below, attended[below]
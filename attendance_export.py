@@ -0,0 +1,201 @@
+import argparse
+import csv
+import datetime
+import io
+import sys
+
+from roster_snapshot import load_roster, unpack_bitmap
+from sessions import SessionRegistry, normalize_reg
+
+EXPORT_COLUMNS = ["Session", "Course", "Section", "Date", "Registration Number", "Name", "Present", "Timestamp"]
+CSV_CHUNK_ROWS = 5_000
+PARQUET_ROW_GROUP_ROWS = 50_000
+
+
+def _parse_timestamp(text: str) -> datetime.datetime | None:
+    try:
+        ts = datetime.datetime.fromisoformat(text.strip())
+    except ValueError:
+        return None
+    return ts.astimezone().replace(tzinfo=None) if ts.tzinfo is not None else ts
+
+
+def read_marked_at(verified_ids_file: str) -> dict[str, str]:
+    """
+    Earliest attendance timestamp per registration number in a session's
+    verified IDs file. Bulk marks can be back-dated and appended after later
+    marks, so this is the minimum timestamp, not the first row; timestamps
+    that do not parse are only used when a number has no other.
+    """
+    earliest: dict[str, tuple[datetime.datetime | None, str]] = {}
+    try:
+        with open(verified_ids_file, newline="", encoding="utf-8", errors="replace") as f:
+            for row in csv.DictReader(f):
+                reg = normalize_reg(row.get("Registration Number", ""))
+                text = row.get("Timestamp") or ""
+                ts = _parse_timestamp(text)
+                current = earliest.get(reg)
+                if current is None or (ts is not None and (current[0] is None or ts < current[0])):
+                    earliest[reg] = (ts, text)
+    except FileNotFoundError:
+        pass
+    return {reg: text for reg, (_, text) in earliest.items()}
+
+
+def iter_export_rows(roster, parts):
+    """
+    One row per (session, roster student), session by session, for
+    `parts` = [(Session, attendance bitmap over roster rows)]. Timestamps
+    are read from one session's file at a time, so memory stays at one
+    session's worth whatever the number of rows.
+    """
+    reg_numbers, names = roster.reg_numbers(), roster.names()
+    for session, bitmap in parts:
+        present = unpack_bitmap(bitmap, len(roster)).tolist()
+        marked_at = read_marked_at(session.verified_ids_file)
+        for reg, name, is_present in zip(reg_numbers, names, present):
+            yield (session.id, session.course, session.section, session.date, reg, name, is_present,
+                   marked_at.get(reg, "") if is_present else "")
+
+
+def csv_chunks(rows, chunk_rows: int = CSV_CHUNK_ROWS):
+    """UTF-8 CSV (header first) in pieces of `chunk_rows` rows."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    pending = 0
+    for row in rows:
+        writer.writerow(row)
+        pending += 1
+        if pending == chunk_rows:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    yield buffer.getvalue().encode("utf-8")
+
+
+class _ChunkSink:
+    """Write-only file object that hands the written bytes back in pieces (see parquet_chunks)."""
+
+    def __init__(self):
+        self.closed = False
+        self._pieces = []
+        self._position = 0
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._pieces.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self) -> None:
+        pass
+
+    def writable(self) -> bool:
+        return True
+
+    def close(self) -> None:
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self._pieces)
+        self._pieces = []
+        return data
+
+
+def parquet_available() -> bool:
+    try:
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def parquet_chunks(rows, row_group_rows: int = PARQUET_ROW_GROUP_ROWS):
+    """
+    Parquet file bytes, one row group of `row_group_rows` rows at a time.
+    Needs pyarrow; only one row group is held in memory.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([
+        ("Session", pa.string()), ("Course", pa.string()), ("Section", pa.string()), ("Date", pa.string()),
+        ("Registration Number", pa.string()), ("Name", pa.string()), ("Present", pa.bool_()),
+        ("Timestamp", pa.string()),
+    ])
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema, compression="zstd")
+
+    def write_group(batch):
+        columns = list(zip(*batch))
+        writer.write_table(pa.Table.from_arrays([pa.array(c, type=f.type) for c, f in zip(columns, schema)],
+                                                schema=schema))
+
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == row_group_rows:
+            write_group(batch)
+            batch = []
+            yield sink.drain()
+    if batch:
+        write_group(batch)
+    writer.close()
+    yield sink.drain()
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Export session attendance joined with the roster, streamed.")
+    ap.add_argument("--roster", default="user_data.csv")
+    ap.add_argument("--sessions-dir", default="sessions")
+    ap.add_argument("--verified-ids", default="verified_ids.csv", help="Attendance of the default session.")
+    ap.add_argument("--ip-tracking", default="ip_tracking.csv")
+    ap.add_argument("--session", action="append", default=None,
+                    help="Session id to export (repeatable). Default: --course/--section/--from/--to selection.")
+    ap.add_argument("--course", default=None)
+    ap.add_argument("--section", default=None)
+    ap.add_argument("--from", dest="start", default="", help="First date (ISO), inclusive.")
+    ap.add_argument("--to", dest="end", default="9999-12-31", help="Last date (ISO), inclusive.")
+    ap.add_argument("--format", choices=["csv", "parquet"], default="csv")
+    ap.add_argument("-o", "--output", default=None, help="Output file (default: stdout for CSV).")
+    args = ap.parse_args()
+
+    registry = SessionRegistry(args.sessions_dir, args.verified_ids, args.ip_tracking)
+    if args.session:
+        sessions = [registry.get(i) for i in args.session]
+        unknown = [i for i, s in zip(args.session, sessions) if s is None]
+        if unknown:
+            ap.error(f"Unknown session: {', '.join(unknown)}")
+    else:
+        sessions = registry.select(args.course, args.section, args.start, args.end)
+    if not sessions:
+        ap.error("No sessions match")
+    if args.format == "parquet":
+        if not parquet_available():
+            ap.error("Parquet export needs pyarrow (pip install pyarrow)")
+        if not args.output:
+            ap.error("Parquet export needs --output")
+
+    roster = load_roster(args.roster)
+    parts = ((s, registry.attendance(s).bitmap(roster)) for s in sessions)
+    rows = iter_export_rows(roster, parts)
+    chunks = parquet_chunks(rows) if args.format == "parquet" else csv_chunks(rows)
+
+    out = open(args.output, "wb") if args.output else sys.stdout.buffer
+    try:
+        for chunk in chunks:
+            out.write(chunk)
+    finally:
+        if args.output:
+            out.close()
+    if args.output:
+        print(f"Exported {len(sessions)} session(s) x {len(roster)} students to {args.output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
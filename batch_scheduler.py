@@ -0,0 +1,137 @@
+import queue
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+
+import numpy as np
+
+_STOP = object()
+
+
+class MicroBatcher:
+    """
+    Dynamic batching in front of a batched model call.
+
+    `submit()` queues one input (a (1, ...) or (...) array) and returns a Future.
+    Dispatcher threads take the first waiting input, keep collecting until
+    `max_batch_size` inputs are gathered or `max_wait_ms` has passed, run
+    `batch_fn` once on the stacked batch and hand row i of its output back to
+    the i-th waiting request.
+
+    Latency/throughput knobs:
+    - max_wait_ms: longest a request waits for company before its batch runs
+    - max_batch_size: upper bound on one invoke
+    - workers: batches allowed in flight at once (e.g. one per worker process)
+    """
+
+    def __init__(self, batch_fn, max_batch_size: int = 32, max_wait_ms: float = 5.0, workers: int = 1):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be >= 1")
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self._queue: queue.Queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._stats = {
+            "submitted": 0,
+            "batches": 0,
+            "items": 0,
+            "errors": 0,
+            "max_queue_depth": 0,
+            "total_wait_s": 0.0,
+            "total_invoke_s": 0.0,
+        }
+        self._batch_sizes: Counter = Counter()
+        self._threads = [
+            threading.Thread(target=self._run, name=f"micro-batcher-{i}", daemon=True)
+            for i in range(max(1, workers))
+        ]
+        for t in self._threads:
+            t.start()
+
+    def submit(self, item) -> Future:
+        future: Future = Future()
+        self._queue.put((np.asarray(item), future, time.perf_counter()))
+        depth = self._queue.qsize()
+        with self._lock:
+            self._stats["submitted"] += 1
+            if depth > self._stats["max_queue_depth"]:
+                self._stats["max_queue_depth"] = depth
+        return future
+
+    def close(self) -> None:
+        for _ in self._threads:
+            self._queue.put(_STOP)
+        for t in self._threads:
+            t.join()
+
+    def _collect(self, first) -> tuple[list, bool]:
+        batch = [first]
+        deadline = time.perf_counter() + self.max_wait_ms / 1000.0
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                entry = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if entry is _STOP:
+                return batch, True
+            batch.append(entry)
+        return batch, False
+
+    def _run(self) -> None:
+        while True:
+            first = self._queue.get()
+            if first is _STOP:
+                return
+            batch, stop = self._collect(first)
+            self._dispatch(batch)
+            if stop:
+                return
+
+    def _dispatch(self, batch: list) -> None:
+        started = time.perf_counter()
+        inputs = [item if item.ndim and item.shape[0] == 1 else item[None, ...] for item, _, _ in batch]
+        try:
+            outputs = self.batch_fn(np.concatenate(inputs, axis=0))
+        except Exception as e:
+            for _, future, _ in batch:
+                future.set_exception(e)
+            with self._lock:
+                self._stats["errors"] += 1
+            return
+        finished = time.perf_counter()
+
+        for i, (_, future, _) in enumerate(batch):
+            future.set_result(outputs[i])
+
+        with self._lock:
+            self._stats["batches"] += 1
+            self._stats["items"] += len(batch)
+            self._stats["total_wait_s"] += sum(started - enqueued for _, _, enqueued in batch)
+            self._stats["total_invoke_s"] += finished - started
+            self._batch_sizes[len(batch)] += 1
+
+    def stats(self) -> dict:
+        """Queue depth, batch fill and timing counters since start."""
+        with self._lock:
+            s = dict(self._stats)
+            sizes = dict(sorted(self._batch_sizes.items()))
+        batches = s["batches"]
+        items = s["items"]
+        return {
+            "queue_depth": self._queue.qsize(),
+            "max_queue_depth": s["max_queue_depth"],
+            "submitted": s["submitted"],
+            "batches": batches,
+            "items": items,
+            "errors": s["errors"],
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait_ms,
+            "mean_batch_size": items / batches if batches else 0.0,
+            "batch_fill": items / (batches * self.max_batch_size) if batches else 0.0,
+            "batch_size_histogram": sizes,
+            "mean_queue_wait_ms": s["total_wait_s"] / items * 1000 if items else 0.0,
+            "mean_invoke_ms": s["total_invoke_s"] / batches * 1000 if batches else 0.0,
+        }
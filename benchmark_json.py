@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Serialization benchmark for the roster responses (/students).
+
+Builds a /students payload for N synthetic students and reports, per 10k
+students: encode time for jsonify's stdlib settings and for each installed
+serializer, compression time and size for each content coding, and the cost
+of answering from the pre-encoded response cache. Serializers or codings
+that are not installed are reported as unavailable.
+"""
+
+import argparse
+import json
+import time
+
+import response_encoding
+from response_encoding import EncodedBody, ResponseCache
+
+
+def students_payload(n: int) -> dict:
+    students = []
+    for i in range(n):
+        name = f"Student {i:05d} Name"
+        students.append({
+            "name": name,
+            "registrationNumber": str(99220040000 + i),
+            "isPresent": i % 3 == 0,
+            "initial": name[0],
+        })
+    return {
+        "students": students,
+        "present_students": [s["registrationNumber"] for s in students if s["isPresent"]],
+    }
+
+
+def _best_ms(fn, repeats: int) -> float:
+    best = float("inf")
+    for _ in range(repeats):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def main():
+    ap = argparse.ArgumentParser(description="JSON encode and compression cost of the /students response.")
+    ap.add_argument("--students", type=int, default=10_000)
+    ap.add_argument("--repeats", type=int, default=20, help="Runs per measurement; the fastest is shown.")
+    args = ap.parse_args()
+
+    payload = students_payload(args.students)
+    per_10k = 10_000 / args.students
+
+    print(f"\n=== /students response, {args.students} students (times per 10k students) ===")
+    print(f"{'serializer':<22} {'encode ms':>10} {'bytes':>10}")
+    # What jsonify does outside debug mode: stdlib encoder, ASCII-escaped, sorted keys, compact
+    flask_default = lambda: json.dumps(
+        payload, ensure_ascii=True, sort_keys=True, separators=(",", ":")
+    ).encode("utf-8")
+    body = flask_default()
+    print(f"{'jsonify (stdlib)':<22} {_best_ms(flask_default, args.repeats) * per_10k:>10.2f} {len(body):>10}")
+    for name in response_encoding.SERIALIZERS:
+        try:
+            _, encode = response_encoding._import_serializer(name)
+        except ImportError:
+            print(f"{name:<22} {'unavailable':>10}")
+            continue
+        body = encode(payload)
+        print(f"{name:<22} {_best_ms(lambda: encode(payload), args.repeats) * per_10k:>10.2f} {len(body):>10}")
+
+    body = response_encoding.dumps(payload)
+    print(f"\n{'content coding':<22} {'compress ms':>11} {'bytes':>10} {'ratio':>7}")
+    for encoding in response_encoding.ENCODINGS:
+        if encoding not in response_encoding.available_encodings():
+            print(f"{encoding:<22} {'unavailable':>11}")
+            continue
+        data = response_encoding.compress(body, encoding)
+        ms = _best_ms(lambda: response_encoding.compress(body, encoding), args.repeats)
+        print(f"{encoding:<22} {ms * per_10k:>11.2f} {len(data):>10} {len(body) / len(data):>7.1f}")
+
+    cache = ResponseCache()
+    build = lambda: (payload, 200)
+    encoding = response_encoding.negotiate_encoding("gzip, br")
+
+    def cached():
+        cached_body, _ = cache.get("students", 1, build)
+        return cached_body.encoded(encoding, 1024)
+
+    cached()  # the first poll after a change builds, encodes and compresses
+    miss_ms = _best_ms(lambda: EncodedBody(response_encoding.dumps(payload)).encoded(encoding, 1024), args.repeats)
+    hit_ms = _best_ms(cached, args.repeats)
+    print(f"\nServer serializer: {response_encoding.get_serializer()[0]}, coding: {encoding or 'identity'}")
+    print(f"Unchanged state, cache miss (encode + compress): {miss_ms * per_10k:.3f} ms per 10k")
+    print(f"Unchanged state, cache hit                     : {hit_ms * per_10k:.4f} ms per 10k")
+
+
+if __name__ == "__main__":
+    main()
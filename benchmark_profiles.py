@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Accuracy / latency benchmark of MobileFaceNet execution profiles.
+
+The labeled set is a folder with one sub-folder per person:
+
+    labeled_faces/
+        99220041253/ img1.jpg img2.jpg ...
+        99220041389/ ...
+
+Every image is preprocessed once; each profile then embeds all faces. Genuine
+pairs are two images of the same person, imposter pairs two images of
+different people. TAR and FAR at the threshold are reported next to their
+change against the float32 baseline, along with per-face latency (batch of
+one) and batched throughput.
+"""
+
+import argparse
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+import MobileFaceNet_Optimized as mfn
+
+IMAGE_SUFFIXES = {".jpg", ".jpeg", ".png", ".bmp"}
+
+
+def load_labeled_faces(root: str) -> tuple[np.ndarray, np.ndarray]:
+    """(faces, labels): preprocessed (N, 112, 112, 3) crops and the person index of each."""
+    pre = mfn.FacePreprocessor()
+    faces, labels = [], []
+    people = sorted(p for p in Path(root).iterdir() if p.is_dir())
+    for label, person in enumerate(people):
+        for path in sorted(person.iterdir()):
+            if path.suffix.lower() not in IMAGE_SUFFIXES:
+                continue
+            image = cv2.imread(str(path))
+            if image is None:
+                continue
+            face = pre(image)
+            if face is not None:
+                faces.append(face[0].copy())
+                labels.append(label)
+    pre.close()
+    if not faces:
+        raise ValueError(f"No faces found under {root}")
+    return np.stack(faces), np.asarray(labels)
+
+
+def pair_scores(embeddings: np.ndarray, labels: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Cosine scores of all unordered pairs, split into genuine and imposter."""
+    e = embeddings / np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12)
+    sims = e @ e.T
+    i, j = np.triu_indices(len(labels), k=1)
+    same = labels[i] == labels[j]
+    scores = sims[i, j]
+    return scores[same], scores[~same]
+
+
+def run_profile(name: str, faces: np.ndarray, batch_size: int, repeats: int) -> dict:
+    mfn.load_profile(name)
+
+    mfn.get_embedding(faces[:1])  # warm up
+    started = time.perf_counter()
+    for _ in range(repeats):
+        for k in range(len(faces)):
+            mfn.get_embedding(faces[k:k + 1])
+    per_face_ms = (time.perf_counter() - started) / (repeats * len(faces)) * 1000
+
+    embeddings = []
+    started = time.perf_counter()
+    for k in range(0, len(faces), batch_size):
+        embeddings.append(mfn.get_embeddings(faces[k:k + batch_size]))
+    throughput = len(faces) / (time.perf_counter() - started)
+
+    return {"per_face_ms": per_face_ms, "faces_per_s": throughput, "embeddings": np.concatenate(embeddings)}
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Compare TFLite execution profiles on latency, throughput, TAR and FAR.")
+    ap.add_argument("labeled_dir", help="Folder of <person>/<image> files.")
+    ap.add_argument("--profiles", nargs="+", default=list(mfn.PROFILES), choices=list(mfn.PROFILES))
+    ap.add_argument("--threshold", type=float, default=mfn.SIMILARITY_THRESHOLD)
+    ap.add_argument("--batch-size", type=int, default=16)
+    ap.add_argument("--repeats", type=int, default=3, help="Passes over the set for the latency measurement.")
+    args = ap.parse_args()
+
+    faces, labels = load_labeled_faces(args.labeled_dir)
+    print(f"\nLabeled set: {len(faces)} faces, {len(set(labels.tolist()))} people")
+
+    profiles = [p for p in args.profiles if Path(mfn.PROFILES[p].model_path).exists()]
+    skipped = sorted(set(args.profiles) - set(profiles))
+    if skipped:
+        print(f"Skipping profiles without a converted model (see convert_model.py): {', '.join(skipped)}")
+    if "float32" in profiles:
+        profiles.remove("float32")
+    profiles.insert(0, "float32")
+
+    print(f"\n{'profile':<20} {'ms/face':>8} {'faces/s':>8} {'TAR':>8} {'dTAR':>8} {'FAR':>8} {'dFAR':>8}")
+    baseline = None
+    for name in profiles:
+        r = run_profile(name, faces, args.batch_size, args.repeats)
+        genuine, imposter = pair_scores(r["embeddings"], labels)
+        tar = float((genuine > args.threshold).mean()) if genuine.size else float("nan")
+        far = float((imposter > args.threshold).mean()) if imposter.size else float("nan")
+        if baseline is None:
+            baseline = (tar, far)
+        print(
+            f"{name:<20} {r['per_face_ms']:>8.2f} {r['faces_per_s']:>8.1f} "
+            f"{tar * 100:>7.2f}% {(tar - baseline[0]) * 100:>+7.2f}% "
+            f"{far * 100:>7.3f}% {(far - baseline[1]) * 100:>+7.3f}%"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Startup-time and memory benchmark for the embedding module.
+
+Each runtime is measured in a fresh interpreter process: time to import
+MobileFaceNet_Optimized, time to load the model, time to the first embedding,
+and the process's peak RSS afterwards. Runtimes that are not installed are
+reported as unavailable.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+import MobileFaceNet_Optimized
+
+_CHILD = r"""
+import json, os, sys, time
+started = time.perf_counter()
+import numpy as np
+import MobileFaceNet_Optimized as m
+imported = time.perf_counter()
+m.load_model(m.MODEL_PATH)
+loaded = time.perf_counter()
+m.get_embeddings(np.zeros((1, m.FACE_SIZE, m.FACE_SIZE, 3), dtype=np.float32))
+embedded = time.perf_counter()
+if {with_mediapipe}:
+    m._face_detection_module()
+ready = time.perf_counter()
+try:
+    import resource
+    rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":
+        rss_kb //= 1024
+except ImportError:
+    rss_kb = None
+print(json.dumps({
+    "runtime": m.get_runtime()[0],
+    "tensorflow_loaded": "tensorflow" in sys.modules,
+    "mediapipe_loaded": "mediapipe" in sys.modules,
+    "import_s": imported - started,
+    "load_s": loaded - imported,
+    "first_embedding_s": embedded - loaded,
+    "total_s": ready - started,
+    "peak_rss_mb": rss_kb / 1024 if rss_kb else None,
+}))
+"""
+
+
+def measure(runtime: str, with_mediapipe: bool) -> dict | None:
+    env = dict(os.environ, MOBILEFACENET_RUNTIME=runtime)
+    proc = subprocess.run(
+        [sys.executable, "-c", _CHILD.replace("{with_mediapipe}", str(with_mediapipe))],
+        capture_output=True,
+        text=True,
+        env=env,
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+    )
+    if proc.returncode != 0:
+        return None
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Compare start-up time and RSS across TFLite runtimes.")
+    ap.add_argument("--runtimes", nargs="+", default=list(MobileFaceNet_Optimized.RUNTIMES),
+                    choices=list(MobileFaceNet_Optimized.RUNTIMES))
+    ap.add_argument("--with-mediapipe", action="store_true", help="Also import mediapipe (detection path).")
+    ap.add_argument("--repeats", type=int, default=3, help="Fresh processes per runtime; the median is shown.")
+    args = ap.parse_args()
+
+    print(f"\n=== Embedding module start-up ({'with' if args.with_mediapipe else 'without'} mediapipe) ===")
+    print(f"{'runtime':<16} {'import s':>9} {'load s':>8} {'1st emb s':>10} {'total s':>8} {'peak RSS MB':>12}")
+    for runtime in args.runtimes:
+        runs = [r for r in (measure(runtime, args.with_mediapipe) for _ in range(args.repeats)) if r]
+        if not runs:
+            print(f"{runtime:<16} {'unavailable':>9}")
+            continue
+        runs.sort(key=lambda r: r["total_s"])
+        r = runs[len(runs) // 2]
+        rss = f"{r['peak_rss_mb']:.0f}" if r["peak_rss_mb"] else "n/a"
+        print(
+            f"{runtime:<16} {r['import_s']:>9.3f} {r['load_s']:>8.3f} {r['first_embedding_s']:>10.3f} "
+            f"{r['total_s']:>8.3f} {rss:>12}"
+        )
+
+
+if __name__ == "__main__":
+    main()
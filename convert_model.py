@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Produce quantized variants of the MobileFaceNet embedding model.
+
+TFLite cannot re-quantize an existing .tflite file, so conversion starts from
+the source model the float32 output_model.tflite was exported from (a
+SavedModel directory or a Keras .h5/.keras file). Outputs are written next
+to the base model as output_model_<variant>.tflite, which is where the
+float16 / int8 execution profiles in MobileFaceNet_Optimized.py look.
+
+Variants:
+  float16  - float16 weights, float32 compute fallback
+  dynamic  - int8 weights, dynamic-range activations (no calibration data)
+  int8     - full integer ops, calibrated on real face crops (--calibration-dir);
+             input and output stay float32 so callers do not change
+"""
+
+import argparse
+import os
+from pathlib import Path
+
+import cv2
+import tensorflow as tf
+
+import MobileFaceNet_Optimized
+
+IMAGE_SUFFIXES = {".jpg", ".jpeg", ".png", ".bmp"}
+
+
+def _converter(source: str) -> tf.lite.TFLiteConverter:
+    if os.path.isdir(source):
+        return tf.lite.TFLiteConverter.from_saved_model(source)
+    return tf.lite.TFLiteConverter.from_keras_model(tf.keras.models.load_model(source))
+
+
+def representative_faces(calibration_dir: str, limit: int):
+    """Preprocessed face crops from an image folder, in the exact form the model sees at runtime."""
+    pre = MobileFaceNet_Optimized.FacePreprocessor()
+    count = 0
+    for path in sorted(Path(calibration_dir).rglob("*")):
+        if path.suffix.lower() not in IMAGE_SUFFIXES:
+            continue
+        image = cv2.imread(str(path))
+        if image is None:
+            continue
+        face = pre(image)
+        if face is None:
+            continue
+        yield [face.copy()]
+        count += 1
+        if count >= limit:
+            break
+    pre.close()
+
+
+def convert(source: str, variant: str, calibration_dir: str | None = None, calibration_limit: int = 300,
+            out_path: str | None = None) -> str:
+    converter = _converter(source)
+    if variant == "float16":
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.target_spec.supported_types = [tf.float16]
+    elif variant == "dynamic":
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    elif variant == "int8":
+        if not calibration_dir:
+            raise ValueError("int8 conversion needs --calibration-dir with face images.")
+        faces = list(representative_faces(calibration_dir, calibration_limit))
+        if len(faces) < 10:
+            raise ValueError(f"Only {len(faces)} usable faces in {calibration_dir}; need at least 10 to calibrate.")
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.representative_dataset = lambda: iter(faces)
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+    else:
+        raise ValueError(f"Unknown variant: {variant}")
+
+    out_path = out_path or MobileFaceNet_Optimized.model_variant_path(variant)
+    with open(out_path, "wb") as f:
+        f.write(converter.convert())
+    return out_path
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Convert the MobileFaceNet source model to quantized TFLite variants.")
+    ap.add_argument("source", help="SavedModel directory or Keras .h5/.keras file.")
+    ap.add_argument("--variant", nargs="+", choices=["float16", "dynamic", "int8"], default=["float16", "int8"])
+    ap.add_argument("--calibration-dir", default=None, help="Face images for int8 calibration (searched recursively).")
+    ap.add_argument("--calibration-limit", type=int, default=300)
+    args = ap.parse_args()
+
+    for variant in args.variant:
+        out = convert(args.source, variant, args.calibration_dir, args.calibration_limit)
+        print(f"{variant:<8} -> {out}  ({os.path.getsize(out) / 1024:.0f} KiB)")
+
+
+if __name__ == "__main__":
+    main()
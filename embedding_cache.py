@@ -0,0 +1,121 @@
+import hashlib
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+# Stored for images where no face was found, so retries skip detection as well.
+_NO_FACE = np.empty(0, dtype=np.float32)
+
+_fingerprints: dict[tuple[str, float, int], str] = {}
+
+
+def model_fingerprint(model_path: str) -> str:
+    """Short content hash of a model file, recomputed only when its mtime or size changes."""
+    st = os.stat(model_path)
+    key = (os.path.abspath(model_path), st.st_mtime, st.st_size)
+    if key not in _fingerprints:
+        h = hashlib.sha256()
+        with open(model_path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                h.update(block)
+        _fingerprints[key] = h.hexdigest()[:16]
+    return _fingerprints[key]
+
+
+class EmbeddingCache:
+    """
+    Content-addressed cache of face embeddings.
+
+    Keys hash the image bytes together with `namespace`, which should name the
+    model version and preprocessing parameters so a model or pipeline change
+    never serves stale embeddings. An in-memory LRU holds `capacity` entries;
+    if `disk_dir` is set, entries are also written there as .npy files and
+    survive restarts. A cached "no face" result is returned as None.
+    """
+
+    def __init__(self, namespace: str, capacity: int = 4096, disk_dir: str | None = None):
+        self.namespace = namespace
+        self.capacity = capacity
+        self.disk_dir = disk_dir
+        self._entries: OrderedDict[str, np.ndarray] = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "disk_hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    def key(self, image_bytes: bytes) -> str:
+        h = hashlib.sha256(self.namespace.encode("utf-8"))
+        h.update(b"\0")
+        h.update(image_bytes)
+        return h.hexdigest()
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, key[:2], f"{key}.npy")
+
+    def _remember(self, key: str, value: np.ndarray) -> None:
+        """Insert into the LRU; caller holds the lock."""
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.capacity:
+            self._entries.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def lookup(self, key: str) -> tuple[bool, np.ndarray | None]:
+        """(hit, embedding). A hit with embedding None means no face was found in that image."""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                self._stats["hits"] += 1
+                return True, (value if value.size else None)
+
+        if self.disk_dir:
+            try:
+                value = np.load(self._disk_path(key))
+            except (OSError, ValueError):
+                value = None
+            if value is not None:
+                with self._lock:
+                    self._remember(key, value)
+                    self._stats["disk_hits"] += 1
+                return True, (value if value.size else None)
+
+        with self._lock:
+            self._stats["misses"] += 1
+        return False, None
+
+    def store(self, key: str, embedding: np.ndarray | None) -> None:
+        value = _NO_FACE if embedding is None else np.asarray(embedding, dtype=np.float32)
+        with self._lock:
+            self._remember(key, value)
+            self._stats["stores"] += 1
+
+        if self.disk_dir:
+            path = self._disk_path(key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write to a temp file and rename so readers never see a partial entry.
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    np.save(f, value)
+                os.replace(tmp, path)
+            except OSError:
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+                raise
+
+    def stats(self) -> dict:
+        with self._lock:
+            s = dict(self._stats)
+            size = len(self._entries)
+        lookups = s["hits"] + s["disk_hits"] + s["misses"]
+        return {
+            **s,
+            "size": size,
+            "capacity": self.capacity,
+            "disk_tier": bool(self.disk_dir),
+            "hit_rate": (s["hits"] + s["disk_hits"]) / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,354 @@
+import argparse
+import time
+
+import numpy as np
+
+# Same cut-off MobileFaceNet_Optimized.py uses for a successful match.
+SIMILARITY_THRESHOLD = 0.75
+EMBEDDING_DIM = 128  # output width of output_model.tflite
+
+
+def _normalize(x: np.ndarray) -> np.ndarray:
+    x = np.asarray(x, dtype=np.float32)
+    norms = np.linalg.norm(x, axis=-1, keepdims=True)
+    return x / np.maximum(norms, 1e-12)
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k largest scores, best first."""
+    k = min(k, scores.shape[0])
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    idx = np.argpartition(-scores, k - 1)[:k]
+    return idx[np.argsort(-scores[idx])]
+
+
+class _Block:
+    """Growable row store with O(1) swap-remove, used for the gallery and IVF lists."""
+
+    def __init__(self, dim: int, capacity: int = 64):
+        self.vectors = np.empty((capacity, dim), dtype=np.float32)
+        self.ids: list[str] = []
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def view(self) -> np.ndarray:
+        return self.vectors[: len(self.ids)]
+
+    def append(self, reg: str, vec: np.ndarray) -> int:
+        n = len(self.ids)
+        if n == self.vectors.shape[0]:
+            grown = np.empty((n * 2, self.vectors.shape[1]), dtype=np.float32)
+            grown[:n] = self.vectors
+            self.vectors = grown
+        self.vectors[n] = vec
+        self.ids.append(reg)
+        return n
+
+    def pop(self, slot: int) -> str | None:
+        """Remove row `slot`; returns the id that was moved into it, if any."""
+        last = len(self.ids) - 1
+        moved = None
+        if slot != last:
+            self.vectors[slot] = self.vectors[last]
+            self.ids[slot] = self.ids[last]
+            moved = self.ids[slot]
+        self.ids.pop()
+        return moved
+
+
+class ExactIndex:
+    """Brute-force cosine search; the reference the approximate indexes are measured against."""
+
+    def __init__(self, dim: int = EMBEDDING_DIM):
+        self.dim = dim
+        self._block = _Block(dim)
+        self._slots: dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def __contains__(self, reg: str) -> bool:
+        return reg in self._slots
+
+    def add(self, reg: str, embedding: np.ndarray) -> None:
+        if reg in self._slots:
+            self.remove(reg)
+        self._slots[reg] = self._block.append(reg, _normalize(embedding))
+
+    def remove(self, reg: str) -> bool:
+        slot = self._slots.pop(reg, None)
+        if slot is None:
+            return False
+        moved = self._block.pop(slot)
+        if moved is not None:
+            self._slots[moved] = slot
+        return True
+
+    def search(self, query: np.ndarray, k: int = 1, threshold: float | None = None) -> list[tuple[str, float]]:
+        if not self._slots:
+            return []
+        scores = self._block.view @ _normalize(query)
+        hits = [(self._block.ids[i], float(scores[i])) for i in _top_k(scores, k)]
+        if threshold is not None:
+            hits = [h for h in hits if h[1] > threshold]
+        return hits
+
+
+class IVFIndex:
+    """
+    Inverted-file index over L2-normalised embeddings.
+
+    A k-means coarse quantizer splits the gallery into `n_lists` cells; a query
+    scores only the `n_probe` closest cells, exactly (no lossy codes), so any
+    hit it returns has the same similarity the exact search would report.
+    Students can be enrolled or removed at any time without retraining.
+    """
+
+    def __init__(self, dim: int = EMBEDDING_DIM, n_lists: int = 256, n_probe: int = 8, seed: int = 0):
+        self.dim = dim
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.seed = seed
+        self.centroids: np.ndarray | None = None
+        self._lists: list[_Block] = []
+        self._where: dict[str, tuple[int, int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._where)
+
+    def __contains__(self, reg: str) -> bool:
+        return reg in self._where
+
+    @property
+    def is_trained(self) -> bool:
+        return self.centroids is not None
+
+    def train(self, sample: np.ndarray, iterations: int = 10) -> None:
+        """Fit the coarse quantizer (spherical k-means) on a sample of embeddings."""
+        x = _normalize(sample)
+        n_lists = min(self.n_lists, x.shape[0])
+        rng = np.random.default_rng(self.seed)
+        centroids = x[rng.choice(x.shape[0], n_lists, replace=False)].copy()
+        for _ in range(iterations):
+            assign = np.argmax(x @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assign, x)
+            counts = np.bincount(assign, minlength=n_lists)
+            empty = counts == 0
+            # Re-seed empty cells so every list stays in use.
+            if empty.any():
+                sums[empty] = x[rng.choice(x.shape[0], int(empty.sum()), replace=False)]
+            centroids = _normalize(sums)
+        self.centroids = centroids
+        self.n_lists = n_lists
+        old = [(reg, self._lists[li].vectors[slot].copy()) for reg, (li, slot) in self._where.items()]
+        self._lists = [_Block(self.dim, capacity=16) for _ in range(n_lists)]
+        self._where = {}
+        for reg, vec in old:
+            self._insert(reg, vec)
+
+    def _insert(self, reg: str, vec: np.ndarray) -> None:
+        li = int(np.argmax(self.centroids @ vec))
+        self._where[reg] = (li, self._lists[li].append(reg, vec))
+
+    def add(self, reg: str, embedding: np.ndarray) -> None:
+        if not self.is_trained:
+            raise RuntimeError("IVFIndex.train() must be called before add().")
+        if reg in self._where:
+            self.remove(reg)
+        self._insert(reg, _normalize(embedding))
+
+    def remove(self, reg: str) -> bool:
+        where = self._where.pop(reg, None)
+        if where is None:
+            return False
+        li, slot = where
+        moved = self._lists[li].pop(slot)
+        if moved is not None:
+            self._where[moved] = (li, slot)
+        return True
+
+    def search(self, query: np.ndarray, k: int = 1, threshold: float | None = None) -> list[tuple[str, float]]:
+        if not self._where:
+            return []
+        q = _normalize(query)
+        best_ids: list[str] = []
+        best_scores: list[np.ndarray] = []
+        for li in _top_k(self.centroids @ q, self.n_probe):
+            lst = self._lists[li]
+            if not len(lst):
+                continue
+            scores = lst.view @ q
+            top = _top_k(scores, k)
+            best_ids.extend(lst.ids[i] for i in top)
+            best_scores.append(scores[top])
+        if not best_scores:
+            return []
+        scores = np.concatenate(best_scores)
+        hits = [(best_ids[i], float(scores[i])) for i in _top_k(scores, k)]
+        if threshold is not None:
+            hits = [h for h in hits if h[1] > threshold]
+        return hits
+
+
+class HNSWIndex:
+    """Thin wrapper over `hnswlib` (optional dependency) with the same add/remove/search API."""
+
+    def __init__(self, dim: int = EMBEDDING_DIM, max_elements: int = 1024, m: int = 16,
+                 ef_construction: int = 200, ef_search: int = 64):
+        try:
+            import hnswlib
+        except ImportError as e:
+            raise ImportError("HNSWIndex requires hnswlib (pip install hnswlib).") from e
+
+        self.dim = dim
+        self._index = hnswlib.Index(space="ip", dim=dim)
+        self._index.init_index(max_elements=max_elements, ef_construction=ef_construction, M=m,
+                               allow_replace_deleted=True)
+        self._index.set_ef(ef_search)
+        self._labels: dict[str, int] = {}
+        self._regs: dict[int, str] = {}
+        self._next_label = 0
+
+    def __len__(self) -> int:
+        return len(self._labels)
+
+    def __contains__(self, reg: str) -> bool:
+        return reg in self._labels
+
+    def add(self, reg: str, embedding: np.ndarray) -> None:
+        if reg in self._labels:
+            self.remove(reg)
+        # Labels are never reused: replace_deleted lets hnswlib pick which deleted
+        # slot to overwrite, and it drops that slot's old label mapping.
+        label = self._next_label
+        self._next_label += 1
+        if len(self._labels) >= self._index.get_max_elements():
+            self._index.resize_index(2 * self._index.get_max_elements())
+        self._index.add_items(_normalize(embedding)[None, :], [label], replace_deleted=True)
+        self._labels[reg] = label
+        self._regs[label] = reg
+
+    def remove(self, reg: str) -> bool:
+        label = self._labels.pop(reg, None)
+        if label is None:
+            return False
+        self._index.mark_deleted(label)
+        del self._regs[label]
+        return True
+
+    def search(self, query: np.ndarray, k: int = 1, threshold: float | None = None) -> list[tuple[str, float]]:
+        if not self._labels:
+            return []
+        labels, distances = self._index.knn_query(_normalize(query)[None, :], k=min(k, len(self._labels)))
+        hits = [(self._regs[int(l)], 1.0 - float(d)) for l, d in zip(labels[0], distances[0])]
+        if threshold is not None:
+            hits = [h for h in hits if h[1] > threshold]
+        return hits
+
+
+def _synthetic_gallery(n: int, dim: int, clusters: int, rng: np.random.Generator) -> np.ndarray:
+    """Embeddings grouped around `clusters` centres, closer to real face galleries than pure noise."""
+    centres = _normalize(rng.standard_normal((clusters, dim)))
+    x = centres[rng.integers(0, clusters, n)] + 0.9 * _normalize(rng.standard_normal((n, dim)))
+    return _normalize(x)
+
+
+def _decision(hits: list[tuple[str, float]]) -> str | None:
+    return hits[0][0] if hits else None
+
+
+def benchmark(index, gallery_size: int, queries: int, dim: int, clusters: int, seed: int,
+              threshold: float = SIMILARITY_THRESHOLD) -> dict:
+    """
+    Compare `index` with ExactIndex on the same synthetic gallery.
+
+    Half of the queries are noisy re-captures of enrolled students, half are
+    unenrolled faces. Recall is the share of queries where the approximate
+    index makes the same accept/identity decision as the exact search at
+    `threshold`.
+    """
+    rng = np.random.default_rng(seed)
+    gallery = _synthetic_gallery(gallery_size, dim, clusters, rng)
+    regs = [f"{99220000000 + i}" for i in range(gallery_size)]
+
+    exact = ExactIndex(dim)
+    t0 = time.perf_counter()
+    for reg, vec in zip(regs, gallery):
+        exact.add(reg, vec)
+    exact_build = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    if isinstance(index, IVFIndex):
+        index.train(gallery[rng.choice(gallery_size, min(gallery_size, 50 * index.n_lists), replace=False)])
+    for reg, vec in zip(regs, gallery):
+        index.add(reg, vec)
+    ann_build = time.perf_counter() - t0
+
+    n_genuine = queries // 2
+    picked = rng.integers(0, gallery_size, n_genuine)
+    genuine = _normalize(gallery[picked] + 0.35 * _normalize(rng.standard_normal((n_genuine, dim))))
+    imposter = _synthetic_gallery(queries - n_genuine, dim, clusters, rng)
+    probe = np.concatenate([genuine, imposter])
+
+    t0 = time.perf_counter()
+    expected = [_decision(exact.search(q, 1, threshold)) for q in probe]
+    exact_time = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    got = [_decision(index.search(q, 1, threshold)) for q in probe]
+    ann_time = time.perf_counter() - t0
+
+    agree = sum(e == g for e, g in zip(expected, got))
+    accepted = sum(e is not None for e in expected)
+    found = sum(e is not None and e == g for e, g in zip(expected, got))
+    return {
+        "gallery_size": gallery_size,
+        "queries": len(probe),
+        "exact_build_s": exact_build,
+        "ann_build_s": ann_build,
+        "exact_ms_per_query": exact_time / len(probe) * 1000,
+        "ann_ms_per_query": ann_time / len(probe) * 1000,
+        "speedup": exact_time / ann_time if ann_time else float("inf"),
+        "decision_agreement": agree / len(probe),
+        "recall_at_threshold": found / accepted if accepted else 1.0,
+        "exact_accepts": accepted,
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(
+        description="Recall-vs-latency benchmark of approximate embedding search against exact cosine search."
+    )
+    ap.add_argument("--gallery", type=int, default=100_000, help="Number of enrolled embeddings (default: 100000).")
+    ap.add_argument("--queries", type=int, default=2000, help="Number of probe embeddings (default: 2000).")
+    ap.add_argument("--dim", type=int, default=EMBEDDING_DIM)
+    ap.add_argument("--clusters", type=int, default=64, help="Synthetic gallery cluster count (default: 64).")
+    ap.add_argument("--index", choices=["ivf", "hnsw"], default="ivf")
+    ap.add_argument("--lists", type=int, default=256, help="IVF: number of inverted lists.")
+    ap.add_argument("--probe", type=int, nargs="+", default=[1, 4, 8, 16, 32], help="IVF: n_probe values to sweep.")
+    ap.add_argument("--ef", type=int, nargs="+", default=[16, 32, 64, 128], help="HNSW: ef values to sweep.")
+    ap.add_argument("--threshold", type=float, default=SIMILARITY_THRESHOLD)
+    ap.add_argument("--seed", type=int, default=7)
+    args = ap.parse_args()
+
+    print(f"\n=== ANN benchmark: {args.index}, gallery={args.gallery}, threshold={args.threshold} ===")
+    print(f"{'param':>8} {'recall':>8} {'agree':>8} {'exact ms':>9} {'ann ms':>8} {'speedup':>8}")
+    sweep = args.probe if args.index == "ivf" else args.ef
+    for value in sweep:
+        if args.index == "ivf":
+            index = IVFIndex(args.dim, n_lists=args.lists, n_probe=value, seed=args.seed)
+        else:
+            index = HNSWIndex(args.dim, max_elements=args.gallery, ef_search=value)
+        r = benchmark(index, args.gallery, args.queries, args.dim, args.clusters, args.seed, args.threshold)
+        print(
+            f"{value:>8} {r['recall_at_threshold'] * 100:>7.2f}% {r['decision_agreement'] * 100:>7.2f}% "
+            f"{r['exact_ms_per_query']:>9.3f} {r['ann_ms_per_query']:>8.3f} {r['speedup']:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,9 @@
 import 'package:flutter/material.dart';
 import 'package:http/http.dart' as http;
+import 'dart:async';
 import 'dart:convert';
+import 'dart:io';
+import 'dart:math';
 import 'package:logger/logger.dart';
 import 'config.dart';
 import 'face_verification_modal.dart';
@@ -252,12 +255,25 @@ class _UserScreenState extends State<UserScreen>
   Future<void> uploadUniqueId(String uniqueId) async {
     setState(() => _isLoading = true);
 
+    // One key per attendance attempt: if a response is lost and we retry,
+    // the server replays the first result instead of a duplicate error.
+    final idempotencyKey =
+        '$uniqueId-${DateTime.now().microsecondsSinceEpoch}-${Random().nextInt(1 << 32)}';
+
     try {
-      final response = await http
-          .post(
+      http.Response? response;
+      for (var attempt = 1; response == null; attempt++) {
+        try {
+          response = await http.post(
             Uri.parse('${Config.serverUrl}/upload_unique_id/$uniqueId'),
-          )
-          .timeout(Duration(seconds: 5));
+            headers: {'Idempotency-Key': idempotencyKey},
+          ).timeout(Duration(seconds: 5));
+        } on TimeoutException {
+          if (attempt >= 3) rethrow;
+        } on SocketException {
+          if (attempt >= 3) rethrow;
+        }
+      }
 
       final jsonResponse = json.decode(response.body);
 
@@ -0,0 +1,65 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class IdempotencyCache:
+    """
+    Bounded TTL map from client-supplied Idempotency-Key to the response first
+    returned for it, so a retried request gets the original answer without
+    touching storage.
+
+    Each entry also stores a fingerprint of the request it answered (e.g. the
+    registration number); a key replayed with a different fingerprint is a
+    client bug and is reported as a conflict rather than answered. At most
+    `capacity` entries are kept, oldest first out, and entries expire after
+    `ttl_s` seconds.
+    """
+
+    def __init__(self, capacity: int = 10_000, ttl_s: float = 600.0):
+        self.capacity = capacity
+        self.ttl_s = ttl_s
+        self._entries: OrderedDict[str, tuple[float, str, dict, int]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"replays": 0, "conflicts": 0, "stores": 0, "evictions": 0, "expired": 0}
+
+    def _expire(self, now: float) -> None:
+        """Drop expired entries from the old end; caller holds the lock."""
+        while self._entries:
+            key, (expires_at, _, _, _) = next(iter(self._entries.items()))
+            if expires_at > now:
+                break
+            del self._entries[key]
+            self._stats["expired"] += 1
+
+    def lookup(self, key: str, fingerprint: str) -> tuple[dict, int] | None:
+        """
+        (payload, status) stored for `key`, or None if unseen or expired.
+        Raises KeyError if `key` was used for a different request.
+        """
+        with self._lock:
+            self._expire(time.monotonic())
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            _, stored_fingerprint, payload, status = entry
+            if stored_fingerprint != fingerprint:
+                self._stats["conflicts"] += 1
+                raise KeyError(key)
+            self._stats["replays"] += 1
+            return payload, status
+
+    def store(self, key: str, fingerprint: str, payload: dict, status: int) -> None:
+        with self._lock:
+            now = time.monotonic()
+            self._expire(now)
+            self._entries.pop(key, None)  # re-insert at the new end so expiry order holds
+            self._entries[key] = (now + self.ttl_s, fingerprint, payload, status)
+            self._stats["stores"] += 1
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"size": len(self._entries), "capacity": self.capacity, "ttl_s": self.ttl_s, **self._stats}
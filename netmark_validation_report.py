@@ -1,10 +1,16 @@
 import argparse
 import csv
 import ipaddress
+import mmap
+import os
 import re
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from typing import Iterable
 
+import numpy as np
+import pandas as pd
+
 
 # Matches text that indicates the app could NOT connect to classroom server.
 # (Based on `file_sender/lib/user_screen.dart` + common SocketException strings)
@@ -37,14 +43,46 @@ def _compile_any(patterns: list[str]) -> re.Pattern:
 _RE_CONN_ERR = _compile_any(CONNECTION_ERROR_PATTERNS)
 _RE_CONN_OK = _compile_any(CONNECTED_OK_PATTERNS)
 
+# Literal prefilter for the mmap scanner: every line one of the combined
+# regexes can match contains the leading literal of one of its patterns
+# (ASCII-lowercased), so only lines holding a literal reach the regex.
+# Non-ASCII characters that IGNORECASE folds onto ASCII letters (dotted /
+# dotless i, long s, Kelvin sign) also make a line a candidate.
+_REGEX_META = set("\\.^$*+?{}[]|()")
+_CASEFOLD_TO_ASCII = [c.encode("utf-8") for c in ("\u0130", "\u0131", "\u017f", "\u212a")]
+
+
+def _leading_literal(pattern: str) -> bytes:
+    """Text every match of `pattern` starts with, or b"" when there is none to rely on."""
+    if "|" in pattern:
+        return b""
+    if pattern.startswith(r"\b"):
+        pattern = pattern[2:]
+    literal = []
+    for i, ch in enumerate(pattern):
+        if ch in _REGEX_META or (not ch.isascii() and ch.lower() != ch.upper()):
+            break
+        literal.append(ch)
+    else:
+        i = len(pattern)
+    if i < len(pattern) and pattern[i] in "*?{" and literal:
+        literal.pop()  # quantified character is optional
+    return "".join(literal).encode("utf-8").lower()
+
+
+def _prefilter(patterns: list[str]) -> list[bytes] | None:
+    literals = [_leading_literal(p) for p in patterns]
+    if not all(literals):
+        return None  # some pattern has no usable literal: regex every line
+    return list(dict.fromkeys(literals))
+
+
+_PREFILTERS = {
+    "connected_ok": (_RE_CONN_OK, _prefilter(CONNECTED_OK_PATTERNS)),
+    "connection_errors": (_RE_CONN_ERR, _prefilter(CONNECTION_ERROR_PATTERNS)),
+}
 
-def is_in_same_subnet(client_ip: str, host_ip: str, cidr: int) -> bool:
-    try:
-        network = ipaddress.ip_network(f"{host_ip}/{cidr}", strict=False)
-        ip_obj = ipaddress.ip_address(client_ip)
-        return ip_obj in network
-    except ValueError:
-        return False
+SCAN_CHUNK_BYTES = 64 * 1024 * 1024
 
 
 def iter_lines(paths: Iterable[Path]) -> Iterable[tuple[Path, str]]:
@@ -87,13 +125,177 @@ def analyze_logs(log_paths: list[Path]) -> dict:
     return totals
 
 
-def analyze_ip_tracking(ip_tracking_csv: Path, host_ip: str, cidr: int) -> dict:
+def _line_bounds(data: bytes, pos: int) -> tuple[int, int]:
+    """Start/end of the line holding `pos`; \\n, \\r\\n and lone \\r all end a line, as in text mode."""
+    newline = data.rfind(b"\n", 0, pos)
+    start = max(newline, data.rfind(b"\r", newline + 1, pos)) + 1
+    end = data.find(b"\n", pos)
+    if end == -1:
+        end = len(data)
+    cr = data.find(b"\r", pos, end)
+    return start, end if cr == -1 else cr
+
+
+def _count_lines(data: bytes, lowered: bytes, regex: re.Pattern, literals: list[bytes] | None) -> int:
+    """Lines of `data` that `regex` matches, decoding only the lines that pass the prefilter."""
+    if literals is None:
+        text = data.decode("utf-8", errors="replace")
+        return sum(1 for line in re.split(r"\r\n|\r|\n", text) if regex.search(line))
+
+    checked: dict[int, bool] = {}
+    for literal in literals:
+        pos = lowered.find(literal)
+        while pos != -1:
+            start, end = _line_bounds(lowered, pos)
+            if start not in checked:
+                line = data[start:end].decode("utf-8", errors="replace")
+                checked[start] = regex.search(line) is not None
+            pos = lowered.find(literal, end)
+    return sum(checked.values())
+
+
+def _scan_chunk(task: tuple[str, int, int]) -> tuple[str, dict[str, int]]:
+    """Worker: count outcome lines in bytes [start, end) of one log file."""
+    path, start, end = task
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        data = mm[start:end]
+    lowered = data.lower()
+    folded = [c for c in _CASEFOLD_TO_ASCII if c in data]
+    counts = {}
+    for name, (regex, literals) in _PREFILTERS.items():
+        counts[name] = _count_lines(data, lowered, regex, None if literals is None else literals + folded)
+    return path, counts
+
+
+def _split_on_lines(path: Path, chunk_bytes: int) -> list[tuple[str, int, int]]:
+    """Byte ranges of roughly `chunk_bytes` that end just after a newline."""
+    size = path.stat().st_size
+    if size == 0:
+        return []
+    tasks = []
+    with path.open("rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        start = 0
+        while start < size:
+            cut = mm.find(b"\n", min(start + chunk_bytes, size) - 1)
+            end = size if cut == -1 else cut + 1
+            tasks.append((str(path), start, end))
+            start = end
+    return tasks
+
+
+def analyze_logs_parallel(
+    log_paths: list[Path], workers: int | None = None, chunk_bytes: int = SCAN_CHUNK_BYTES
+) -> dict:
+    """
+    Same result as analyze_logs, for gigabyte logcat dumps: each file is
+    memory-mapped, split on line boundaries into chunks, and the chunks are
+    scanned across a process pool with a literal prefilter ahead of the
+    regexes. Per-chunk counts are merged per file and in total.
+    """
+    totals = {
+        "connected_ok": 0,
+        "connection_errors": 0,
+        "files_missing": [],
+        "per_file": {},
+    }
+
+    existing = []
+    for p in log_paths:
+        if p.exists():
+            existing.append(p)
+        else:
+            totals["files_missing"].append(str(p))
+
+    per_file = {str(p): {"connected_ok": 0, "connection_errors": 0} for p in existing}
+    tasks = [t for p in existing for t in _split_on_lines(p, chunk_bytes)]
+
+    workers = min(workers or os.cpu_count() or 1, max(len(tasks), 1))
+    if workers == 1:
+        results = list(map(_scan_chunk, tasks))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_scan_chunk, tasks))
+
+    for key, counts in results:
+        for name, n in counts.items():
+            per_file[key][name] += n
+            totals[name] += n
+
+    totals["per_file"] = per_file
+    return totals
+
+
+# Dotted-quad IPv4 as ipaddress accepts it (no leading zeros), parsed without ipaddress.
+_IPV4_OCTET = r"(25[0-5]|2[0-4]\d|1\d\d|[1-9]?\d)"
+_IPV4_RE = rf"^{_IPV4_OCTET}\.{_IPV4_OCTET}\.{_IPV4_OCTET}\.{_IPV4_OCTET}$"
+_U64 = (1 << 64) - 1
+
+
+def parse_subnets(host_ip: str | None, cidr: int, subnets: Iterable[str] = ()) -> list:
+    """Allowed networks: host_ip/cidr first (if given), then each extra CIDR such as 10.2.9.0/24 or fd00:1::/64."""
+    networks = []
+    if host_ip:
+        networks.append(ipaddress.ip_network(f"{host_ip}/{cidr}", strict=False))
+    for spec in subnets:
+        networks.append(ipaddress.ip_network(spec.strip(), strict=False))
+    return list(dict.fromkeys(networks))
+
+
+def ip_to_ints(ips: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    (version, hi, lo) arrays for an array of IP strings: the address as two
+    uint64 halves and 4 or 6, or version 0 where the string is not an IP.
+    IPv4 is parsed in one vectorized pass; the rest go through ipaddress.
+    IPv4-mapped IPv6 (::ffff:a.b.c.d, as dual-stack servers log) is IPv4.
+    """
+    n = len(ips)
+    version = np.zeros(n, dtype=np.int8)
+    hi = np.zeros(n, dtype=np.uint64)
+    lo = np.zeros(n, dtype=np.uint64)
+
+    octets = pd.Series(ips, dtype=object).str.strip().str.extract(_IPV4_RE)
+    is_v4 = octets[0].notna().to_numpy()
+    if is_v4.any():
+        parts = octets[is_v4].astype(np.uint64).to_numpy()
+        lo[is_v4] = (parts[:, 0] << 24) | (parts[:, 1] << 16) | (parts[:, 2] << 8) | parts[:, 3]
+        version[is_v4] = 4
+
+    for i in np.flatnonzero(~is_v4):
+        try:
+            addr = ipaddress.ip_address(str(ips[i]).strip())
+        except ValueError:
+            continue
+        if addr.version == 6 and addr.ipv4_mapped is not None:
+            addr = addr.ipv4_mapped
+        value = int(addr)
+        version[i] = addr.version
+        hi[i] = value >> 64
+        lo[i] = value & _U64
+    return version, hi, lo
+
+
+def subnet_matches(version: np.ndarray, hi: np.ndarray, lo: np.ndarray, networks: list) -> np.ndarray:
+    """(n_ips, n_networks) bool matrix from ip_to_ints output: IP i lies in network j. One masked comparison per network."""
+    matches = np.zeros((len(version), len(networks)), dtype=bool)
+    for j, net in enumerate(networks):
+        net_value, mask = int(net.network_address), int(net.netmask)
+        matches[:, j] = (
+            (version == net.version)
+            & ((hi & np.uint64(mask >> 64)) == np.uint64(net_value >> 64))
+            & ((lo & np.uint64(mask & _U64)) == np.uint64(net_value & _U64))
+        )
+    return matches
+
+
+def analyze_ip_tracking(ip_tracking_csv: Path, host_ip: str | None, cidr: int, subnets: Iterable[str] = ()) -> dict:
     result = {
         "total_ips": 0,
         "subnet_ok": 0,
         "subnet_fail": 0,
+        "invalid_ips": 0,
         "invalid_rows": 0,
         "missing_file": None,
+        "per_subnet": {},
     }
 
     if not ip_tracking_csv.exists():
@@ -101,21 +303,30 @@ def analyze_ip_tracking(ip_tracking_csv: Path, host_ip: str, cidr: int) -> dict:
         return result
 
     with ip_tracking_csv.open(newline="", encoding="utf-8", errors="replace") as f:
-        reader = csv.DictReader(f)
-        if not reader.fieldnames or "IP" not in reader.fieldnames:
-            result["invalid_rows"] += 1
-            return result
-
-        for row in reader:
-            ip = (row.get("IP") or "").strip()
-            if not ip:
-                continue
-            result["total_ips"] += 1
-            if is_in_same_subnet(ip, host_ip, cidr):
-                result["subnet_ok"] += 1
-            else:
-                result["subnet_fail"] += 1
+        header = next(csv.reader(f), None)
+    if not header or "IP" not in header:
+        result["invalid_rows"] += 1
+        return result
 
+    networks = parse_subnets(host_ip, cidr, subnets)
+    ips = pd.read_csv(
+        ip_tracking_csv, usecols=["IP"], dtype=str, keep_default_na=False, encoding_errors="replace"
+    )["IP"].str.strip()
+    ips = ips[ips != ""]
+
+    # Classroom devices repeat all semester: classify each distinct IP once.
+    codes, uniques = pd.factorize(ips)
+    rows_per_ip = np.bincount(codes, minlength=len(uniques))
+    version, hi, lo = ip_to_ints(np.asarray(uniques, dtype=object))
+    matches = subnet_matches(version, hi, lo, networks)
+    in_any = matches.any(axis=1)
+
+    result["total_ips"] = int(rows_per_ip.sum())
+    result["subnet_ok"] = int(rows_per_ip[in_any].sum())
+    result["subnet_fail"] = result["total_ips"] - result["subnet_ok"]
+    result["invalid_ips"] = int(rows_per_ip[version == 0].sum())
+    per_subnet = rows_per_ip @ matches
+    result["per_subnet"] = {str(net): int(n) for net, n in zip(networks, per_subnet)}
     return result
 
 
@@ -129,6 +340,19 @@ def main():
         default=[],
         help="One or more log files (flutter run output, adb logcat dump, stress_test_logs/*.log).",
     )
+    ap.add_argument(
+        "--scan",
+        choices=["mmap", "lines"],
+        default="mmap",
+        help="mmap: parallel memory-mapped chunk scan (default); lines: single-threaded line-by-line scan.",
+    )
+    ap.add_argument("--workers", type=int, default=None, help="Processes for --scan mmap (default: CPU count).")
+    ap.add_argument(
+        "--chunk-mb",
+        type=int,
+        default=SCAN_CHUNK_BYTES // (1024 * 1024),
+        help="Chunk size in MiB for --scan mmap.",
+    )
     ap.add_argument(
         "--ip-tracking",
         default="ip_tracking.csv",
@@ -145,11 +369,22 @@ def main():
         default=24,
         help="Subnet CIDR (default: 24 for /24).",
     )
+    ap.add_argument(
+        "--subnet",
+        nargs="*",
+        default=[],
+        help="Further allowed classroom subnets, IPv4 or IPv6 (e.g. 10.2.9.0/24 fd00:1::/64).",
+    )
 
     args = ap.parse_args()
 
     logs = [Path(p) for p in args.logs]
-    log_stats = analyze_logs(logs) if logs else None
+    if not logs:
+        log_stats = None
+    elif args.scan == "mmap":
+        log_stats = analyze_logs_parallel(logs, args.workers, args.chunk_mb * 1024 * 1024)
+    else:
+        log_stats = analyze_logs(logs)
 
     print("\n=== Classroom connection outcome counts ===")
     if not logs:
@@ -174,22 +409,27 @@ def main():
             print(f"  Error %               : {total_err / total * 100:.2f}%")
 
     print("\n=== Subnet validation (ip_tracking.csv) ===")
-    if not args.host_ip:
-        print("Subnet validation skipped (pass --host-ip 10.2.8.97 --cidr 24).")
+    if not args.host_ip and not args.subnet:
+        print("Subnet validation skipped (pass --host-ip 10.2.8.97 --cidr 24, and/or --subnet <cidr> ...).")
     else:
-        ip_stats = analyze_ip_tracking(Path(args.ip_tracking), args.host_ip, args.cidr)
+        ip_stats = analyze_ip_tracking(Path(args.ip_tracking), args.host_ip, args.cidr, args.subnet)
         if ip_stats["missing_file"]:
             print(f"Missing file: {ip_stats['missing_file']}")
         else:
-            print(f"Host: {args.host_ip}/{args.cidr}")
+            print(f"Allowed subnets: {', '.join(ip_stats['per_subnet'])}")
             print(f"  Total IPs checked : {ip_stats['total_ips']}")
             print(f"  In subnet (OK)    : {ip_stats['subnet_ok']}")
             print(f"  Out of subnet     : {ip_stats['subnet_fail']}")
+            print(f"  Not an IP address : {ip_stats['invalid_ips']}")
             if ip_stats["total_ips"]:
                 print(f"  OK %              : {ip_stats['subnet_ok'] / ip_stats['total_ips'] * 100:.2f}%")
                 print(
                     f"  Out %             : {ip_stats['subnet_fail'] / ip_stats['total_ips'] * 100:.2f}%"
                 )
+            if len(ip_stats["per_subnet"]) > 1:
+                print("  Per subnet:")
+                for net, n in ip_stats["per_subnet"].items():
+                    print(f"    {net:<24}: {n}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,163 @@
+import gzip
+import os
+import threading
+from collections import OrderedDict
+
+# JSON encoders in order of preference; all return UTF-8 bytes. orjson and
+# msgspec encode lists of thousands of student dicts several times faster than
+# the stdlib encoder behind jsonify. Force one with NETMARK_JSON=orjson|msgspec|json.
+SERIALIZERS = ("orjson", "msgspec", "json")
+_serializer = None
+
+# Content codings the server can produce, in order of preference at equal quality.
+ENCODINGS = ("br", "gzip")
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5  # the dynamic-content sweet spot: near gzip -9 ratio at gzip -6 speed
+
+
+def _import_serializer(name):
+    if name == "orjson":
+        import orjson
+        return name, orjson.dumps
+    if name == "msgspec":
+        import msgspec
+        return name, msgspec.json.encode
+    if name == "json":
+        import json
+        return name, lambda obj: json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    raise ValueError(f"Unknown JSON serializer {name!r}; choose from {', '.join(SERIALIZERS)}")
+
+
+def get_serializer():
+    """(name, dumps) of the JSON encoder in use, imported on first call."""
+    global _serializer
+    if _serializer is None:
+        forced = os.environ.get("NETMARK_JSON")
+        if forced:
+            _serializer = _import_serializer(forced)
+        else:
+            for name in SERIALIZERS:
+                try:
+                    _serializer = _import_serializer(name)
+                    break
+                except ImportError:
+                    continue
+    return _serializer
+
+
+def dumps(obj) -> bytes:
+    return get_serializer()[1](obj)
+
+
+def _brotli():
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return brotli
+
+
+def available_encodings() -> tuple[str, ...]:
+    return tuple(e for e in ENCODINGS if e != "br" or _brotli() is not None)
+
+
+def negotiate_encoding(accept_encoding: str | None) -> str | None:
+    """
+    The content coding to use for an Accept-Encoding header: the available
+    coding with the highest q-value (ties go to ENCODINGS order), or None
+    for identity. "*" covers codings not listed; q=0 refuses one.
+    """
+    if not accept_encoding:
+        return None
+    quality = {}
+    for part in accept_encoding.split(","):
+        token, _, params = part.strip().partition(";")
+        token = token.strip().lower()
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if token:
+            quality[token] = q
+    best, best_q = None, 0.0
+    for encoding in available_encodings():
+        q = quality.get(encoding, quality.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+    if encoding == "br":
+        return _brotli().compress(body, quality=BROTLI_QUALITY)
+    raise ValueError(f"Unsupported content coding {encoding!r}")
+
+
+class EncodedBody:
+    """A serialized JSON body plus its compressed variants, each made on first request."""
+
+    def __init__(self, body: bytes):
+        self.body = body
+        self._compressed: dict[str, bytes] = {}
+        self._lock = threading.Lock()
+
+    def encoded(self, encoding: str | None, min_bytes: int) -> tuple[bytes, str | None]:
+        """(bytes to send, Content-Encoding) for a negotiated coding; small bodies are sent as is."""
+        if encoding is None or len(self.body) < min_bytes:
+            return self.body, None
+        with self._lock:
+            data = self._compressed.get(encoding)
+            if data is None:
+                data = self._compressed[encoding] = compress(self.body, encoding)
+        return data, encoding
+
+
+class ResponseCache:
+    """
+    Pre-encoded response bodies for read endpoints whose answer only changes
+    with server state. An entry is reused while the caller's `state` token
+    (e.g. roster file stat + attendance version) is unchanged, so repeated
+    dashboard polls skip both building and serializing the payload, and
+    compressed variants are made once per state. At most `capacity` keys
+    are kept, least recently used first out.
+    """
+
+    def __init__(self, capacity: int = 256):
+        self.capacity = capacity
+        self._entries: OrderedDict[object, tuple[object, int, EncodedBody]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def get(self, key, state, build) -> tuple[EncodedBody, int]:
+        """
+        (body, status) for `key` at `state`; on a miss `build()` returns the
+        (payload, status) to serialize. Error answers (status >= 400) are not kept.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == state:
+                self._entries.move_to_end(key)
+                self._stats["hits"] += 1
+                return entry[2], entry[1]
+            self._stats["misses"] += 1
+
+        payload, status = build()
+        body = EncodedBody(dumps(payload))
+        if status < 400:
+            with self._lock:
+                self._entries[key] = (state, status, body)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.capacity:
+                    self._entries.popitem(last=False)
+                    self._stats["evictions"] += 1
+        return body, status
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"size": len(self._entries), "capacity": self.capacity, **self._stats}
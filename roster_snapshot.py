@@ -0,0 +1,299 @@
+import argparse
+import csv
+import mmap
+import os
+import struct
+import tempfile
+import time
+
+import numpy as np
+
+from sessions import normalize_reg
+
+# Snapshot file layout (little-endian), every section 8-byte aligned:
+#   header     _HEADER
+#   ids        count x id_width bytes, sorted, NUL-padded ASCII/UTF-8
+#   rows       count x u32, roster row of each sorted id
+#   positions  count x u32, sorted position of each roster row
+#   name_ref   count x u32, name table index of each roster row
+#   name_off   (name_count + 1) x u64, offsets into the name blob
+#   name_blob  name_bytes of UTF-8, each distinct name once
+#   bitmap     ceil(count / 8) bytes if FLAG_ATTENDANCE, bit i (LSB first) = roster row i present
+MAGIC = b"NMRS"
+FORMAT_VERSION = 1
+FLAG_ATTENDANCE = 1
+_HEADER = struct.Struct("<4sHHIIIIQqq")  # magic, version, flags, count, id_width, name_count, pad, name_bytes,
+#                                          source mtime_ns, source size
+
+REG_COLUMN = "Registration Number"
+NAME_COLUMN = "Name"
+
+
+def _align(n: int) -> int:
+    return (n + 7) & ~7
+
+
+def read_roster_csv(path: str) -> tuple[list[str], list[str]]:
+    """
+    (registration numbers, names) in file order. Every field is read as text,
+    so registration numbers are never coerced to floats; rows without one are skipped.
+    """
+    with open(path, newline="", encoding="utf-8-sig", errors="replace") as f:
+        reader = csv.reader(f)
+        header = [h.strip() for h in next(reader, [])]
+        if REG_COLUMN not in header or NAME_COLUMN not in header:
+            raise ValueError(f"Roster needs {REG_COLUMN!r} and {NAME_COLUMN!r} columns")
+        reg_col, name_col = header.index(REG_COLUMN), header.index(NAME_COLUMN)
+        regs, names = [], []
+        for row in reader:
+            if len(row) <= max(reg_col, name_col):
+                continue
+            reg = normalize_reg(row[reg_col])
+            if reg:
+                regs.append(reg)
+                names.append(row[name_col].strip())
+    return regs, names
+
+
+def pack_bitmap(present: np.ndarray) -> np.ndarray:
+    """Bool array -> uint8 bitmap, bit i (LSB first) of byte i // 8 = present[i]."""
+    return np.packbits(np.asarray(present, dtype=bool), bitorder="little")
+
+
+def unpack_bitmap(bitmap: np.ndarray, count: int) -> np.ndarray:
+    return np.unpackbits(np.asarray(bitmap, dtype=np.uint8), count=count, bitorder="little").astype(bool)
+
+
+def encode_snapshot(regs: list[str], names: list[str], present: np.ndarray | None = None,
+                    source: tuple[int, int] = (0, 0)) -> bytes:
+    """Snapshot bytes for a roster (in roster order) and optionally its attendance as a bool array."""
+    count = len(regs)
+    encoded = [r.encode("utf-8") for r in regs]
+    id_width = max((len(e) for e in encoded), default=1) or 1
+    ids = np.array(encoded, dtype=f"S{id_width}")
+    rows = np.argsort(ids, kind="stable").astype(np.uint32)
+    positions = np.empty(count, dtype=np.uint32)
+    positions[rows] = np.arange(count, dtype=np.uint32)
+
+    name_index: dict[str, int] = {}
+    name_ref = np.fromiter((name_index.setdefault(n, len(name_index)) for n in names), dtype=np.uint32, count=count)
+    blobs = [n.encode("utf-8") for n in name_index]
+    name_off = np.zeros(len(blobs) + 1, dtype=np.uint64)
+    np.cumsum([len(b) for b in blobs], out=name_off[1:])
+    name_blob = b"".join(blobs)
+
+    flags = FLAG_ATTENDANCE if present is not None else 0
+    sections = [
+        ids[rows].tobytes(),
+        rows.tobytes(),
+        positions.tobytes(),
+        name_ref.tobytes(),
+        name_off.tobytes(),
+        name_blob,
+    ]
+    if present is not None:
+        if len(present) != count:
+            raise ValueError("Attendance must have one entry per roster row")
+        sections.append(pack_bitmap(present).tobytes())
+
+    out = bytearray(_HEADER.pack(MAGIC, FORMAT_VERSION, flags, count, id_width, len(blobs), 0, len(name_blob),
+                                 source[0], source[1]))
+    for section in sections:
+        out += section
+        out += b"\0" * (_align(len(out)) - len(out))
+    return bytes(out)
+
+
+def write_snapshot(path: str, data: bytes) -> None:
+    """Write snapshot bytes atomically: readers see the old file or the new one, never a partial one."""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+class Roster:
+    """
+    Read-only view of a snapshot. The arrays are zero-copy views of the
+    buffer (an mmap when loaded from disk), so loading costs a header parse
+    whatever the roster size, and pages are only touched when used.
+    Registration numbers are looked up by binary search on the sorted ids.
+    """
+
+    def __init__(self, buffer, source_path: str | None = None):
+        self._buffer = buffer
+        self.source_path = source_path
+        (magic, version, flags, count, id_width, name_count, _, name_bytes, mtime_ns,
+         size) = _HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError("Not a roster snapshot (or an unsupported version)")
+        self.count = count
+        self.id_width = id_width
+        self.source = (mtime_ns, size)
+
+        offset = _HEADER.size
+
+        def section(dtype, n):
+            nonlocal offset
+            array = np.frombuffer(buffer, dtype=dtype, count=n, offset=offset)
+            offset = _align(offset + array.nbytes)
+            return array
+
+        self.ids = section(f"S{id_width}", count)
+        self.rows = section(np.uint32, count)
+        self.positions = section(np.uint32, count)
+        self.name_ref = section(np.uint32, count)
+        self._name_off = section(np.uint64, name_count + 1)
+        self._name_blob = section(np.uint8, name_bytes)
+        self.attendance = section(np.uint8, (count + 7) // 8) if flags & FLAG_ATTENDANCE else None
+        self._names = None
+        self._regs = None
+        self._search_text = None
+
+    def __len__(self) -> int:
+        return self.count
+
+    def index(self, reg) -> int:
+        """Roster row of a registration number, or -1."""
+        key = normalize_reg(reg).encode("utf-8")
+        if not key or len(key) > self.id_width or not self.count:
+            return -1
+        pos = int(np.searchsorted(self.ids, key))
+        if pos < self.count and self.ids[pos] == key:
+            return int(self.rows[pos])
+        return -1
+
+    def indices(self, regs) -> np.ndarray:
+        """Roster rows of many registration numbers at once (int64, -1 where not on the roster)."""
+        keys = [normalize_reg(r).encode("utf-8") for r in regs]
+        out = np.full(len(keys), -1, dtype=np.int64)
+        fits = np.array([0 < len(k) <= self.id_width for k in keys], dtype=bool)
+        if not fits.any() or not self.count:
+            return out
+        wanted = np.array([k for k, ok in zip(keys, fits) if ok], dtype=f"S{self.id_width}")
+        pos = np.minimum(np.searchsorted(self.ids, wanted), self.count - 1)
+        found = self.ids[pos] == wanted
+        rows = np.where(found, self.rows[pos].astype(np.int64), -1)
+        out[fits] = rows
+        return out
+
+    def reg_numbers(self) -> list[str]:
+        """Registration numbers in roster order."""
+        if self._regs is None:
+            self._regs = [r.decode("utf-8") for r in self.ids[self.positions].tolist()]
+        return self._regs
+
+    def names(self) -> list[str]:
+        """Names in roster order; each distinct name is decoded once."""
+        if self._names is None:
+            blob = self._name_blob.tobytes()
+            off = self._name_off.tolist()
+            table = [blob[off[i]:off[i + 1]].decode("utf-8") for i in range(len(off) - 1)]
+            self._names = [table[k] for k in self.name_ref.tolist()]
+        return self._names
+
+    def name(self, row: int) -> str:
+        k = int(self.name_ref[row])
+        return bytes(self._name_blob[int(self._name_off[k]):int(self._name_off[k + 1])]).decode("utf-8")
+
+    def search(self, query: str) -> np.ndarray:
+        """Roster rows (in roster order) whose name or registration number contains `query`, case-insensitive."""
+        if self._search_text is None:
+            self._search_text = [f"{n}\n{r}".lower() for n, r in zip(self.names(), self.reg_numbers())]
+        query = query.lower()
+        return np.flatnonzero(np.fromiter((query in t for t in self._search_text), dtype=bool, count=self.count))
+
+    def present_rows(self) -> np.ndarray:
+        if self.attendance is None:
+            return np.empty(0, dtype=np.int64)
+        return np.flatnonzero(unpack_bitmap(self.attendance, self.count))
+
+
+def load_snapshot(path: str) -> Roster:
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            raise ValueError(f"Empty snapshot: {path}")
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return Roster(buffer, path)
+
+
+def snapshot_path(csv_path: str) -> str:
+    return os.path.splitext(csv_path)[0] + ".snapshot"
+
+
+def load_roster(csv_path: str, path: str | None = None) -> Roster:
+    """
+    The roster in `csv_path`, from its snapshot when the snapshot was taken
+    from the CSV as it is now (same mtime and size); otherwise the CSV is
+    parsed once and the snapshot rewritten. If the snapshot cannot be
+    replaced (read-only directory, or mapped by another reader on Windows)
+    the freshly encoded bytes are used directly.
+    """
+    path = path or snapshot_path(csv_path)
+    stat = os.stat(csv_path)
+    source = (stat.st_mtime_ns, stat.st_size)
+    try:
+        roster = load_snapshot(path)
+        if roster.source == source:
+            return roster
+    except (OSError, ValueError):
+        pass
+
+    regs, names = read_roster_csv(csv_path)
+    data = encode_snapshot(regs, names, source=source)
+    try:
+        write_snapshot(path, data)
+        return load_snapshot(path)
+    except OSError:
+        return Roster(data)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Build a binary roster snapshot and time loading it.")
+    ap.add_argument("csv", nargs="?", default="user_data.csv")
+    ap.add_argument("-o", "--output", default=None, help="Snapshot path (default: <csv stem>.snapshot).")
+    ap.add_argument("--attendance", default=None,
+                    help="verified_ids.csv whose registration numbers go in the attendance bitmap.")
+    args = ap.parse_args()
+
+    output = args.output or snapshot_path(args.csv)
+    started = time.perf_counter()
+    regs, names = read_roster_csv(args.csv)
+    parsed = time.perf_counter()
+    present = None
+    if args.attendance:
+        with open(args.attendance, newline="", encoding="utf-8", errors="replace") as f:
+            marked = {normalize_reg(row.get(REG_COLUMN, "")) for row in csv.DictReader(f)}
+        present = np.array([r in marked for r in regs], dtype=bool)
+    stat = os.stat(args.csv)
+    data = encode_snapshot(regs, names, present, source=(stat.st_mtime_ns, stat.st_size))
+    write_snapshot(output, data)
+    written = time.perf_counter()
+
+    roster = load_snapshot(output)
+    loaded = time.perf_counter()
+    probe = roster.index(regs[len(regs) // 2]) if regs else -1
+    looked_up = time.perf_counter()
+
+    csv_bytes = os.path.getsize(args.csv)
+    print(f"\n=== Roster snapshot {output} ===")
+    print(f"Students            : {len(roster)} ({len(set(names))} distinct names, id width {roster.id_width})")
+    print(f"Size                : {len(data)} bytes (CSV {csv_bytes} bytes)")
+    print(f"Parse CSV           : {(parsed - started) * 1000:.2f} ms")
+    print(f"Encode + write      : {(written - parsed) * 1000:.2f} ms")
+    print(f"Load (mmap)         : {(loaded - written) * 1000:.3f} ms")
+    print(f"First lookup        : {(looked_up - loaded) * 1000:.3f} ms (row {probe})")
+    if roster.attendance is not None:
+        print(f"Present (bitmap)    : {len(roster.present_rows())}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,253 @@
-from flask import Flask, request
+from flask import Flask, request, jsonify
+from werkzeug.utils import secure_filename
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
 
 app = Flask(__name__)
 
+UPLOAD_DIR = os.environ.get("NETMARK_UPLOAD_DIR", "/data/data/com.termux/files/home")  # Termux home directory
+# In-progress resumable uploads: <id>.part holds the bytes received so far, <id>.json the declared file.
+PARTIAL_DIR = os.path.join(UPLOAD_DIR, ".uploads")
+MAX_UPLOAD_BYTES = int(os.environ.get("NETMARK_MAX_UPLOAD_BYTES", 2 * 1024 ** 3))
+MAX_CONCURRENT_UPLOADS = int(os.environ.get("NETMARK_MAX_CONCURRENT_UPLOADS", 4))
+# Unfinished resumable uploads: how many may exist, how many bytes they may declare
+# in total, and how long one may sit idle before its partial file is deleted.
+MAX_PENDING_UPLOADS = int(os.environ.get("NETMARK_MAX_PENDING_UPLOADS", 16))
+MAX_PENDING_UPLOAD_BYTES = int(os.environ.get("NETMARK_MAX_PENDING_UPLOAD_BYTES", 2 * MAX_UPLOAD_BYTES))
+PENDING_UPLOAD_TTL_SECONDS = int(os.environ.get("NETMARK_PENDING_UPLOAD_TTL_SECONDS", 24 * 3600))
+CHUNK_BYTES = 64 * 1024
+
+# Requests larger than this are refused with 413 before the body is read
+app.config['MAX_CONTENT_LENGTH'] = MAX_UPLOAD_BYTES
+
+_upload_slots = threading.BoundedSemaphore(MAX_CONCURRENT_UPLOADS)
+_upload_locks = {}
+_upload_locks_guard = threading.Lock()
+_pending_guard = threading.Lock()
+
+
+def _upload_lock(upload_id):
+    with _upload_locks_guard:
+        return _upload_locks.setdefault(upload_id, threading.Lock())
+
+
+def _meta_path(upload_id):
+    return os.path.join(PARTIAL_DIR, f"{upload_id}.json")
+
+
+def _part_path(upload_id):
+    return os.path.join(PARTIAL_DIR, f"{upload_id}.part")
+
+
+def _load_meta(upload_id):
+    """Declared filename/size/sha256 of an upload, or None for an unknown or malformed id."""
+    try:
+        uuid.UUID(hex=upload_id)
+        with open(_meta_path(upload_id), encoding="utf-8") as f:
+            return json.load(f)
+    except (ValueError, OSError):
+        return None
+
+
+def _received(upload_id):
+    try:
+        return os.path.getsize(_part_path(upload_id))
+    except OSError:
+        return 0
+
+
+def _forget_lock(upload_id):
+    with _upload_locks_guard:
+        _upload_locks.pop(upload_id, None)
+
+
+def _pending_uploads():
+    """
+    Declared sizes of the unfinished uploads, by id, after deleting those idle
+    for longer than PENDING_UPLOAD_TTL_SECONDS; caller holds _pending_guard.
+    """
+    try:
+        names = os.listdir(PARTIAL_DIR)
+    except FileNotFoundError:
+        return {}
+    pending = {}
+    now = time.time()
+    for name in names:
+        upload_id, ext = os.path.splitext(name)
+        if ext != ".json":
+            continue
+        meta = _load_meta(upload_id)
+        if meta is None:
+            continue
+        try:
+            idle = now - max(os.path.getmtime(p) for p in (_meta_path(upload_id), _part_path(upload_id))
+                             if os.path.exists(p))
+        except (ValueError, OSError):
+            continue  # finished or expired meanwhile
+        if idle <= PENDING_UPLOAD_TTL_SECONDS:
+            pending[upload_id] = meta["size"]
+            continue
+        lock = _upload_lock(upload_id)
+        if not lock.acquire(blocking=False):
+            pending[upload_id] = meta["size"]  # a chunk is arriving right now
+            continue
+        try:
+            for path in (_part_path(upload_id), _meta_path(upload_id)):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+            _forget_lock(upload_id)
+        finally:
+            lock.release()
+    return pending
+
+
+def _sha256_file(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_BYTES), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _busy():
+    response = jsonify({"error": "Too many uploads in progress, please retry"})
+    response.headers['Retry-After'] = "5"
+    return response, 503
+
+
 @app.route('/upload', methods=['POST'])
 def upload_file():
-    file = request.files['file']
-    file.save(f"/data/data/com.termux/files/home/{file.filename}")  # Save file in Termux home directory
-    return "File received successfully!", 200
+    if not _upload_slots.acquire(blocking=False):
+        return _busy()
+    try:
+        file = request.files['file']
+        filename = secure_filename(file.filename or '')
+        if not filename:
+            return "Invalid filename", 400
+        file.save(os.path.join(UPLOAD_DIR, filename))
+        return "File received successfully!", 200
+    finally:
+        _upload_slots.release()
+
+
+@app.route('/uploads', methods=['POST'])
+def create_upload():
+    """
+    Start a resumable upload. Body: {"filename", "size" (bytes), "sha256" (hex)}.
+    Send the bytes with PATCH /uploads/<id> from the returned offset.
+    Unfinished uploads are capped in number and declared bytes (503 when
+    full); one left idle for PENDING_UPLOAD_TTL_SECONDS is deleted.
+    """
+    data = request.get_json(force=True, silent=True) or {}
+    filename = secure_filename(str(data.get('filename', '')))
+    sha256 = str(data.get('sha256', '')).lower()
+    try:
+        size = int(data.get('size'))
+    except (TypeError, ValueError):
+        return jsonify({"error": "size is required"}), 400
+    if not filename:
+        return jsonify({"error": "filename is required"}), 400
+    if len(sha256) != 64 or any(c not in "0123456789abcdef" for c in sha256):
+        return jsonify({"error": "sha256 must be 64 hex digits"}), 400
+    if not 0 <= size <= MAX_UPLOAD_BYTES:
+        return jsonify({"error": f"size must be between 0 and {MAX_UPLOAD_BYTES} bytes"}), 413
+
+    with _pending_guard:
+        pending = _pending_uploads()
+        if len(pending) >= MAX_PENDING_UPLOADS or sum(pending.values()) + size > MAX_PENDING_UPLOAD_BYTES:
+            response = jsonify({"error": "Too many unfinished uploads, finish one or retry later"})
+            response.headers['Retry-After'] = "60"
+            return response, 503
+        upload_id = uuid.uuid4().hex
+        os.makedirs(PARTIAL_DIR, exist_ok=True)
+        open(_part_path(upload_id), "wb").close()
+        with open(_meta_path(upload_id), "w", encoding="utf-8") as f:
+            json.dump({"filename": filename, "size": size, "sha256": sha256}, f)
+    return jsonify({"id": upload_id, "offset": 0, "size": size}), 201
+
+
+@app.route('/uploads/<upload_id>', methods=['GET'])
+def upload_status(upload_id):
+    """Bytes received so far: where a resumed upload continues."""
+    meta = _load_meta(upload_id)
+    if meta is None:
+        return jsonify({"error": "Unknown upload"}), 404
+    return jsonify({"id": upload_id, "offset": _received(upload_id), "size": meta["size"]}), 200
+
+
+@app.route('/uploads/<upload_id>', methods=['PATCH'])
+def upload_chunk(upload_id):
+    """
+    Append the raw request body at the Upload-Offset header, streamed to disk
+    in CHUNK_BYTES pieces. The offset must equal the bytes received so far
+    (409 with the current offset otherwise). When the declared size is
+    reached the SHA-256 is checked and the file moved into UPLOAD_DIR; on a
+    mismatch the received bytes are discarded and the upload restarts at 0.
+    """
+    try:
+        offset = int(request.headers.get('Upload-Offset', ''))
+    except ValueError:
+        return jsonify({"error": "Upload-Offset header is required"}), 400
+    if _load_meta(upload_id) is None:
+        return jsonify({"error": "Unknown upload"}), 404
+
+    lock = _upload_lock(upload_id)
+    if not lock.acquire(blocking=False):
+        return jsonify({"error": "Upload already in progress", "offset": _received(upload_id)}), 409
+    try:
+        meta = _load_meta(upload_id)  # may have completed or expired while we looked up the lock
+        if meta is None:
+            _forget_lock(upload_id)
+            return jsonify({"error": "Unknown upload"}), 404
+        if not _upload_slots.acquire(blocking=False):
+            return _busy()
+        try:
+            received = _received(upload_id)
+            if offset != received:
+                return jsonify({"error": "Offset mismatch", "offset": received}), 409
+            remaining = meta["size"] - received
+            if request.content_length is not None and request.content_length > remaining:
+                return jsonify({"error": "Chunk exceeds the declared size", "offset": received}), 413
+
+            with open(_part_path(upload_id), "ab") as f:
+                while True:
+                    chunk = request.stream.read(min(CHUNK_BYTES, remaining + 1))
+                    if not chunk:
+                        break
+                    if len(chunk) > remaining:
+                        # Keep what fits; the client resumes from the reported offset
+                        f.write(chunk[:remaining])
+                        received += remaining
+                        return jsonify({"error": "Chunk exceeds the declared size", "offset": received}), 413
+                    f.write(chunk)
+                    received += len(chunk)
+                    remaining -= len(chunk)
+
+            if received < meta["size"]:
+                return jsonify({"id": upload_id, "offset": received, "complete": False}), 200
+
+            sha256 = _sha256_file(_part_path(upload_id))
+            if sha256 != meta["sha256"]:
+                open(_part_path(upload_id), "wb").close()
+                return jsonify({"error": "Checksum mismatch", "sha256": sha256, "offset": 0}), 422
+            os.replace(_part_path(upload_id), os.path.join(UPLOAD_DIR, meta["filename"]))
+            os.remove(_meta_path(upload_id))
+            _forget_lock(upload_id)
+            return jsonify({"id": upload_id, "offset": received, "complete": True, "sha256": sha256}), 200
+        finally:
+            _upload_slots.release()
+    finally:
+        lock.release()
+
+
 @app.route('/out', methods = ['GET'])
 def out_data():
     return "OK", 200
 if __name__ == "__main__":
     app.run(host='0.0.0.0', port=5000)
-
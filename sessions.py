@@ -0,0 +1,268 @@
+import csv
+import datetime
+import io
+import json
+import os
+import re
+import tempfile
+import threading
+from dataclasses import dataclass
+
+import numpy as np
+
+DEFAULT_SESSION_ID = "default"
+
+VERIFIED_IDS_HEADER = ["Registration Number", "Timestamp", "IP"]
+IP_TRACKING_HEADER = ["IP", "Timestamp"]
+
+_UNSAFE = re.compile(r"[^A-Za-z0-9._-]+")
+
+
+def normalize_reg(reg) -> str:
+    """Registration number as stored and compared: stripped, without a pandas ".0" suffix."""
+    return str(reg).strip().split(".")[0]
+
+
+def make_session_id(course: str, section: str, date: str) -> str:
+    parts = [_UNSAFE.sub("_", p.strip()).strip("_") for p in (course, section, date)]
+    return "-".join(p for p in parts if p)
+
+
+@dataclass(frozen=True)
+class Session:
+    """One class meeting: a course section on a date, with its own attendance files."""
+    id: str
+    course: str
+    section: str
+    date: str
+    verified_ids_file: str
+    ip_tracking_file: str
+
+    def to_dict(self) -> dict:
+        return {"id": self.id, "course": self.course, "section": self.section, "date": self.date}
+
+
+def _append_rows(path: str, header: list[str], rows: list[list]) -> None:
+    """Append rows with a single write, so a failed write adds none of them."""
+    new_file = not os.path.exists(path) or os.path.getsize(path) == 0
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if new_file:
+        writer.writerow(header)
+    writer.writerows(rows)
+    with open(path, "a", newline="", encoding="utf-8") as f:
+        f.write(buffer.getvalue())
+
+
+def _append_row(path: str, header: list[str], row: list) -> None:
+    _append_rows(path, header, [row])
+
+
+def _read_column(path: str, column: str) -> list[str]:
+    if not os.path.exists(path):
+        return []
+    with open(path, newline="", encoding="utf-8", errors="replace") as f:
+        reader = csv.DictReader(f)
+        return [row[column] for row in reader if row.get(column)]
+
+
+class SessionAttendance:
+    """
+    Attendance of one session: who is present and which devices were used,
+    held in memory and backed by the session's append-only CSV files.
+
+    The files are read once, on first use; every record appends one row
+    instead of rewriting the file, so a lookup or a write costs the same
+    however many sessions have accumulated. `lock` serializes the duplicate
+    checks and writes of this session only; `version` counts the records,
+    so cached responses can tell when attendance changed. `bitmap(roster)`
+    gives presence indexed by roster row, kept up to date by `record`.
+    """
+
+    def __init__(self, session: Session):
+        self.session = session
+        self.lock = threading.Lock()
+        self.present: set[str] = {normalize_reg(r) for r in _read_column(session.verified_ids_file, "Registration Number")}
+        self.ips: set[str] = set(_read_column(session.ip_tracking_file, "IP"))
+        self.version = 0
+        self._roster = None
+        self._bitmap = None
+
+    def is_present(self, reg) -> bool:
+        return normalize_reg(reg) in self.present
+
+    def device_used(self, ip: str) -> bool:
+        return ip in self.ips
+
+    def record(self, reg, ip: str, track_ip: bool = True) -> None:
+        """Append the attendance row (and the device row if `track_ip`); caller holds `lock`."""
+        now = datetime.datetime.now()
+        _append_row(self.session.verified_ids_file, VERIFIED_IDS_HEADER, [reg, now, ip])
+        self._mark_present(reg)
+        if track_ip:
+            _append_row(self.session.ip_tracking_file, IP_TRACKING_HEADER, [ip, now])
+            self.ips.add(ip)
+        self.version += 1
+
+    def record_many(self, marks: list[tuple[str, datetime.datetime]], ip: str) -> None:
+        """
+        Append one attendance row per (registration number, timestamp) in a
+        single write, without device tracking; caller holds `lock`.
+        """
+        if not marks:
+            return
+        _append_rows(self.session.verified_ids_file, VERIFIED_IDS_HEADER, [[reg, ts, ip] for reg, ts in marks])
+        for reg, _ in marks:
+            self._mark_present(reg)
+        self.version += 1
+
+    def _mark_present(self, reg) -> None:
+        self.present.add(normalize_reg(reg))
+        if self._roster is not None:
+            row = self._roster.index(reg)
+            if row >= 0:
+                self._bitmap[row >> 3] |= 1 << (row & 7)
+
+    def bitmap(self, roster) -> np.ndarray:
+        """
+        Presence as a packed bitmap over the rows of `roster` (a
+        roster_snapshot.Roster; bit i LSB first = row i). Built from the
+        present set when the roster changes, then updated per record.
+        Registration numbers not on the roster have no bit.
+        """
+        with self.lock:
+            if self._roster is None or self._roster.source != roster.source:
+                present = np.zeros(len(roster), dtype=bool)
+                found = roster.indices(list(self.present))
+                present[found[found >= 0]] = True
+                self._bitmap = np.packbits(present, bitorder="little")
+                self._roster = roster
+            return self._bitmap.copy()
+
+
+class SessionRegistry:
+    """
+    Sessions stored under `root`/<session id>/ (session.json, verified_ids.csv,
+    ip_tracking.csv), plus the "default" session that keeps using the original
+    top-level files so clients that do not name a session work as before.
+    The active session answers requests that do not name one.
+    """
+
+    def __init__(self, root: str, default_verified_ids_file: str, default_ip_tracking_file: str):
+        self.root = root
+        self._default = Session(
+            DEFAULT_SESSION_ID, "", "", "", default_verified_ids_file, default_ip_tracking_file
+        )
+        self._sessions: dict[str, Session] = {DEFAULT_SESSION_ID: self._default}
+        self._attendance: dict[str, SessionAttendance] = {}
+        self._lock = threading.Lock()
+        self._active = (None, DEFAULT_SESSION_ID)  # (active.json stat key, session id)
+
+    def _session_dir(self, session_id: str) -> str:
+        return os.path.join(self.root, session_id)
+
+    def _from_meta(self, session_id: str) -> Session | None:
+        try:
+            with open(os.path.join(self._session_dir(session_id), "session.json"), encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        directory = self._session_dir(session_id)
+        return Session(
+            session_id,
+            meta.get("course", ""),
+            meta.get("section", ""),
+            meta.get("date", ""),
+            os.path.join(directory, "verified_ids.csv"),
+            os.path.join(directory, "ip_tracking.csv"),
+        )
+
+    def create(self, course: str, section: str, date: str | None = None) -> tuple[Session, bool]:
+        """(session, created). Creating an existing course/section/date returns the existing session."""
+        date = datetime.date.fromisoformat(date).isoformat() if date else datetime.date.today().isoformat()
+        session_id = make_session_id(course, section, date)
+        if not course.strip() or session_id in ("", DEFAULT_SESSION_ID):
+            raise ValueError("course is required")
+        with self._lock:
+            existing = self._sessions.get(session_id) or self._from_meta(session_id)
+            if existing is not None:
+                self._sessions[session_id] = existing
+                return existing, False
+            directory = self._session_dir(session_id)
+            os.makedirs(directory, exist_ok=True)
+            with open(os.path.join(directory, "session.json"), "w", encoding="utf-8") as f:
+                json.dump({"course": course.strip(), "section": section.strip(), "date": date}, f)
+            session = self._from_meta(session_id)
+            self._sessions[session_id] = session
+            return session, True
+
+    def get(self, session_id: str) -> Session | None:
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None and _UNSAFE.search(session_id) is None and session_id not in (".", ".."):
+                session = self._from_meta(session_id)  # may have been created by another process
+                if session is not None:
+                    self._sessions[session_id] = session
+            return session
+
+    def select(self, course: str | None = None, section: str | None = None, start: str = "",
+               end: str = "9999-12-31") -> list[Session]:
+        """Dated sessions of a course/section (any if None) from `start` to `end` (ISO dates, inclusive), oldest first."""
+        return [
+            s for s in self.list()
+            if s.date and start <= s.date <= end
+            and (not course or s.course == course) and (not section or s.section == section)
+        ]
+
+    def list(self) -> list[Session]:
+        if os.path.isdir(self.root):
+            for name in sorted(os.listdir(self.root)):
+                if os.path.isdir(self._session_dir(name)):
+                    self.get(name)
+        with self._lock:
+            return sorted(self._sessions.values(), key=lambda s: (s.date, s.id))
+
+    @staticmethod
+    def _stat_key(path: str):
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size, st.st_ino
+
+    @property
+    def active_id(self) -> str:
+        """
+        Held in memory; active.json is only re-read when its mtime, size or
+        inode changes (activation by another process), so a request costs one stat.
+        """
+        path = os.path.join(self.root, "active.json")
+        key = self._stat_key(path)
+        cached_key, session_id = self._active
+        if key == cached_key:
+            return session_id
+        session_id = DEFAULT_SESSION_ID
+        if key is not None:
+            try:
+                with open(path, encoding="utf-8") as f:
+                    session_id = json.load(f)["session"]
+            except (OSError, ValueError, KeyError):
+                pass
+        self._active = (key, session_id)
+        return session_id
+
+    def activate(self, session_id: str) -> None:
+        os.makedirs(self.root, exist_ok=True)
+        path = os.path.join(self.root, "active.json")
+        fd, tmp = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({"session": session_id}, f)
+        os.replace(tmp, path)
+        self._active = (self._stat_key(path), session_id)
+
+    def attendance(self, session: Session) -> SessionAttendance:
+        with self._lock:
+            attendance = self._attendance.get(session.id)
+            if attendance is None:
+                attendance = self._attendance[session.id] = SessionAttendance(session)
+            return attendance
@@ -0,0 +1,624 @@
+import argparse
+import bisect
+import csv
+import datetime
+import hashlib
+import io
+import itertools
+import logging
+import os
+import shutil
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from flask import Flask, Response, jsonify, request, stream_with_context
+
+import attendance_export
+from sessions import normalize_reg
+
+# Points per backend on the hash ring; more points even out the share of
+# registration numbers each backend owns.
+VIRTUAL_NODES = 128
+FORWARD_TIMEOUT_SECONDS = 30
+READY_TIMEOUT_SECONDS = 60
+# Same per-request limit as the shards: a batch is checked whole before it is split.
+BULK_MARK_MAX_ITEMS = int(os.environ.get("NETMARK_BULK_MARK_MAX_ITEMS", 5000))
+
+# Request headers passed through to the backend (the client IP goes in X-Forwarded-For).
+_FORWARD_HEADERS = ("Content-Type", "Idempotency-Key", "Authorization")
+# Response headers passed back to the client.
+_RETURN_HEADERS = ("Content-Type", "Retry-After", "Idempotent-Replayed")
+
+SERVER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Server_regNoSend.py")
+
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """
+    Consistent hashing of registration numbers onto backends: each backend
+    owns VIRTUAL_NODES points on a 64-bit ring and a registration number
+    belongs to the first point at or after its hash. Adding or removing a
+    backend only moves the numbers of the ring segments it gains or loses.
+    """
+
+    def __init__(self, backends: list[str], virtual_nodes: int = VIRTUAL_NODES):
+        if not backends:
+            raise ValueError("At least one backend is required")
+        self.backends = list(backends)
+        points = sorted(
+            (_hash(f"{backend}#{i}"), backend) for backend in self.backends for i in range(virtual_nodes)
+        )
+        self._points = [p for p, _ in points]
+        self._owners = [b for _, b in points]
+
+    def owner(self, registration_number) -> str:
+        i = bisect.bisect_left(self._points, _hash(normalize_reg(registration_number)))
+        return self._owners[i % len(self._points)]
+
+
+DEVICE_COLUMNS = ["Session", "IP", "Registration Number", "Idempotency-Key", "Timestamp"]
+
+
+class DeviceRegistry:
+    """
+    Devices (client IPs) that have marked attendance, per session, for the
+    whole cluster. Shards only see the students they own, so the router
+    makes the "one device, one attendance" check before forwarding. A claim
+    is pending while its request is in flight and becomes permanent when the
+    owning shard records the attendance; permanent claims are appended to
+    `path` (if given) and reloaded on start.
+    """
+
+    def __init__(self, path: str | None = None):
+        self.path = path
+        self._used: dict[tuple[str, str], str] = {}  # (session, ip) -> Idempotency-Key of the marking request
+        self._pending: set[tuple[str, str]] = set()
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            with open(path, newline="", encoding="utf-8") as f:
+                for row in csv.DictReader(f):
+                    self._used[(row["Session"], row["IP"])] = row["Idempotency-Key"]
+
+    def claim(self, session_id: str, ip: str, key: str = "") -> str:
+        """
+        "new" (claimed; call confirm or release), "replay" (a retry carrying
+        the Idempotency-Key of the request that used this device), "used"
+        or "busy" (another request from the device is in flight).
+        """
+        device = (session_id, ip)
+        with self._lock:
+            if device in self._used:
+                return "replay" if key and self._used[device] == key else "used"
+            if device in self._pending:
+                return "busy"
+            self._pending.add(device)
+            return "new"
+
+    def confirm(self, session_id: str, ip: str, registration_number: str, key: str = "") -> None:
+        device = (session_id, ip)
+        with self._lock:
+            self._pending.discard(device)
+            self._used[device] = key
+            if self.path:
+                new_file = not os.path.exists(self.path)
+                with open(self.path, "a", newline="", encoding="utf-8") as f:
+                    writer = csv.writer(f)
+                    if new_file:
+                        writer.writerow(DEVICE_COLUMNS)
+                    writer.writerow([session_id, ip, registration_number, key, datetime.datetime.now().isoformat()])
+
+    def release(self, session_id: str, ip: str) -> None:
+        with self._lock:
+            self._pending.discard((session_id, ip))
+
+
+class ShardRouter:
+    """
+    Forwards per-student requests to the backend owning the registration
+    number and fans dashboard requests out to every backend, merging the
+    answers. Each backend keeps the full roster (uploads are broadcast) and
+    the attendance of the students it owns.
+    """
+
+    def __init__(self, backends: list[str], devices_file: str | None = None):
+        self.ring = HashRing([b.rstrip("/") for b in backends])
+        self.devices = DeviceRegistry(devices_file)
+        self._local = threading.local()
+        self._fanout = ThreadPoolExecutor(max_workers=max(4, len(self.ring.backends)))
+        self._active_session = None
+
+    @property
+    def timing_backend(self) -> str:
+        """Backend holding the face verification timing log, kept in one place so percentiles stay exact."""
+        return self.ring.backends[0]
+
+    def active_session(self) -> str | None:
+        """
+        The cluster's active session, as set through this router; asked from
+        the first backend on first use. None if it cannot be reached.
+        """
+        if self._active_session is None:
+            try:
+                upstream = self._http().get(f"{self.ring.backends[0]}/sessions", timeout=FORWARD_TIMEOUT_SECONDS)
+                if upstream.status_code == 200:
+                    self._active_session = upstream.json()["active"]
+            except (requests.RequestException, ValueError, KeyError):
+                pass
+        return self._active_session
+
+    def set_active_session(self, session_id: str) -> None:
+        self._active_session = session_id
+
+    def _http(self) -> requests.Session:
+        # One pooled keep-alive session per router thread
+        http = getattr(self._local, "http", None)
+        if http is None:
+            http = self._local.http = requests.Session()
+        return http
+
+    @staticmethod
+    def _headers(multipart: bool = False) -> dict:
+        # A re-encoded multipart body gets a new boundary, so its Content-Type is not copied
+        skip = ("Content-Type",) if multipart else ()
+        headers = {h: request.headers[h] for h in _FORWARD_HEADERS if h in request.headers and h not in skip}
+        headers["X-Forwarded-For"] = request.remote_addr or ""
+        return headers
+
+    @staticmethod
+    def relay(upstream: requests.Response) -> Response:
+        response = Response(upstream.content, status=upstream.status_code)
+        for h in _RETURN_HEADERS:
+            if h in upstream.headers:
+                response.headers[h] = upstream.headers[h]
+        return response
+
+    def send_to(self, backend: str, path: str, params: dict | None = None) -> Response:
+        """Send the current request, body included, to `backend` and relay its answer."""
+        try:
+            upstream = self._http().request(
+                request.method,
+                f"{backend}{path}",
+                params=request.args if params is None else params,
+                headers=self._headers(),
+                data=request.get_data(),
+                timeout=FORWARD_TIMEOUT_SECONDS,
+            )
+        except requests.RequestException as e:
+            return jsonify({"error": f"Shard {backend} unavailable: {e}"}), 502
+        return self.relay(upstream)
+
+    def forward(self, registration_number, path: str, params: dict | None = None) -> Response:
+        return self.send_to(self.ring.owner(registration_number), path, params)
+
+    def forward_marking(self, registration_number, path: str) -> Response:
+        """
+        Forward a request that marks attendance for the calling device, after
+        the cluster-wide device check. The session is resolved here and passed
+        to the shard explicitly, so the check and the mark use the same one.
+        """
+        session_id = request.args.get('session') or self.active_session()
+        if session_id is None:
+            return jsonify({"error": "Active session unavailable: no shard answered"}), 502
+        ip = request.remote_addr or ""
+        key = request.headers.get('Idempotency-Key', '').strip()
+        state = self.devices.claim(session_id, ip, key)
+        if state == "used":
+            return jsonify({
+                "error": "Multiple attendance attempts detected",
+                "message": "Attendance has already been marked from this device. Multiple attempts are not allowed."
+            }), 403
+        if state == "busy":
+            response = jsonify({"error": "An attendance attempt from this device is already in progress"})
+            response.headers['Retry-After'] = "1"
+            return response, 409
+
+        params = {**request.args.to_dict(), "session": session_id}
+        response = self.forward(registration_number, path, params)
+        status = response[1] if isinstance(response, tuple) else response.status_code
+        if state == "new":
+            if status == 200:
+                self.devices.confirm(session_id, ip, normalize_reg(registration_number), key)
+            else:
+                self.devices.release(session_id, ip)
+        return response
+
+    def fan_out(self, path: str, **kwargs):
+        """
+        The current request sent to every backend concurrently: the responses
+        in backend order, or (None, error response) if any backend failed or
+        answered with an error, which is passed through.
+        """
+        return self.scatter(path, {backend: kwargs for backend in self.ring.backends})
+
+    def scatter(self, path: str, kwargs_by_backend: dict):
+        """As fan_out, but only to the given backends, each with its own request arguments (e.g. json=)."""
+        # The request context is thread-local, so read it here
+        headers = self._headers(multipart=any("files" in kw for kw in kwargs_by_backend.values()))
+        method, args = request.method, request.args.to_dict()
+
+        def send(backend, kwargs):
+            kwargs = {"params": args, **kwargs}
+            return self._http().request(
+                method, f"{backend}{path}", headers=headers, timeout=FORWARD_TIMEOUT_SECONDS, **kwargs
+            )
+
+        backends = list(kwargs_by_backend)
+        futures = [self._fanout.submit(send, b, kwargs_by_backend[b]) for b in backends]
+        responses = []
+        error = None
+        for backend, future in zip(backends, futures):
+            try:
+                upstream = future.result()
+            except requests.RequestException as e:
+                error = error or (jsonify({"error": f"Shard {backend} unavailable: {e}"}), 502)
+                continue
+            if upstream.status_code >= 400:
+                error = error or self.relay(upstream)
+            responses.append(upstream)
+        if error:
+            for upstream in responses:
+                upstream.close()  # streamed responses hold their connection until closed
+            return None, error
+        return responses, None
+
+
+def _merge_export_rows(responses: list[requests.Response]):
+    """
+    Export rows of the cluster from the shards' streamed CSV exports. Every
+    shard lists the whole roster for the same sessions in the same order but
+    only knows the attendance of the students it owns, so the rows are read
+    in lockstep and a student is present if any shard has them present.
+    """
+    try:
+        readers = []
+        for upstream in responses:
+            upstream.raw.decode_content = True
+            reader = csv.reader(io.TextIOWrapper(upstream.raw, encoding="utf-8", newline=""))
+            next(reader, None)  # header
+            readers.append(reader)
+        for rows in itertools.zip_longest(*readers):
+            if any(row is None for row in rows) or len({(row[0], row[4]) for row in rows}) != 1:
+                logging.error("Shard exports disagree (are the rosters and sessions in sync?); export truncated")
+                return
+            marks = [row[7] for row in rows if row[6] == "True"]
+            yield (*rows[0][:6], bool(marks), min((m for m in marks if m), default=""))
+    finally:
+        for upstream in responses:
+            upstream.close()
+
+
+def create_app(backends: list[str], devices_file: str | None = None) -> Flask:
+    app = Flask(__name__)
+    router = ShardRouter(backends, devices_file)
+
+    @app.route('/get_user/<unique_id>', methods=['GET'])
+    def get_user(unique_id):
+        return router.forward(unique_id, f"/get_user/{unique_id}")
+
+    @app.route('/upload_unique_id/<unique_id>', methods=['POST'])
+    def upload_unique_id(unique_id):
+        return router.forward_marking(unique_id, f"/upload_unique_id/{unique_id}")
+
+    @app.route('/enroll_face/<unique_id>', methods=['POST'])
+    def enroll_face(unique_id):
+        return router.forward(unique_id, f"/enroll_face/{unique_id}")
+
+    @app.route('/verify_face/<unique_id>', methods=['POST'])
+    def verify_face(unique_id):
+        return router.forward_marking(unique_id, f"/verify_face/{unique_id}")
+
+    @app.route('/verify_face', methods=['POST'])
+    def verify_face_form():
+        request.get_data()  # cache the body for forwarding before the form is parsed
+        unique_id = (request.form.get('registrationNumber') or request.args.get('registrationNumber') or '').strip()
+        if not unique_id:
+            return jsonify({"error": "registrationNumber is required"}), 400
+        return router.forward_marking(unique_id, "/verify_face")
+
+    @app.route('/log_face_verification', methods=['POST'])
+    def log_face_verification():
+        return router.send_to(router.timing_backend, "/log_face_verification")
+
+    @app.route('/verification_timing_stats', methods=['GET'])
+    def verification_timing_stats():
+        return router.send_to(router.timing_backend, "/verification_timing_stats")
+
+    @app.route('/mark_attendance', methods=['POST'])
+    def mark_attendance():
+        data = request.get_json(force=True, silent=True) or {}
+        unique_id = data.get('registrationNumber')
+        if not unique_id:
+            return jsonify({"error": "Registration number is required"}), 400
+        return router.forward(unique_id, "/mark_attendance")
+
+    @app.route('/mark_attendance/bulk', methods=['POST'])
+    def mark_attendance_bulk():
+        """Split the batch by owning shard, send the parts concurrently and merge the results in item order."""
+        data = request.get_json(force=True, silent=True) or {}
+        items = data.get('items')
+        if items is None:
+            items = data.get('registrationNumbers')
+        if not isinstance(items, list) or not items:
+            return jsonify({"error": "items or registrationNumbers is required"}), 400
+        if len(items) > BULK_MARK_MAX_ITEMS:
+            return jsonify({"error": f"At most {BULK_MARK_MAX_ITEMS} items per request"}), 413
+
+        positions = {}  # backend -> indices of its items in the batch
+        for i, item in enumerate(items):
+            reg = item.get('registrationNumber') if isinstance(item, dict) else item
+            positions.setdefault(router.ring.owner(str(reg or '')), []).append(i)
+        responses, error = router.scatter(
+            "/mark_attendance/bulk", {b: {"json": {"items": [items[i] for i in idx]}} for b, idx in positions.items()}
+        )
+        if error:
+            return error
+
+        merged = {"session": None, "marked": 0, "duplicate": 0, "not_found": 0, "invalid": 0}
+        results = [None] * len(items)
+        for idx, upstream in zip(positions.values(), responses):
+            part = upstream.json()
+            merged["session"] = part["session"]
+            for key in ("marked", "duplicate", "not_found", "invalid"):
+                merged[key] += part[key]
+            for i, result in zip(idx, part["results"]):
+                results[i] = result
+        return jsonify({**merged, "results": results}), 200
+
+    @app.route('/attendance_stats', methods=['GET'])
+    def attendance_stats():
+        responses, error = router.fan_out("/attendance_stats")
+        if error:
+            return error
+        parts = [r.json() for r in responses]
+        present = sorted(set().union(*(p["PresentStudents"] for p in parts)))
+        total = parts[0]["total"]
+        return jsonify({
+            "session": parts[0].get("session"),
+            "PresentStudents": present,
+            "total": total,
+            "present": len(present),
+            "absent": total - len(present)
+        }), 200
+
+    def merged_students(path):
+        responses, error = router.fan_out(path)
+        if error:
+            return None, None, error
+        parts = [r.json() for r in responses]
+        present = set()
+        for p in parts:
+            present.update(s["registrationNumber"] for s in p["students"] if s["isPresent"])
+            present.update(p.get("present_students", []))
+        students = parts[0]["students"]
+        for s in students:
+            s["isPresent"] = s["registrationNumber"] in present
+        return students, present, None
+
+    @app.route('/students', methods=['GET'])
+    def students():
+        students_list, present, error = merged_students("/students")
+        if error:
+            return error
+        return jsonify({"students": students_list, "present_students": sorted(present)}), 200
+
+    @app.route('/search_students/<query>', methods=['GET'])
+    def search_students(query):
+        students_list, _, error = merged_students(f"/search_students/{query}")
+        if error:
+            return error
+        return jsonify({"students": students_list}), 200
+
+    def merged_rows(path, combine):
+        """Registration numbers from every shard's answer, combined with set union or intersection."""
+        responses, error = router.fan_out(path)
+        if error:
+            return None, None, error
+        parts = [r.json() for r in responses]
+        regs = combine(*(set(p["registrationNumbers"]) for p in parts))
+        return parts[0], sorted(regs), None
+
+    # Each shard only knows the attendance of the students it owns: a student
+    # is present if some shard has them present and absent if every shard does.
+    @app.route('/attendance/present', methods=['GET'])
+    def attendance_present():
+        first, regs, error = merged_rows("/attendance/present", set.union)
+        return error or (jsonify({"session": first["session"], "count": len(regs), "registrationNumbers": regs}), 200)
+
+    @app.route('/attendance/absent', methods=['GET'])
+    def attendance_absent():
+        first, regs, error = merged_rows("/attendance/absent", set.intersection)
+        return error or (jsonify({"session": first["session"], "count": len(regs), "registrationNumbers": regs}), 200)
+
+    @app.route('/attendance/present_in_all', methods=['GET'])
+    def attendance_present_in_all():
+        first, regs, error = merged_rows("/attendance/present_in_all", set.union)
+        return error or (jsonify({"sessions": first["sessions"], "count": len(regs), "registrationNumbers": regs}), 200)
+
+    @app.route('/attendance/chronic_absentees', methods=['GET'])
+    def chronic_absentees():
+        """
+        A shard counts 0 sessions for the students it does not own, so a
+        student is below the rate only if every shard lists them; the
+        sessions attended are the sum of the shards' counts.
+        """
+        responses, error = router.fan_out("/attendance/chronic_absentees")
+        if error:
+            return error
+        parts = [r.json() for r in responses]
+        attended = {}
+        for p in parts:
+            for student in p["students"]:
+                attended.setdefault(student["registrationNumber"], []).append(student["attended"])
+        sessions = len(parts[0]["sessions"])
+        students = []
+        for student in parts[0]["students"]:
+            counts = attended[student["registrationNumber"]]
+            if len(counts) == len(parts):
+                students.append({**student, "attended": sum(counts), "rate": round(sum(counts) / sessions, 4)})
+        return jsonify({
+            "sessions": parts[0]["sessions"],
+            "threshold": parts[0]["threshold"],
+            "count": len(students),
+            "students": students
+        }), 200
+
+    @app.route('/export', methods=['GET'])
+    def export_attendance():
+        """Merge the shards' CSV exports row by row and stream the result as ?format=csv or parquet."""
+        fmt = request.args.get('format', 'csv').lower()
+        if fmt not in ("csv", "parquet"):
+            return jsonify({"error": "format must be one of: csv, parquet"}), 400
+        if fmt == "parquet" and not attendance_export.parquet_available():
+            return jsonify({"error": "Parquet export needs pyarrow"}), 400
+        params = {**request.args.to_dict(), "format": "csv"}
+        responses, error = router.scatter(
+            "/export", {b: {"params": params, "stream": True} for b in router.ring.backends}
+        )
+        if error:
+            return error
+        if fmt == "parquet":
+            mimetype, chunks = "application/vnd.apache.parquet", attendance_export.parquet_chunks
+        else:
+            mimetype, chunks = "text/csv; charset=utf-8", attendance_export.csv_chunks
+        disposition = responses[0].headers.get('Content-Disposition', 'attachment; filename="attendance.csv"')
+        response = Response(stream_with_context(chunks(_merge_export_rows(responses))), mimetype=mimetype)
+        response.headers['Content-Disposition'] = disposition.replace(".csv", f".{fmt}")
+        return response
+
+    @app.route('/admission_metrics', methods=['GET'])
+    @app.route('/inference_metrics', methods=['GET'])
+    @app.route('/scalability_metrics', methods=['GET'])
+    @app.route('/scalability_report', methods=['GET'])
+    @app.route('/stress_test/start', methods=['POST'])
+    @app.route('/stress_test/stop', methods=['POST'])
+    def per_server_endpoint():
+        """Metrics and load tests of a single server: there is no cluster-wide answer to merge."""
+        return jsonify({
+            "error": f"{request.path} describes a single server; query the shards directly",
+            "backends": router.ring.backends
+        }), 501
+
+    @app.route('/upload_csv', methods=['POST'])
+    def upload_csv():
+        """Broadcast the roster to every backend."""
+        if 'file' not in request.files:
+            return jsonify({"error": "No file part"}), 400
+        file = request.files['file']
+        if file.filename == '':
+            return jsonify({"error": "No selected file"}), 400
+        content = file.read()
+        _, error = router.fan_out("/upload_csv", files={"file": (file.filename, content)})
+        return error or (jsonify({"message": "CSV uploaded successfully"}), 200)
+
+    @app.route('/sessions', methods=['GET'])
+    def list_sessions():
+        return router.send_to(router.ring.backends[0], "/sessions")
+
+    @app.route('/sessions', methods=['POST'])
+    def create_session():
+        responses, error = router.fan_out("/sessions", data=request.get_data())
+        if error:
+            return error
+        created = responses[0].json()
+        if created.get("active"):
+            router.set_active_session(created["session"]["id"])
+        return router.relay(responses[0])
+
+    @app.route('/sessions/<session_id>/activate', methods=['POST'])
+    def activate_session(session_id):
+        responses, error = router.fan_out(f"/sessions/{session_id}/activate")
+        if error:
+            return error
+        router.set_active_session(responses[0].json()["active"])
+        return router.relay(responses[0])
+
+    @app.route('/shards', methods=['GET'])
+    def shards():
+        """The backends, and the owner of ?registrationNumber= if given."""
+        result = {"backends": router.ring.backends}
+        unique_id = request.args.get('registrationNumber')
+        if unique_id:
+            result["owner"] = router.ring.owner(unique_id)
+        return jsonify(result), 200
+
+    return app
+
+
+def launch_shards(count: int, base_port: int, data_dir: str, roster: str | None) -> list[subprocess.Popen]:
+    """
+    Start `count` attendance servers on base_port, base_port + 1, ... each in
+    its own data_dir/shard-<i> working directory, seeded with the roster.
+    """
+    processes = []
+    for i in range(count):
+        workdir = os.path.join(data_dir, f"shard-{i}")
+        os.makedirs(workdir, exist_ok=True)
+        if roster and os.path.exists(roster) and not os.path.exists(os.path.join(workdir, "user_data.csv")):
+            shutil.copy(roster, os.path.join(workdir, "user_data.csv"))
+        processes.append(subprocess.Popen(
+            [sys.executable, SERVER_SCRIPT, "--host", "127.0.0.1", "--port", str(base_port + i),
+             "--no-debug", "--behind-proxy"],
+            cwd=workdir,
+        ))
+    return processes
+
+
+def wait_ready(backends: list[str], timeout: float = READY_TIMEOUT_SECONDS) -> None:
+    deadline = time.monotonic() + timeout
+    for backend in backends:
+        while True:
+            try:
+                if requests.get(f"{backend}/sessions", timeout=2).status_code == 200:
+                    break
+            except requests.RequestException:
+                pass
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Shard {backend} did not start within {timeout:.0f}s")
+            time.sleep(0.2)
+
+
+def main():
+    ap = argparse.ArgumentParser(
+        description="Route attendance requests to hash-sharded NetMark servers, optionally starting them locally."
+    )
+    ap.add_argument("--backends", default=None, help="Comma-separated backend URLs of running servers.")
+    ap.add_argument("--shards", type=int, default=2, help="Local servers to start when --backends is not given.")
+    ap.add_argument("--base-port", type=int, default=5001, help="Port of the first local server.")
+    ap.add_argument("--data-dir", default="shards", help="Working directories of the local servers.")
+    ap.add_argument("--roster", default="user_data.csv", help="Roster copied into new local shard directories.")
+    ap.add_argument("--host", default="0.0.0.0")
+    ap.add_argument("--port", type=int, default=5000, help="Router port (the port the app talks to).")
+    ap.add_argument("--devices-file", default=None,
+                    help="Where the router records which device marked attendance per session "
+                         "(default: <data-dir>/router_devices.csv).")
+    args = ap.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    processes = []
+    if args.backends:
+        backends = [b.strip() for b in args.backends.split(",") if b.strip()]
+    else:
+        processes = launch_shards(args.shards, args.base_port, args.data_dir, args.roster)
+        backends = [f"http://127.0.0.1:{args.base_port + i}" for i in range(args.shards)]
+    try:
+        wait_ready(backends)
+        logging.info(f"Routing to {len(backends)} shards: {', '.join(backends)}")
+        os.makedirs(args.data_dir, exist_ok=True)
+        devices_file = args.devices_file or os.path.join(args.data_dir, "router_devices.csv")
+        create_app(backends, devices_file).run(host=args.host, port=args.port, threaded=True)
+    finally:
+        for p in processes:
+            p.terminate()
+        for p in processes:
+            p.wait()
+
+
+if __name__ == "__main__":
+    main()
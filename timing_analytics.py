@@ -0,0 +1,291 @@
+import argparse
+import datetime
+import io
+import json
+import os
+import re
+import tempfile
+import threading
+
+import numpy as np
+import pandas as pd
+
+LOG_COLUMNS = ["Registration Number", "Timestamp", "Face Verification Time (Seconds)"]
+
+# Verifications further apart than this start a new class session.
+SESSION_GAP_MINUTES = 30
+PERCENTILES = (50, 95, 99)
+
+_HOUR_MS = 3_600_000
+_AWARE_TIMESTAMP = re.compile(r"(?:Z|[+-]\d\d:?\d\d)$")
+
+# Column files of the on-disk store: name -> dtype. Rows are appended in log order.
+_COLUMNS = {"ts_ms": np.int64, "seconds": np.float32, "student": np.int32}
+
+
+def _to_local_ms(timestamps: pd.Series) -> np.ndarray:
+    """
+    ISO timestamps as int64 milliseconds of local wall-clock time; -1 where
+    unparseable. The server and the app log naive local time; timestamps with
+    an offset or Z are converted to local time first.
+    """
+    aware = timestamps.str.contains(_AWARE_TIMESTAMP, na=False).to_numpy()
+    parsed = pd.Series(pd.NaT, index=timestamps.index, dtype="datetime64[ms]")
+    if (~aware).any():
+        parsed[~aware] = pd.to_datetime(timestamps[~aware], format="ISO8601", errors="coerce").astype("datetime64[ms]")
+    if aware.any():
+        local_tz = datetime.datetime.now().astimezone().tzinfo
+        converted = pd.to_datetime(timestamps[aware], format="ISO8601", errors="coerce", utc=True)
+        parsed[aware] = converted.dt.tz_convert(local_tz).dt.tz_localize(None).astype("datetime64[ms]")
+    ms = parsed.to_numpy().astype(np.int64)
+    ms[parsed.isna().to_numpy()] = -1
+    return ms
+
+
+def _group_percentiles(keys: np.ndarray, values: np.ndarray, percentiles=PERCENTILES):
+    """
+    Per-key count, mean and percentiles (linear interpolation, as np.percentile)
+    for all keys at once: one lexsort, then each percentile is a gather at
+    fractional positions inside every group's sorted run.
+    """
+    order = np.lexsort((values, keys))
+    k, v = keys[order], values[order].astype(np.float64)
+    starts = np.flatnonzero(np.r_[True, k[1:] != k[:-1]])
+    counts = np.diff(np.r_[starts, len(k)])
+    means = np.add.reduceat(v, starts) / counts
+    result = {}
+    for p in percentiles:
+        pos = starts + (counts - 1) * (p / 100)
+        lo = np.floor(pos).astype(np.int64)
+        hi = np.minimum(lo + 1, starts + counts - 1)
+        frac = pos - lo
+        result[p] = v[lo] + (v[hi] - v[lo]) * frac
+    return k[starts], counts, means, result
+
+
+class TimingStore:
+    """
+    Columnar store of the face verification timings in logs.csv.
+
+    `refresh()` reads only the bytes appended since the last call (complete
+    lines only, so a write in progress is picked up next time) and appends
+    them to three arrays: timestamp, seconds, and an interned student index.
+    If `store_dir` is set the columns are also appended to raw column files
+    there with the log offset, so a restart resumes instead of rescanning.
+    A log that shrank (truncated or replaced) is re-read from the start.
+    """
+
+    def __init__(self, log_path: str, store_dir: str | None = None):
+        self.log_path = log_path
+        self.store_dir = store_dir
+        self.offset = 0
+        self.skipped_rows = 0
+        self.students: list[str] = []
+        self._student_index: dict[str, int] = {}
+        self._columns = {name: np.empty(0, dtype=dtype) for name, dtype in _COLUMNS.items()}
+        self._lock = threading.Lock()
+        if store_dir:
+            os.makedirs(store_dir, exist_ok=True)
+            self._load()
+
+    def __len__(self) -> int:
+        return len(self._columns["ts_ms"])
+
+    # ---- persistence ----
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.store_dir, name)
+
+    def _load(self) -> None:
+        try:
+            with open(self._path("state.json"), encoding="utf-8") as f:
+                state = json.load(f)
+            with open(self._path("students.txt"), encoding="utf-8") as f:
+                students = f.read().splitlines()[:state["students"]]
+        except (OSError, ValueError, KeyError):
+            return
+        rows = state["rows"]
+        columns = {}
+        for name, dtype in _COLUMNS.items():
+            data = np.fromfile(self._path(f"{name}.bin"), dtype=dtype)
+            if len(data) < rows:
+                return  # incomplete store: rebuild from the log
+            columns[name] = data[:rows]  # drop rows written after the last saved state
+        self._columns = columns
+        self.students = students
+        self._student_index = {s: i for i, s in enumerate(students)}
+        self.offset = state["offset"]
+        self.skipped_rows = state.get("skipped_rows", 0)
+
+    def _save(self, new: dict[str, np.ndarray], new_students: list[str], reset: bool) -> None:
+        mode = "wb" if reset else "ab"
+        for name in _COLUMNS:
+            with open(self._path(f"{name}.bin"), mode) as f:
+                new[name].tofile(f)
+        with open(self._path("students.txt"), "w" if reset else "a", encoding="utf-8") as f:
+            f.writelines(s + "\n" for s in new_students)
+        state = {
+            "offset": self.offset,
+            "rows": len(self),
+            "students": len(self.students),
+            "skipped_rows": self.skipped_rows,
+        }
+        fd, tmp = tempfile.mkstemp(dir=self.store_dir, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(tmp, self._path("state.json"))
+
+    # ---- ingest ----
+
+    def _reset(self) -> None:
+        self.offset = 0
+        self.skipped_rows = 0
+        self.students = []
+        self._student_index = {}
+        self._columns = {name: np.empty(0, dtype=dtype) for name, dtype in _COLUMNS.items()}
+
+    def refresh(self) -> int:
+        """Ingest rows appended to the log since the last refresh; returns how many were added."""
+        with self._lock:
+            try:
+                size = os.path.getsize(self.log_path)
+            except OSError:
+                return 0
+            reset = size < self.offset
+            if reset:
+                self._reset()
+            if size == self.offset:
+                return 0
+
+            with open(self.log_path, "rb") as f:
+                f.seek(self.offset)
+                data = f.read(size - self.offset)
+            end = data.rfind(b"\n") + 1
+            if end == 0:
+                return 0
+            data = data[:end]
+            if self.offset == 0 and data.startswith(LOG_COLUMNS[0].encode("utf-8")):
+                data = data[data.index(b"\n") + 1:]
+
+            frame = pd.read_csv(
+                io.BytesIO(data),
+                header=None,
+                names=LOG_COLUMNS,
+                dtype=str,
+                keep_default_na=False,
+                on_bad_lines="skip",
+                encoding_errors="replace",
+            )
+            ts_ms = _to_local_ms(frame[LOG_COLUMNS[1]].str.strip())
+            seconds = pd.to_numeric(frame[LOG_COLUMNS[2]], errors="coerce").to_numpy(dtype=np.float64)
+            students = frame[LOG_COLUMNS[0]].str.strip()
+            keep = (ts_ms >= 0) & ~np.isnan(seconds) & (students != "").to_numpy()
+
+            codes, uniques = pd.factorize(students[keep])
+            new_students = [s for s in uniques if s not in self._student_index]
+            for s in new_students:
+                self._student_index[s] = len(self.students)
+                self.students.append(s)
+            remap = np.array([self._student_index[s] for s in uniques], dtype=np.int32)
+
+            new = {
+                "ts_ms": ts_ms[keep],
+                "seconds": seconds[keep].astype(np.float32),
+                "student": remap[codes] if len(codes) else np.empty(0, dtype=np.int32),
+            }
+            for name in _COLUMNS:
+                self._columns[name] = np.concatenate([self._columns[name], new[name]])
+            self.offset += end
+            self.skipped_rows += int((~keep).sum())
+            if self.store_dir:
+                self._save(new, new_students, reset)
+            return int(keep.sum())
+
+    # ---- queries ----
+
+    def stats(self, by: str = "hour", window_hours: float | None = None, now: datetime.datetime | None = None,
+              limit: int | None = None) -> dict:
+        """
+        p50/p95/p99 and mean verification seconds per `by` group ("hour",
+        "student" or "session") over the last `window_hours` (all rows if
+        None). Hours and sessions are newest first, students slowest p95 first.
+        """
+        if by not in ("hour", "student", "session"):
+            raise ValueError(f"Unknown grouping: {by}")
+        with self._lock:
+            ts = self._columns["ts_ms"]
+            seconds = self._columns["seconds"]
+            student = self._columns["student"]
+            students = list(self.students)
+
+        if window_hours is not None:
+            now = now or datetime.datetime.now()
+            now_ms = int(np.datetime64(now, "ms").astype(np.int64))
+            in_window = (ts >= now_ms - int(window_hours * _HOUR_MS)) & (ts <= now_ms)
+            ts, seconds, student = ts[in_window], seconds[in_window], student[in_window]
+
+        result = {"by": by, "window_hours": window_hours, "rows": int(len(ts)), "groups": []}
+        if not len(ts):
+            return result
+        overall = np.percentile(seconds.astype(np.float64), PERCENTILES)
+        result["overall"] = {f"p{p}": round(float(x), 4) for p, x in zip(PERCENTILES, overall)}
+        result["overall"]["mean"] = round(float(seconds.mean()), 4)
+
+        if by == "hour":
+            keys = ts - ts % _HOUR_MS
+        elif by == "student":
+            keys = student.astype(np.int64)
+        else:
+            order = np.argsort(ts, kind="stable")
+            new_session = np.r_[True, np.diff(ts[order]) > SESSION_GAP_MINUTES * 60_000]
+            session_start = ts[order][new_session][np.cumsum(new_session) - 1]
+            keys = np.empty_like(ts)
+            keys[order] = session_start
+
+        group_keys, counts, means, pcts = _group_percentiles(keys, seconds)
+        if by == "student":
+            rank = np.argsort(-pcts[95], kind="stable")
+        else:
+            rank = np.arange(len(group_keys))[::-1]
+        if limit is not None:
+            rank = rank[:limit]
+
+        for i in rank:
+            if by == "student":
+                key = students[group_keys[i]]
+            else:
+                key = np.datetime64(int(group_keys[i]), "ms").astype(datetime.datetime).isoformat(timespec="seconds")
+            group = {"key": key, "count": int(counts[i]), "mean": round(float(means[i]), 4)}
+            group.update({f"p{p}": round(float(pcts[p][i]), 4) for p in PERCENTILES})
+            result["groups"].append(group)
+        return result
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Verification time percentiles from the face verification timing log.")
+    ap.add_argument("log", nargs="?", default="logs.csv")
+    ap.add_argument("--by", choices=["hour", "student", "session"], default="hour")
+    ap.add_argument("--window-hours", type=float, default=None, help="Only the last N hours (default: all rows).")
+    ap.add_argument("--limit", type=int, default=24)
+    ap.add_argument("--store-dir", default=None, help="Keep the columnar store here and resume from its offset.")
+    args = ap.parse_args()
+    if args.limit < 0:
+        ap.error("--limit must be >= 0")
+
+    store = TimingStore(args.log, args.store_dir)
+    added = store.refresh()
+    stats = store.stats(args.by, args.window_hours, limit=args.limit)
+
+    print(f"\n=== Face verification time by {args.by} ===")
+    print(f"Rows: {len(store)} ({added} new, {store.skipped_rows} unparseable skipped)")
+    if not stats["groups"]:
+        return
+    o = stats["overall"]
+    print(f"Overall: p50 {o['p50']:.3f}s  p95 {o['p95']:.3f}s  p99 {o['p99']:.3f}s  mean {o['mean']:.3f}s")
+    print(f"\n{args.by:<28} {'count':>7} {'p50 s':>8} {'p95 s':>8} {'p99 s':>8} {'mean s':>8}")
+    for g in stats["groups"]:
+        print(f"{g['key']:<28} {g['count']:>7} {g['p50']:>8.3f} {g['p95']:>8.3f} {g['p99']:>8.3f} {g['mean']:>8.3f}")
+
+
+if __name__ == "__main__":
+    main()